@@ -0,0 +1,722 @@
+"""Aggregates that answer each question of the dashboard.
+
+Each question_* function takes the partial aggregates of the survey (see
+partials.py) and returns a dict of small Dataframes. MakePlots renders them
+and cube.py stores them, so the numbers do not depend on Streamlit. The
+partials come from the shared SurveyDataset, or from a survey file read in
+chunks by StreamingAggregates, with the same answers.
+
+Compute every question without Streamlit, e.g. in a nightly job, with:
+
+    python streamlit_stackoverflow/analytics.py --output-dir results
+"""
+import argparse
+import functools
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+from instrumentation import span
+from labels import COUNTRY, DEVTYPE, LABELS, abbreviate
+from multihot import MultiHotIndex, multihot_index
+from numeric import numeric_column
+from partials import mean, parallel_partials, ranked, relabel, survey_partials, top
+from salaries import sketch, statistics, statistics_frame
+from schema import read_survey, read_survey_chunks
+from snapshot import source_version
+from years import LATEST_YEAR, survey_years
+
+BRANCH_LABEL = LABELS["MainBranchSimplified"]
+EDUCATION_LABEL = LABELS["EducationLevel"]
+OPERATING_SYSTEM_LABEL = LABELS["OpSysSimplified"]
+
+# the groups shown by the salary questions
+TOP_COUNTRIES = 5
+TOP_LANGUAGES = 10
+
+
+def works_with(dataset, language: str) -> np.ndarray:
+    """Return which respondents have worked with a language.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+        language (str): The language, e.g. "Python"
+
+    Returns:
+        np.ndarray: A boolean mask aligned with the survey rows
+    """
+    return multihot_index(dataset, "LanguageHaveWorkedWith").mask(language)
+
+
+def devtype_groups(dataset) -> MultiHotIndex:
+    """Return the index of the roles of each respondent, grouped by function.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+
+    Returns:
+        MultiHotIndex: One column per group of roles
+    """
+    return dataset.memo(
+        ("multihot", "DevType", "groups"),
+        lambda: multihot_index(dataset, "DevType").group(DEVTYPE),
+    )
+
+
+def percentages(sf: pd.Series, column: str, value: str = "Percentage") -> pd.DataFrame:
+    """Return the non-empty entries of counts or percentages as a two columns Dataframe.
+
+    Args:
+        sf (pd.Series): The counts or percentages, indexed by label
+        column (str): The name of the label column
+        value (str): The name of the value column
+
+    Returns:
+        pd.DataFrame: One row per label
+    """
+    sf = sf[sf > 0]
+    return pd.DataFrame({column: sf.index.astype(str), value: sf.values})
+
+
+def shares(counts: pd.Series) -> pd.Series:
+    """Return counts as percentages of their total, the biggest first.
+
+    Args:
+        counts (pd.Series): Counts indexed by label
+
+    Returns:
+        pd.Series: The percentages
+    """
+    return ranked(counts) / max(counts.sum(), 1) * 100
+
+
+def dataset_partials(dataset, workers: int = 1):
+    """Return the partial aggregates of the shared dataset, computed on the first call.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+        workers (int): The number of processes that compute the partials, see
+            parallel_partials(). With 1, they reuse the indexes of the dataset.
+
+    Returns:
+        SurveyPartials: The partials of every row of the survey
+    """
+
+    def build():
+        with span(None, "partials", rows=len(dataset.frame)):
+            if workers > 1:
+                return parallel_partials(dataset.frame, workers)
+            return survey_partials(
+                dataset.frame,
+                roles=devtype_groups(dataset),
+                languages=multihot_index(dataset, "LanguageHaveWorkedWith"),
+                years=numeric_column(dataset, "YearsCodePro"),
+            )
+
+    return dataset.memo("partials", build)
+
+
+def question_one(partials) -> dict:
+    """Return the share of the respondents of each professional branch.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The branches by label, and the metrics of each branch
+    """
+    counts = partials["MainBranch"]
+    sf = shares(relabel(counts, BRANCH_LABEL, partials["MainBranch.missing"]))
+    sf = sf[sf > 0]
+    branches = pd.DataFrame(
+        {"MainBranchSimplified": sf.index.astype(str), "Percentage": sf.values}
+    )
+
+    metrics = []
+    for label, percentage in sf.items():
+        values = [
+            value for value in counts.index if BRANCH_LABEL.label_of(value) == label
+        ]
+        # the label of a branch is only known when the label has a single branch
+        branch = "".join(values) or "Not Informed"
+        simplified = label if len(values) == 1 else "Not Informed"
+        metrics.append([branch, simplified, percentage])
+    metrics = pd.DataFrame(
+        metrics, columns=["MainBranch", "MainBranchSimplified", "Percentage"]
+    )
+    return {"branches": branches, "metrics": metrics}
+
+
+def question_two(partials) -> dict:
+    """Return the share of the respondents of each country.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The countries with the most and least respondents, Brazil and the
+            countries of the chart
+    """
+    sf = shares(partials["Country"])
+    df = pd.DataFrame({"Country": sf.index.astype(str), "Percentage": sf.values})
+    return {
+        "max": df.loc[df["Percentage"] == df["Percentage"].max()],
+        "brazil": df.loc[df["Country"] == "Brazil"],
+        "min": df.loc[df["Percentage"] == df["Percentage"].min()],
+        "chart": df.loc[df["Percentage"] > 1],
+    }
+
+
+def question_three(partials) -> dict:
+    """Return the share of the respondents of each education level.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The education levels
+    """
+    counts = relabel(partials["EdLevel"], EDUCATION_LABEL, partials["EdLevel.missing"])
+    return {"education": percentages(shares(counts), "EducationLevel")}
+
+
+def question_four(partials) -> dict:
+    """Return the professional experience of the respondents of each branch.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The mean, min and max years of each branch label and branch, and
+            the respondents by years of experience
+    """
+    histogram = partials["years.histogram"].rename("count").reset_index()
+    histogram["MainBranchSimplified"] = [
+        BRANCH_LABEL.label_of(value) for value in histogram["MainBranch"]
+    ]
+    histogram["total"] = histogram["years"] * histogram["count"]
+    experience = histogram.groupby("MainBranchSimplified").agg(
+        total=("total", "sum"),
+        count=("count", "sum"),
+        min=("years", "min"),
+        max=("years", "max"),
+    )
+    experience["mean"] = experience["total"] / experience["count"]
+    experience = experience.loc[:, ["mean", "min", "max"]].sort_index()
+
+    # every answered branch is listed, with the experience of its label
+    branches = pd.DataFrame({"MainBranch": partials["MainBranch"].index})
+    branches["MainBranchSimplified"] = [
+        BRANCH_LABEL.label_of(value) for value in branches["MainBranch"]
+    ]
+    # the join of no rows is indexed by MainBranchSimplified, which is also a column
+    branches = branches.join(
+        experience, on="MainBranchSimplified", how="inner"
+    ).rename_axis(None)
+    branches = branches.sort_values(by=["MainBranchSimplified"], kind="mergesort")
+
+    distribution = histogram.groupby(["MainBranchSimplified", "years"], as_index=False)[
+        "count"
+    ].sum()
+
+    experience = experience.reset_index()
+    return {
+        "experience": experience,
+        "branches": branches.loc[:, ["MainBranch", "mean", "min", "max"]],
+        "distribution": distribution,
+    }
+
+
+def question_five(partials) -> dict:
+    """Return the roles, education and company size of the professional developers.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The professions, education levels and organization sizes
+    """
+    roles = ranked(partials["professional.DevType"])
+    professions = roles / max(partials["professional.DevType.answered"], 1) * 100
+
+    education = relabel(partials["professional.EdLevel"], EDUCATION_LABEL)
+
+    just_me = "Just me - I am a freelancer, sole proprietor, etc."
+    org_size = partials["professional.OrgSize"].rename(index={just_me: "1 employee"})
+    org_size = org_size.groupby(level=0).sum()
+
+    return {
+        "professions": percentages(professions, "DevTypeGrouped"),
+        "education": percentages(shares(education), "EdLevelSimplified"),
+        "org_size": percentages(ranked(org_size), "OrgSize", "count"),
+    }
+
+
+def mean_salary(dataset) -> float:
+    """Return the mean salary of a survey, see survey_years.metric()."""
+    salaries = dataset.frame["ConvertedCompYearly"].astype("float64")
+    return float(mean(salaries.sum(), salaries.count()))
+
+
+def median_salary(dataset) -> float:
+    """Return the median salary of a survey, see survey_years.metric()."""
+    return statistics(sketch(dataset.frame["ConvertedCompYearly"]))["median"]
+
+
+def question_six(partials, previous_years: bool = True) -> dict:
+    """Return the mean and median salary of the survey and of the previous years.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+        previous_years (bool): Whether the previous years are compared, see
+            FILTERED_QUESTIONS
+
+    Returns:
+        dict: The Year, Mean and Median salary, the latest year first
+    """
+    latest = pd.DataFrame(
+        {
+            "Year": [LATEST_YEAR],
+            "Mean": [mean(partials["salary.sum"], partials["salary.count"])],
+            "Median": [statistics(partials["salary.sketch"])["median"]],
+        }
+    )
+    if not previous_years:
+        return {"salaries": latest}
+
+    # the previous years come from the registry, the latest one is this survey
+    years = [year for year in survey_years.available() if year != LATEST_YEAR]
+    means = survey_years.metric("mean_salary", mean_salary, years)
+    medians = survey_years.metric("median_salary", median_salary, years)
+    previous = pd.DataFrame(
+        {
+            "Year": means["Year"],
+            "Mean": means["Value"],
+            "Median": medians["Value"],
+        }
+    )
+    return {"salaries": pd.concat([latest, previous], ignore_index=True)}
+
+
+def top_groups(partials, name: str, k: int) -> list:
+    """Return the k groups with the most respondents, in sorted order.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+        name (str): The counts of the groups, e.g. "paid.Country"
+        k (int): The number of groups
+
+    Returns:
+        list: The groups
+    """
+    return sorted(partials.top(name, k).index)
+
+
+def country_salaries(countries: list, sums: pd.Series, paid: pd.Series):
+    """Return the mean salary of some countries.
+
+    Args:
+        countries (list): The countries, in the order of the rows
+        sums (pd.Series): The sum of the salaries of each country
+        paid (pd.Series): The respondents who gave a salary, by country
+
+    Returns:
+        pd.DataFrame: The Country and its mean ConvertedCompYearly, by country
+    """
+    df = pd.DataFrame(
+        {
+            "Country": abbreviate(countries, COUNTRY),
+            "ConvertedCompYearly": [
+                mean(sums.get(country, 0.0), paid.get(country, 0))
+                for country in countries
+            ],
+        }
+    )
+    return df
+
+
+def country_statistics(sketches: pd.Series, countries: list) -> pd.DataFrame:
+    """Return the salary percentiles and trimmed mean of some countries.
+
+    Args:
+        sketches (pd.Series): The salary sketch of each country
+        countries (list): The countries, in the order of the rows
+
+    Returns:
+        pd.DataFrame: The Country and its STATISTICS
+    """
+    df = statistics_frame(sketches, countries, "Country")
+    df["Country"] = abbreviate(countries, COUNTRY)
+    return df
+
+
+def question_seven(partials) -> dict:
+    """Return the salaries of the countries with the most paid respondents.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The mean salary and the salary statistics of each country
+    """
+    counts = partials["paid.Country"]
+    countries = top_groups(partials, "paid.Country", TOP_COUNTRIES)
+    df = country_salaries(countries, partials["paid.Country.salary"], counts)
+    df = df.sort_values(by="ConvertedCompYearly", kind="mergesort")
+    statistics = country_statistics(partials["paid.Country.sketch"], countries)
+    return {
+        "salaries": df,
+        "statistics": statistics.loc[df.index].reset_index(drop=True),
+    }
+
+
+def question_eight(partials) -> dict:
+    """Return the share of the respondents who have worked with Python.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The percentages of Python and the other languages
+    """
+    answered = partials["languages.answered"]
+    python = partials["languages.python"] / answered * 100 if answered else 0.0
+    return {
+        "languages": pd.DataFrame(
+            [["Python", python], ["Others", 100 - python]],
+            columns=["language", "percentage"],
+        )
+    }
+
+
+def question_nine(partials) -> dict:
+    """Return the salaries of the respondents who have worked with Python.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The global and Brazilian means, the top countries with their
+            statistics and the statistics of the top languages
+    """
+    paid = partials["python.paid.Country"]
+    sums = partials["python.paid.Country.salary"]
+    global_mean = mean(partials["python.salary.sum"], partials["python.salary.count"])
+    brazil_mean = mean(sums.get("Brazil", 0.0), paid.get("Brazil", 0))
+
+    countries = top_groups(partials, "python.Country", TOP_COUNTRIES)
+    df = country_salaries(countries, sums, paid)
+    summary = pd.DataFrame(
+        [["Global", global_mean], ["Brazil", brazil_mean]],
+        columns=["Country", "ConvertedCompYearly"],
+    )
+
+    # the languages with the most respondents who gave a salary
+    sketches = partials["paid.language.sketch"]
+    languages = top(sketches.groupby(level=0).sum(), TOP_LANGUAGES).index
+    languages = statistics_frame(sketches, list(languages), "Language")
+    languages = languages.sort_values(by="median", ascending=False, kind="mergesort")
+    return {
+        "summary": summary,
+        "top_countries": df,
+        "statistics": country_statistics(
+            partials["python.paid.Country.sketch"], countries
+        ),
+        "languages": languages.reset_index(drop=True),
+    }
+
+
+def question_ten(partials) -> dict:
+    """Return the share of the respondents of each operating system.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The operating systems
+    """
+    counts = relabel(partials["OpSys"], OPERATING_SYSTEM_LABEL)
+    return {"systems": percentages(shares(counts), "OpSys", "count")}
+
+
+def question_eleven(partials) -> dict:
+    """Return the operating systems of the respondents who have worked with Python.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The operating systems
+    """
+    counts = relabel(partials["python.OpSys"], OPERATING_SYSTEM_LABEL)
+    return {"systems": percentages(shares(counts), "OpSys", "count")}
+
+
+def question_twelve(partials) -> dict:
+    """Return the share of the respondents of each age group.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The age groups
+    """
+    return {"ages": percentages(shares(partials["Age"]), "Age", "percentage")}
+
+
+def question_thirteen(partials) -> dict:
+    """Return the age groups of the respondents who have worked with Python.
+
+    Args:
+        partials (SurveyPartials): The partials of the survey
+
+    Returns:
+        dict: The age groups
+    """
+    sf = shares(partials["python.Age"])
+    return {"ages": percentages(sf, "Age", "percentage")}
+
+
+QUESTIONS = {
+    1: question_one,
+    2: question_two,
+    3: question_three,
+    4: question_four,
+    5: question_five,
+    6: question_six,
+    7: question_seven,
+    8: question_eight,
+    9: question_nine,
+    10: question_ten,
+    11: question_eleven,
+    12: question_twelve,
+    13: question_thirteen,
+}
+
+# the questions of the respondents that match filters, when they differ: the
+# previous years are whole surveys, so they are not compared with a filtered one
+FILTERED_QUESTIONS = {
+    **QUESTIONS,
+    6: functools.partial(question_six, previous_years=False),
+}
+
+
+class DatasetAggregates:
+    """Responsible to compute the aggregates of each question from the shared dataset.
+
+    The aggregates are memoized on the dataset, so they are computed once per
+    version of the survey. They are shared by every session and must not be
+    changed in place.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.version = dataset.version
+
+    def question(self, number: int) -> dict:
+        """Return the aggregates of a question.
+
+        Args:
+            number (int): The question number
+
+        Returns:
+            dict: The Dataframes of the question, by name
+        """
+        return self.dataset.memo(
+            ("aggregates", number),
+            lambda: QUESTIONS[number](dataset_partials(self.dataset)),
+        )
+
+
+class StreamingAggregates:
+    """Responsible to compute the aggregates of each question from a survey file read in chunks.
+
+    The file is read once, on the first question, chunk by chunk, and only the
+    partial aggregates of the chunks are kept, so the memory used is bounded
+    by the chunk size instead of the size of the file. The answers are the
+    same as the ones of DatasetAggregates.
+    """
+
+    def __init__(self, path: str, chunk_rows: int = 100_000):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.version = source_version(path)
+        self._partials = None
+        self._answers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def partials(self):
+        with self._lock:
+            if self._partials is None:
+                with span(None, "partials", "streaming") as streaming:
+                    merged = None
+                    for chunk in read_survey_chunks(self.path, self.chunk_rows):
+                        partials = survey_partials(chunk)
+                        merged = partials if merged is None else merged.merge(partials)
+                    if merged is None:
+                        # a file with a header and no rows can give no chunk at all
+                        merged = survey_partials(read_survey(self.path))
+                    self._partials = merged
+                    streaming.rows = self._partials["rows"]
+            return self._partials
+
+    def question(self, number: int) -> dict:
+        """Return the aggregates of a question.
+
+        Args:
+            number (int): The question number
+
+        Returns:
+            dict: The Dataframes of the question, by name
+        """
+        partials = self.partials
+        with self._lock:
+            if number not in self._answers:
+                self._answers[number] = QUESTIONS[number](partials)
+            return self._answers[number]
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def load_streaming(path: str, chunk_rows: int) -> StreamingAggregates:
+    """Return the streaming aggregates of a file, computed again when it changes.
+
+    Args:
+        path (str): The survey CSV path
+        chunk_rows (int): The number of rows read at once
+
+    Returns:
+        StreamingAggregates: The aggregates of the file
+    """
+    key = (path, chunk_rows)
+    mtime = os.stat(path).st_mtime_ns
+    with _streams_lock:
+        cached = _streams.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, StreamingAggregates(path, chunk_rows))
+            _streams[key] = cached
+        return cached[1]
+
+
+def compute_questions(aggregates, questions: list = None) -> dict:
+    """Compute the aggregates of several questions in one run.
+
+    Args:
+        aggregates: The source of the aggregates, e.g. DatasetAggregates
+        questions (list, optional): The question numbers. Defaults to every question.
+
+    Returns:
+        dict: The Dataframes of each question, by question number and name
+    """
+    return {number: aggregates.question(number) for number in questions or QUESTIONS}
+
+
+def write_results(
+    results: dict, output_dir: str, formats: tuple = ("json", "csv"), **metadata
+) -> list:
+    """Write the aggregates of the questions as one JSON file and one CSV file per Dataframe.
+
+    Args:
+        results (dict): The Dataframes of each question, from compute_questions()
+        output_dir (str): The directory of the files, created when missing
+        formats (tuple): "json", "csv" or both
+        **metadata: Values stored next to the questions in the JSON file,
+            e.g. the dataset version
+
+    Returns:
+        list: The paths of the written files
+    """
+    from cube import frame_to_json
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    if "csv" in formats:
+        for number, frames in results.items():
+            for name, df in frames.items():
+                path = os.path.join(output_dir, f"question_{number:02d}_{name}.csv")
+                df.to_csv(path, index=False)
+                paths.append(path)
+    if "json" in formats:
+        path = os.path.join(output_dir, "results.json")
+        content = {
+            **metadata,
+            "questions": {
+                str(number): {name: frame_to_json(df) for name, df in frames.items()}
+                for number, frames in results.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(content, file, ensure_ascii=False, indent=1)
+        paths.append(path)
+    return paths
+
+
+def main():
+    from dataset import DATA_SOURCE, survey_data
+    from filters import FILTERS, filtered_aggregates, normalize
+    from source import local_copy
+
+    parser = argparse.ArgumentParser(
+        description="Compute the aggregates of every question into JSON and CSV files."
+    )
+    parser.add_argument("--output-dir", default="results", help="directory to write")
+    parser.add_argument(
+        "--format",
+        nargs="+",
+        choices=("json", "csv"),
+        default=["json", "csv"],
+        help="formats to write",
+    )
+    parser.add_argument(
+        "--questions", nargs="+", type=int, choices=QUESTIONS, help="defaults to all"
+    )
+    parser.add_argument(
+        "--filter",
+        action="append",
+        default=[],
+        metavar="COLUMN=VALUE",
+        help=f"only count the respondents with this value, columns: {', '.join(FILTERS)}",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        help="read the survey in chunks of this many rows instead of loading it",
+    )
+    args = parser.parse_args()
+
+    selected = {}
+    for option in args.filter:
+        column, _, value = option.partition("=")
+        if column not in FILTERS or not value:
+            parser.error(f"invalid filter {option!r}")
+        selected.setdefault(column, []).append(value)
+    filters = normalize(selected)
+    if filters and args.chunk_rows:
+        parser.error("--filter needs the survey to be loaded, without --chunk-rows")
+
+    if args.chunk_rows:
+        aggregates = StreamingAggregates(local_copy(DATA_SOURCE), args.chunk_rows)
+    elif filters:
+        aggregates = filtered_aggregates(survey_data.get(), filters)
+    else:
+        aggregates = DatasetAggregates(survey_data.get())
+
+    results = compute_questions(aggregates, args.questions)
+    paths = write_results(
+        results,
+        args.output_dir,
+        tuple(args.format),
+        dataset_version=aggregates.version,
+        filters={column: list(values) for column, values in filters},
+    )
+    print(f"{len(paths)} files written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
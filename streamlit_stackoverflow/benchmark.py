@@ -0,0 +1,499 @@
+"""Headless benchmark of the load, aggregation and figure build of every question.
+
+Each case runs in a fresh interpreter, from a directory with its own ``data``
+folder. The survey is loaded, the aggregates of every question are computed,
+and every page is rendered with Streamlit in bare mode. The time of each phase
+and the peak memory of the process are recorded. The cases are:
+
+- the real survey, when ``data/survey_results_public.csv`` is present
+- synthetic surveys with the columns of ``survey_results_schema.csv``, at 10x
+  and 100x the size of the real survey
+
+Run it from the repository root and compare with a previous run with:
+
+    python streamlit_stackoverflow/benchmark.py --output benchmark.json
+    python streamlit_stackoverflow/benchmark.py --baseline benchmark.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+from dataset import DATA_FILE
+from labels import BRANCH, COUNTRY, DEVTYPE, EDUCATION, OPERATING_SYSTEM
+from schema import SCHEMA_FILE
+
+BENCHMARK_FORMAT = 2
+
+# the timed phases of each case, in order. The aggregates of format 1
+# included the partials.
+PHASES = ("load", "partials", "aggregate", "render")
+
+# respondents of the 2021 survey, the size of the synthetic surveys at 1x
+SURVEY_ROWS = 83439
+
+WORK_DIR = "data/benchmark"
+
+COUNTRIES = list(COUNTRY) + [
+    "India",
+    "Germany",
+    "Canada",
+    "France",
+    "Brazil",
+    "Poland",
+    "Netherlands",
+    "Spain",
+    "Italy",
+    "Australia",
+    "Russian Federation",
+    "Sweden",
+    "Switzerland",
+    "Nomadic",
+]
+
+LANGUAGES = [
+    "JavaScript",
+    "HTML/CSS",
+    "Python",
+    "SQL",
+    "Java",
+    "Node.js",
+    "TypeScript",
+    "C#",
+    "Bash/Shell",
+    "C++",
+    "PHP",
+    "C",
+    "Go",
+    "Kotlin",
+    "Rust",
+    "Ruby",
+    "R",
+    "Swift",
+]
+
+ORG_SIZES = [
+    "Just me - I am a freelancer, sole proprietor, etc.",
+    "2 to 9 employees",
+    "10 to 19 employees",
+    "20 to 99 employees",
+    "100 to 499 employees",
+    "500 to 999 employees",
+    "1,000 to 4,999 employees",
+    "5,000 to 9,999 employees",
+    "10,000 or more employees",
+    "I don’t know",
+]
+
+AGES = [
+    "Under 18 years old",
+    "18-24 years old",
+    "25-34 years old",
+    "35-44 years old",
+    "45-54 years old",
+    "55-64 years old",
+    "65 years or older",
+    "Prefer not to say",
+]
+
+YEARS = ["Less than 1 year", "More than 50 years"] + [str(i) for i in range(1, 51)]
+
+# bumped when the synthetic files change, so they are generated again
+SYNTHETIC_FORMAT = 2
+
+# column: (answers, multi-select), the columns read by the app
+VOCABULARIES = {
+    "MainBranch": (list(BRANCH) + ["None of these"], False),
+    "Country": (COUNTRIES, False),
+    "EdLevel": (list(EDUCATION), False),
+    "YearsCodePro": (YEARS, False),
+    "DevType": (list(DEVTYPE), True),
+    "OrgSize": (ORG_SIZES, False),
+    "LanguageHaveWorkedWith": (LANGUAGES, True),
+    "OpSys": (list(OPERATING_SYSTEM), False),
+    "Age": (AGES, False),
+}
+
+
+def survey_columns(schema_path: str = SCHEMA_FILE) -> list:
+    """Return the answer columns of the survey described by the schema file.
+
+    Args:
+        schema_path (str): The schema CSV path
+
+    Returns:
+        list: The name, answers, multi-select flag and rate of missing answers
+            of each column. The answers are None for numeric columns.
+    """
+    fields = ["qname", "type", "selector", "force_resp"]
+    schema = pd.read_csv(schema_path, usecols=fields)[fields]
+    columns = []
+    for qname, kind, selector, required in schema.itertuples(index=False):
+        if kind in ("DB", "Meta"):
+            continue
+        if kind == "Matrix":
+            names, multi = [f"{qname}HaveWorkedWith", f"{qname}WantToWorkWith"], True
+        else:
+            names, multi = [qname], selector == "MAVR"
+        for name in names:
+            answers = None if kind == "TE" else [f"{qname} {i}" for i in range(1, 9)]
+            answers, multi = VOCABULARIES.get(name, (answers, multi))
+            columns.append((name, answers, multi, 0.0 if required else 0.05))
+    return columns
+
+
+def _answers(
+    rng, answers: list, multi: bool, rows: int, missing: float
+) -> pd.Categorical:
+    if multi:
+        # a pool of distinct combinations of at most 4 answers
+        combinations = set()
+        for _ in range(min(2000, 4 * 2 ** len(answers))):
+            size = rng.integers(1, min(4, len(answers)) + 1)
+            picked = sorted(rng.choice(len(answers), size, replace=False))
+            combinations.add(";".join(answers[i] for i in picked))
+        answers = sorted(combinations)
+
+    # the first answers are the most common ones, like in the real survey
+    weights = 1 / np.arange(1, len(answers) + 1)
+    codes = rng.choice(len(answers), rows, p=weights / weights.sum())
+    codes[rng.random(rows) < missing] = -1
+    return pd.Categorical.from_codes(codes, answers)
+
+
+def synthetic_chunk(columns: list, rng, rows: int, start: int) -> pd.DataFrame:
+    """Generate rows of a synthetic survey.
+
+    Args:
+        columns (list): The columns returned by survey_columns
+        rng (np.random.Generator): The random generator
+        rows (int): The number of rows
+        start (int): The ResponseId of the first row
+
+    Returns:
+        pd.DataFrame: The rows, with the columns of the survey file
+    """
+    data = {"ResponseId": np.arange(start, start + rows)}
+    for name, answers, multi, missing in columns:
+        if answers is None:
+            data[name] = rng.integers(1000, 200000, rows)
+        else:
+            data[name] = _answers(rng, answers, multi, rows, missing)
+    salaries = rng.lognormal(11, 1, rows).round()
+    salaries[rng.random(rows) < 0.45] = np.nan
+    data["ConvertedCompYearly"] = salaries
+    return pd.DataFrame(data)
+
+
+def write_synthetic_survey(
+    path: str,
+    rows: int,
+    schema_path: str = SCHEMA_FILE,
+    seed: int = 0,
+    chunk_rows: int = 250_000,
+) -> str:
+    """Write a synthetic survey file with the columns of the schema file, in chunks.
+
+    Args:
+        path (str): The CSV path to write
+        rows (int): The number of respondents
+        schema_path (str): The schema CSV path
+        seed (int): The seed of the random generator
+        chunk_rows (int): How many rows are generated at a time
+
+    Returns:
+        str: The CSV path
+    """
+    rng = np.random.default_rng(seed)
+    columns = survey_columns(schema_path)
+    for start in range(0, rows, chunk_rows):
+        chunk = synthetic_chunk(columns, rng, min(chunk_rows, rows - start), start + 1)
+        chunk.to_csv(
+            path, mode="w" if start == 0 else "a", header=start == 0, index=False
+        )
+    return path
+
+
+def write_synthetic_data(data_dir: str, rows: int, seed: int = 0):
+    """Write a data folder with a synthetic survey of each year.
+
+    The survey is only generated again when the number of rows changes.
+
+    Args:
+        data_dir (str): The data folder
+        rows (int): The number of respondents of the latest year
+        seed (int): The seed of the random generator
+    """
+    from years import SURVEY_YEARS
+
+    marker = os.path.join(data_dir, "benchmark.json")
+    settings = {"rows": rows, "seed": seed, "format": SYNTHETIC_FORMAT}
+    if os.path.exists(marker):
+        with open(marker) as file:
+            if json.load(file) == settings:
+                return
+
+    os.makedirs(data_dir, exist_ok=True)
+    shutil.copy(SCHEMA_FILE, os.path.join(data_dir, os.path.basename(SCHEMA_FILE)))
+    write_synthetic_survey(
+        os.path.join(data_dir, os.path.basename(DATA_FILE)), rows, seed=seed
+    )
+
+    # the previous year only has the columns compared with the latest one
+    rng = np.random.default_rng(seed + 1)
+    previous = SURVEY_YEARS[2020].path
+    pd.DataFrame(
+        {
+            "Respondent": np.arange(1, rows // 2 + 1),
+            "ConvertedComp": rng.lognormal(11, 1, rows // 2).round(),
+            "LanguageWorkedWith": _answers(rng, LANGUAGES, True, rows // 2, 0.05),
+        }
+    ).to_csv(os.path.join(data_dir, os.path.basename(previous)), index=False)
+
+    with open(marker, "w") as file:
+        json.dump(settings, file)
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident memory of the process, in megabytes."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+
+
+def measure(questions: list) -> dict:
+    """Load the survey of the working directory and time each phase of each question.
+
+    The partials of the survey are timed as their own phase, so the
+    aggregate_seconds of a question are only its own. The finish_seconds of
+    a question are the seconds from the start of the partials until its
+    aggregates are ready, what the first visit of the question waits for.
+
+    Args:
+        questions (list): The question numbers
+
+    Returns:
+        dict: The seconds and the peak memory of each phase
+    """
+    import logging
+
+    # Streamlit warns on every call made without a running app
+    logging.disable(logging.WARNING)
+
+    from analytics import DatasetAggregates, dataset_partials
+    from dataset import DatasetProvider
+    from figures import figure_cache
+    from make_plots import display_question
+    from snapshot import is_fresh
+
+    snapshot = is_fresh(DATA_FILE)
+    start = time.perf_counter()
+    dataset = DatasetProvider(DATA_FILE).get()
+    result = {
+        "rows": len(dataset.frame),
+        "snapshot": snapshot,
+        "load": {"seconds": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb()},
+        "questions": {},
+    }
+
+    start = time.perf_counter()
+    dataset_partials(dataset)
+    result["partials"] = {
+        "seconds": time.perf_counter() - start,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    aggregates = DatasetAggregates(dataset)
+    for number in questions:
+        question_start = time.perf_counter()
+        aggregates.question(number)
+        end = time.perf_counter()
+        result["questions"][str(number)] = {
+            "aggregate_seconds": end - question_start,
+            "finish_seconds": end - start,
+        }
+    result["aggregate"] = {
+        "seconds": sum(q["aggregate_seconds"] for q in result["questions"].values()),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    for number in questions:
+        figure_cache.clear()
+        start = time.perf_counter()
+        display_question(number, aggregates)
+        result["questions"][str(number)]["render_seconds"] = time.perf_counter() - start
+    result["render"] = {
+        "seconds": sum(q["render_seconds"] for q in result["questions"].values()),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    return result
+
+
+def run_case(case: dict, directory: str, questions: list, snapshot: bool) -> dict:
+    """Run a case in a fresh interpreter.
+
+    Args:
+        case (dict): The name and scale of the case
+        directory (str): The directory that holds the data folder of the case
+        questions (list): The question numbers
+        snapshot (bool): Whether the snapshots are built before the case. A
+            fresh snapshot is always used.
+
+    Returns:
+        dict: The case and its measures
+    """
+    if snapshot:
+        subprocess.run(
+            [
+                sys.executable,
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot.py"),
+            ],
+            cwd=directory,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+    # the matplotlib charts are drawn in the process, so the build is timed
+    env = dict(os.environ, SURVEY_RENDER_WORKERS="0")
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure"]
+        + [str(number) for number in questions],
+        cwd=directory,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return dict(case, **json.loads(output))
+
+
+def git_commit() -> str:
+    """Return the commit of the repository, or None outside of a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict):
+    """Print the ratio of each phase of a report to the same case of a baseline."""
+    previous = {(run["data"], run["scale"]): run for run in baseline["runs"]}
+    print(f"\ncompared with {baseline.get('commit') or 'baseline'}")
+    for run in report["runs"]:
+        old = previous.get((run["data"], run["scale"]))
+        if old is None:
+            continue
+        seconds = {phase: run[phase]["seconds"] for phase in PHASES}
+        if baseline.get("format", 1) < 2:
+            seconds["aggregate"] += seconds.pop("partials")
+        ratios = "  ".join(
+            f"{phase} {value / max(old[phase]['seconds'], 1e-9):.2f}x"
+            for phase, value in seconds.items()
+        )
+        print(f"{run['data']:<10}{run['scale']:>6}x  {ratios}")
+
+
+def main():
+    from analytics import QUESTIONS
+
+    parser = argparse.ArgumentParser(
+        description="Time the load, partials, aggregation and render of every question."
+    )
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="*",
+        default=[10, 100],
+        help="sizes of the synthetic surveys, relative to the real one",
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        default=None,
+        help="respondents at 1x, defaults to the real survey or the 2021 survey size",
+    )
+    parser.add_argument(
+        "--questions", type=int, nargs="*", default=list(QUESTIONS), help="questions"
+    )
+    parser.add_argument(
+        "--snapshot", action="store_true", help="build the snapshots of the surveys"
+    )
+    parser.add_argument("--work-dir", default=WORK_DIR, help="synthetic data folder")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument(
+        "--baseline", help="JSON file of a previous run to compare with"
+    )
+    parser.add_argument("--measure", type=int, nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure is not None:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    cases = []
+    rows = args.rows
+    if os.path.exists(DATA_FILE):
+        real = run_case(
+            {"data": "real", "scale": 1}, ".", args.questions, args.snapshot
+        )
+        cases.append(real)
+        rows = rows or real["rows"]
+    rows = rows or SURVEY_ROWS
+
+    for scale in args.scales:
+        directory = os.path.join(args.work_dir, f"x{scale}")
+        write_synthetic_data(os.path.join(directory, "data"), rows * scale)
+        cases.append(
+            run_case(
+                {"data": "synthetic", "scale": scale},
+                directory,
+                args.questions,
+                args.snapshot,
+            )
+        )
+
+    report = {
+        "format": BENCHMARK_FORMAT,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": cases,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=1)
+
+    print(
+        f"{'data':<10}{'scale':>7}{'rows':>12}{'load s':>10}{'partials s':>12}{'aggregate s':>13}{'render s':>10}{'peak MB':>10}"
+    )
+    for run in cases:
+        print(
+            f"{run['data']:<10}{run['scale']:>6}x{run['rows']:>12,}"
+            f"{run['load']['seconds']:>10.2f}{run['partials']['seconds']:>12.2f}"
+            f"{run['aggregate']['seconds']:>13.2f}"
+            f"{run['render']['seconds']:>10.2f}{run['render']['peak_rss_mb']:>10,.0f}"
+        )
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(report, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Precomputed aggregates of every question, stored in a small versioned file.
+
+The pages only show aggregates, so they can be computed offline once per
+version of the survey. A worker serving from the cube holds a few kilobytes
+instead of the row-level survey.
+
+Build the cube from the repository root with:
+
+    python streamlit_stackoverflow/cube.py
+
+and serve the app from it only with:
+
+    SURVEY_CUBE=data/survey_aggregates.json streamlit run streamlit_stackoverflow/streamlit_app.py
+"""
+import argparse
+import datetime
+import json
+import os
+import threading
+
+import pandas as pd  # type: ignore
+
+CUBE_FILE = "data/survey_aggregates.json"
+
+# bumped when the aggregates of a question change shape
+CUBE_FORMAT = 3
+
+
+def frame_to_json(df: pd.DataFrame) -> dict:
+    """Return a Dataframe as a JSON compatible dict.
+
+    Args:
+        df (pd.DataFrame): A small aggregate
+
+    Returns:
+        dict: The columns and the rows of the Dataframe
+    """
+    return {
+        "columns": [str(column) for column in df.columns],
+        "data": json.loads(df.to_json(orient="values", double_precision=15)),
+    }
+
+
+def frame_from_json(content: dict) -> pd.DataFrame:
+    """Return the Dataframe stored by frame_to_json.
+
+    Args:
+        content (dict): The columns and the rows of the Dataframe
+
+    Returns:
+        pd.DataFrame: The aggregate
+    """
+    return pd.DataFrame(content["data"], columns=content["columns"])
+
+
+def build_cube(aggregates, questions: list = None) -> dict:
+    """Compute the aggregates of the questions into the content of a cube.
+
+    Args:
+        aggregates (DatasetAggregates): The source of the aggregates
+        questions (list, optional): The question numbers. Defaults to every question.
+
+    Returns:
+        dict: The content of the cube
+    """
+    from analytics import QUESTIONS
+
+    return {
+        "format": CUBE_FORMAT,
+        "dataset_version": aggregates.version,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "questions": {
+            str(number): {
+                name: frame_to_json(df)
+                for name, df in aggregates.question(number).items()
+            }
+            for number in questions or QUESTIONS
+        },
+    }
+
+
+def write_cube(content: dict, path: str = CUBE_FILE) -> str:
+    """Write the content of a cube, replacing the previous file atomically.
+
+    Args:
+        content (dict): The content of the cube
+        path (str): The cube path
+
+    Returns:
+        str: The cube path
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(content, file, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+class Cube:
+    """Responsible to serve the aggregates of the questions from a cube file.
+
+    It answers like DatasetAggregates, so MakePlots renders from either one.
+    """
+
+    def __init__(self, content: dict):
+        if content.get("format") != CUBE_FORMAT:
+            raise ValueError(
+                f"Cube format {content.get('format')} is not supported, "
+                f"rebuild it with format {CUBE_FORMAT}"
+            )
+        self.version = content["dataset_version"]
+        self.created_at = content["created_at"]
+        self._questions = {
+            int(number): {
+                name: frame_from_json(frame) for name, frame in frames.items()
+            }
+            for number, frames in content["questions"].items()
+        }
+
+    @classmethod
+    def load(cls, path: str = CUBE_FILE) -> "Cube":
+        """Read a cube file.
+
+        Args:
+            path (str): The cube path
+
+        Raises:
+            ValueError: When the file was written with another format
+
+        Returns:
+            Cube: The aggregates of the cube
+        """
+        with open(path, encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def question(self, number: int) -> dict:
+        """Return the aggregates of a question.
+
+        Args:
+            number (int): The question number
+
+        Returns:
+            dict: The Dataframes of the question, by name
+        """
+        return self._questions[number]
+
+
+_cubes: dict = {}
+_cubes_lock = threading.Lock()
+
+
+def load_cube(path: str = CUBE_FILE) -> Cube:
+    """Return the cube of a file, read once per process and again when it changes.
+
+    Args:
+        path (str): The cube path
+
+    Returns:
+        Cube: The aggregates of the cube
+    """
+    mtime = os.stat(path).st_mtime_ns
+    with _cubes_lock:
+        cached = _cubes.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, Cube.load(path))
+            _cubes[path] = cached
+        return cached[1]
+
+
+def main():
+    from analytics import DatasetAggregates, StreamingAggregates
+    from dataset import DATA_SOURCE, survey_data
+    from source import local_copy
+
+    parser = argparse.ArgumentParser(
+        description="Precompute the aggregates of every question into a cube file."
+    )
+    parser.add_argument("--output", default=CUBE_FILE, help="cube file to write")
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        help="read the survey in chunks of this many rows instead of loading it",
+    )
+    args = parser.parse_args()
+
+    if args.chunk_rows:
+        aggregates = StreamingAggregates(local_copy(DATA_SOURCE), args.chunk_rows)
+    else:
+        aggregates = DatasetAggregates(survey_data.get())
+    content = build_cube(aggregates)
+    path = write_cube(content, args.output)
+    print(
+        f"{path} written for dataset {content['dataset_version'][:12]}"
+        f" ({os.path.getsize(path):,} bytes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+
+from instrumentation import span
+from snapshot import load_survey, source_version
+from source import RemoteDatasetProvider, is_url
+
+DATA_FILE = "data/survey_results_public.csv"
+
+# the survey served by the app: another file, compressed or not, or a URL,
+# e.g. https://drive.google.com/uc?export=download&id=1_FUXeTJgZbmggsbkHtOymoufnYT1HYwM
+DATA_SOURCE = os.environ.get("SURVEY_SOURCE", DATA_FILE)
+
+
+class SurveyDataset:
+    """One loaded version of the survey, shared by every session.
+
+    Columns and indexes derived from the survey are kept in the dataset with
+    memo(), so they are built once per version instead of once per rerun.
+    """
+
+    def __init__(self, frame, version: str, path: str):
+        self.frame = frame
+        self.version = version
+        self.path = path
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+        self._key_locks = {}
+
+    def memo(self, key, builder):
+        """Return the value cached under a key, building it on the first call.
+
+        Each key has its own lock, so a slow builder only holds back the
+        callers of its key, and a builder can read other keys.
+
+        Args:
+            key (Hashable): The name of the derived value
+            builder (callable): Function without arguments that builds the value
+
+        Returns:
+            Any: The cached value
+        """
+        with self._memo_lock:
+            if key in self._memo:
+                return self._memo[key]
+            key_lock = self._key_locks.setdefault(key, threading.RLock())
+
+        with key_lock:
+            with self._memo_lock:
+                if key in self._memo:
+                    return self._memo[key]
+            value = builder()
+            with self._memo_lock:
+                self._memo[key] = value
+                self._key_locks.pop(key, None)
+            return value
+
+
+class DatasetProvider:
+    """Responsible to load a survey file once per process and share it.
+
+    The file is only parsed again when its modification time changes and
+    the content hash differs from the one already loaded.
+    """
+
+    def __init__(self, path: str, loader=load_survey, versioner=source_version):
+        self.path = path
+        self.loader = loader
+        self.versioner = versioner
+        self._lock = threading.Lock()
+        self._dataset = None
+        self._stat = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.last_load_seconds = 0.0
+        self.total_load_seconds = 0.0
+
+    def _file_stat(self) -> tuple:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # only the snapshot was deployed, it is loaded once
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self) -> SurveyDataset:
+        """Return the shared dataset, loading it when it is missing or outdated.
+
+        Returns:
+            SurveyDataset: The current version of the survey
+        """
+        with self._lock:
+            stat = self._file_stat()
+            if self._dataset is not None and stat == self._stat:
+                self.hits += 1
+                return self._dataset
+
+            version = self.versioner(self.path)
+            if self._dataset is not None and version == self._dataset.version:
+                # touched but not changed, keep the frame already in memory
+                self._stat = stat
+                self.hits += 1
+                return self._dataset
+
+            self.misses += 1
+            start = time.perf_counter()
+            with span(None, "load", os.path.basename(self.path)) as load:
+                frame = self.loader(self.path)
+                load.rows = len(frame)
+            elapsed = time.perf_counter() - start
+
+            self.loads += 1
+            self.last_load_seconds = elapsed
+            self.total_load_seconds += elapsed
+            self._dataset = SurveyDataset(frame, version, self.path)
+            self._stat = stat
+            return self._dataset
+
+    def loaded(self):
+        """Return the dataset loaded so far, without loading or checking it.
+
+        Returns:
+            SurveyDataset: The last dataset returned by get(), None before the first one
+        """
+        return self._dataset
+
+    def clear(self):
+        """Forget the loaded dataset, the next call to get() will load it again."""
+        with self._lock:
+            self._dataset = None
+            self._stat = None
+
+    def stats(self) -> dict:
+        """Return the counters of the provider.
+
+        Returns:
+            dict: Hits, misses, loads and load times in seconds
+        """
+        with self._lock:
+            return {
+                "path": self.path,
+                "version": self._dataset.version if self._dataset else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "last_load_seconds": self.last_load_seconds,
+                "total_load_seconds": self.total_load_seconds,
+            }
+
+
+def source_provider(source: str):
+    """Return the provider of a survey file or URL.
+
+    Args:
+        source (str): The path of the survey file, compressed or not, or its HTTP(S) URL
+
+    Returns:
+        DatasetProvider: The provider, a RemoteDatasetProvider for a URL
+    """
+    if is_url(source):
+        return RemoteDatasetProvider(source)
+    return DatasetProvider(source)
+
+
+# with SURVEY_SHARED set, the survey published there by shared.py is attached
+SHARED_DIR = os.environ.get("SURVEY_SHARED")
+
+if SHARED_DIR:
+    from shared import SharedDatasetProvider
+
+    survey_data = SharedDatasetProvider(SHARED_DIR)
+else:
+    survey_data = source_provider(DATA_SOURCE)
@@ -0,0 +1,306 @@
+"""Static export of the pages, for serving from static hosting.
+
+The pages only change when the survey changes, so they can be rendered once
+into HTML files: the Welcome page as index.html and each question as
+question-N.html, with their plotly figures drawn by plotly.js, their charts
+as PNG files and the aggregates in results.json. The live app is then only
+needed for the filters.
+
+Export the pages from the repository root with:
+
+    python streamlit_stackoverflow/export.py --output site
+
+The export is skipped when the bundle is already of the current survey.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import textwrap
+
+# the plotly.js bundled with the installed plotly, which reads the figures as
+# plotly writes them: plain lists up to plotly 5, typed arrays since plotly 6
+PLOTLY_JS = "https://cdn.plot.ly/plotly-{version}.min.js"
+MARKED_JS = "https://cdn.jsdelivr.net/npm/marked@12.0.2/marked.min.js"
+
+STYLE = """
+body { font-family: sans-serif; margin: 0; color: #262730; }
+nav { padding: 1rem 2rem; border-bottom: 1px solid #e6e6e6; }
+nav a { margin-right: 0.8rem; }
+nav a.current { font-weight: bold; }
+main { padding: 1rem 2rem; max-width: 1400px; }
+.columns { display: flex; gap: 2rem; }
+.columns > div { flex: 1; min-width: 0; }
+.metric { margin: 1rem 0; }
+.metric .label { font-size: 0.9rem; }
+.metric .value { font-size: 2rem; }
+.metric .delta.up { color: #09ab3b; }
+.metric .delta.down { color: #ff2b2b; }
+.info { background: #e8f0fe; padding: 1rem; border-radius: 0.5rem; }
+img { max-width: 100%; }
+"""
+
+
+class _Columns:
+    """The columns of a row, each one a list of blocks."""
+
+    def __init__(self, page: "StaticPage", count: int):
+        self.columns = [_Column(page) for _ in range(count)]
+
+    def html(self) -> str:
+        cells = "".join(f"<div>{column.html()}</div>" for column in self.columns)
+        return f'<div class="columns">{cells}</div>'
+
+
+class _Column:
+    """A column, its blocks are the ones added inside ``with column:``."""
+
+    def __init__(self, page: "StaticPage"):
+        self.page = page
+        self.blocks = []
+
+    def __enter__(self):
+        self.page._targets.append(self.blocks)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.page._targets.pop()
+        return False
+
+    def html(self) -> str:
+        return "".join(
+            block if isinstance(block, str) else block.html() for block in self.blocks
+        )
+
+
+class StaticPage:
+    """Responsible to record a page as HTML.
+
+    It has the Streamlit methods the pages call, so a page is exported by
+    passing it as their output. Images are written once to the assets
+    directory, under the hash of their content.
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.blocks = []
+        self._targets = [self.blocks]
+        self._charts = 0
+
+    def _add(self, block):
+        self._targets[-1].append(block)
+
+    def header(self, text: str):
+        self._add(f"<h2>{html.escape(text)}</h2>")
+
+    def subheader(self, text: str):
+        self._add(f"<h3>{html.escape(text)}</h3>")
+
+    def markdown(self, text: str):
+        # rendered in the browser by marked
+        self._add(
+            f'<div class="markdown">{html.escape(textwrap.dedent(text).strip())}</div>'
+        )
+
+    def write(self, text: str):
+        self._add(f"<p>{html.escape(str(text))}</p>")
+
+    def info(self, text: str):
+        self._add(f'<div class="info">{html.escape(text)}</div>')
+
+    def metric(self, label: str, value: str, delta: str = None):
+        delta_html = ""
+        if delta is not None:
+            direction = "down" if str(delta).lstrip().startswith("-") else "up"
+            delta_html = (
+                f'<div class="delta {direction}">{html.escape(str(delta))}</div>'
+            )
+        self._add(
+            f'<div class="metric"><div class="label">{html.escape(label)}</div>'
+            f'<div class="value">{html.escape(str(value))}</div>{delta_html}</div>'
+        )
+
+    def columns(self, count: int) -> list:
+        row = _Columns(self, count)
+        self._add(row)
+        return row.columns
+
+    def image(self, image: bytes):
+        name = f"{hashlib.sha256(image).hexdigest()[:16]}.png"
+        path = os.path.join(self.output_dir, "assets", name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(image)
+        self._add(f'<img src="assets/{name}" alt="">')
+
+    def plotly_chart(self, figure: dict):
+        self._charts += 1
+        chart_id = f"chart-{self._charts}"
+        # a JSON string can not close the script element
+        spec = json.dumps(figure).replace("</", "<\\/")
+        self._add(
+            f'<div id="{chart_id}"></div><script>'
+            f"(function (figure) {{ Plotly.newPlot({chart_id!r}, figure.data,"
+            f" figure.layout, {{responsive: true}}); }})({spec});</script>"
+        )
+
+    def html(self, title: str, navigation: str) -> str:
+        """Return the HTML document of the page.
+
+        Args:
+            title (str): The title of the page
+            navigation (str): The HTML of the links to the other pages
+
+        Returns:
+            str: The document
+        """
+        from plotly.offline import get_plotlyjs_version  # type: ignore
+
+        body = "".join(
+            block if isinstance(block, str) else block.html() for block in self.blocks
+        )
+        return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)} - Stack Overflow Data Analysis</title>
+<style>{STYLE}</style>
+<script src="{PLOTLY_JS.format(version=get_plotlyjs_version())}"></script>
+<script src="{MARKED_JS}"></script>
+</head>
+<body>
+<nav>{navigation}</nav>
+<main>
+<h1>Stack Overflow Data Analysis</h1>
+{body}
+</main>
+<script>
+document.querySelectorAll(".markdown").forEach(function (element) {{
+  element.innerHTML = marked.parse(element.textContent);
+}});
+</script>
+</body>
+</html>
+"""
+
+
+def page_file(name: str) -> str:
+    """Return the file name of an exported page.
+
+    Args:
+        name (str): The name of the page in PAGES
+
+    Returns:
+        str: index.html for the Welcome page, question-N.html for the questions
+    """
+    from pages import PAGES
+
+    question = PAGES[name].question
+    return "index.html" if question is None else f"question-{question}.html"
+
+
+def navigation(current: str) -> str:
+    """Return the links to every exported page.
+
+    Args:
+        current (str): The name of the page the links are shown on
+
+    Returns:
+        str: The HTML of the links
+    """
+    from pages import PAGES
+
+    links = []
+    for name in PAGES:
+        selected = ' class="current"' if name == current else ""
+        links.append(f'<a href="{page_file(name)}"{selected}>{html.escape(name)}</a>')
+    return "".join(links)
+
+
+def exported_version(output_dir: str) -> str:
+    """Return the version of the survey a bundle was exported from, None without a bundle."""
+    try:
+        with open(os.path.join(output_dir, "results.json"), encoding="utf-8") as file:
+            return json.load(file).get("dataset_version")
+    except (OSError, ValueError):
+        return None
+
+
+def export_site(output_dir: str, aggregates) -> list:
+    """Render every page and the aggregates of every question into a static bundle.
+
+    Args:
+        output_dir (str): The directory of the bundle, created when missing
+        aggregates: The source of the aggregates, e.g. DatasetAggregates
+
+    Returns:
+        list: The paths of the written pages and results
+    """
+    from analytics import compute_questions, write_results
+    from pages import PAGES, load_page
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, page in PAGES.items():
+        static_page = StaticPage(output_dir)
+        display_page = load_page(name)
+        if page.question is None:
+            display_page(output=static_page)
+        else:
+            display_page(page.question, aggregates, output=static_page)
+
+        path = os.path.join(output_dir, page_file(name))
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(static_page.html(name, navigation(name)))
+        paths.append(path)
+
+    # written last, it marks the bundle as complete for this version
+    paths += write_results(
+        compute_questions(aggregates),
+        output_dir,
+        ("json",),
+        dataset_version=aggregates.version,
+    )
+    return paths
+
+
+def main():
+    from analytics import DatasetAggregates, StreamingAggregates
+    from dataset import DATA_SOURCE, survey_data
+    from source import local_copy
+
+    parser = argparse.ArgumentParser(
+        description="Render every page into static HTML files for static hosting."
+    )
+    parser.add_argument("--output", default="site", help="directory of the bundle")
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        help="read the survey in chunks of this many rows instead of loading it",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="export even if the bundle is current"
+    )
+    args = parser.parse_args()
+
+    if args.chunk_rows:
+        aggregates = StreamingAggregates(local_copy(DATA_SOURCE), args.chunk_rows)
+    else:
+        aggregates = DatasetAggregates(survey_data.get())
+
+    if not args.force and exported_version(args.output) == aggregates.version:
+        print(
+            f"{args.output} is already exported for dataset {aggregates.version[:12]}"
+        )
+        return
+    paths = export_site(args.output, aggregates)
+    print(
+        f"{len(paths)} files written to {args.output}"
+        f" for dataset {aggregates.version[:12]}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Cache of the rendered figures of the pages.
+
+Every rerun used to build the plotly and matplotlib figures again, and the
+matplotlib ones were never closed. The figures are now serialized once per
+(question, figure, filters, dataset version): plotly figures as JSON and
+matplotlib figures as PNG bytes drawn by the render pool (see rendering.py).
+The cache is bounded, so the memory of the server stays flat.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from instrumentation import count
+
+
+def compact_template(fig):
+    """Keep only the parts of the theme template a figure draws with.
+
+    The template of the Streamlit theme holds the defaults of every trace
+    type and the continuous color scales, about 3.6 KB sent with every
+    figure. Only the defaults of the trace types of the figure are kept, and
+    the color scales when the figure has a color axis.
+
+    Args:
+        fig (plotly.graph_objects.Figure): The figure, changed in place
+    """
+    import plotly.graph_objects as go  # type: ignore
+
+    template = fig.layout.template
+    types = {trace.type for trace in fig.data}
+    layout = template.layout.to_plotly_json()
+    if "coloraxis" not in fig.layout.to_plotly_json():
+        layout.pop("coloraxis", None)
+        layout.pop("colorscale", None)
+    fig.layout.template = go.layout.Template(
+        layout=layout,
+        data={name: template.data[name] for name in types if template.data[name]},
+    )
+
+
+def plotly_json(fig) -> str:
+    """Return a plotly figure serialized as compact JSON.
+
+    The template is reduced by compact_template(). The arrays are left to
+    plotly, which writes the numpy ones as base64 typed arrays since plotly 6.
+
+    Args:
+        fig (plotly.graph_objects.Figure): The figure
+
+    Returns:
+        str: The JSON of the figure
+    """
+    from plotly.utils import PlotlyJSONEncoder  # type: ignore
+
+    compact_template(fig)
+    return json.dumps(
+        fig.to_plotly_json(), cls=PlotlyJSONEncoder, separators=(",", ":")
+    )
+
+
+def without_template(spec: str) -> str:
+    """Return the JSON of a figure without its template, for a page over its budget.
+
+    The Streamlit theme still styles the figure, only the traces without a
+    color of their own get the default colors of plotly.
+
+    Args:
+        spec (str): The JSON of the figure
+
+    Returns:
+        str: The JSON of the figure without the template
+    """
+    figure = json.loads(spec)
+    figure.get("layout", {}).pop("template", None)
+    return json.dumps(figure, separators=(",", ":"))
+
+
+class FigureCache:
+    """Responsible to keep the most recently used rendered figures, up to a size.
+
+    Two sessions that miss the same figure at the same time both render it,
+    the figure is only stored once.
+    """
+
+    def __init__(self, max_bytes: int = 64 << 20, max_entries: int = 512):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, render):
+        """Return the figure cached under a key, rendering it on a miss.
+
+        Args:
+            key (Hashable): The key of the figure
+            render (callable): Function without arguments that returns the
+                serialized figure, as str or bytes
+
+        Returns:
+            str | bytes: The serialized figure
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                count("cache_hits")
+                return self._entries[key]
+            self.misses += 1
+        count("cache_misses")
+
+        value = render()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self.size += len(value)
+                self._evict()
+        return value
+
+    def _evict(self):
+        while self._entries and (
+            self.size > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            _, value = self._entries.popitem(last=False)
+            self.size -= len(value)
+            self.evictions += 1
+
+    def clear(self):
+        """Forget every cached figure."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        """Return the counters of the cache.
+
+        Returns:
+            dict: Entries, size in bytes, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+figure_cache = FigureCache()
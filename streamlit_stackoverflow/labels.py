@@ -0,0 +1,217 @@
+"""Short labels used by the charts.
+
+Each entry of LABELS derives a column from a survey column. The mapping is
+applied once per category of the source column, not once per row, and the
+derived columns are cached on the shared dataset. The questions apply the
+same entries to the counts of the values instead (see partials.relabel()).
+"""
+import re
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+BRANCH = {
+    "I am a developer by profession": "professional",
+    "I code primarily as a hobby": "hobby",
+    "I used to be a developer by profession, but no longer am": "ex-professional",
+    "I am not primarily a developer, but I write code sometimes as part of my work": "adventurer",
+    "I am a student who is learning to code": "student",
+}
+
+EDUCATION = {
+    "Secondary school (e.g. American high school, German Realschule or Gymnasium, etc.)": "Secondary school",
+    "Bachelor’s degree (B.A., B.S., B.Eng., etc.)": "Bachelor’s degree",
+    "Master’s degree (M.A., M.S., M.Eng., MBA, etc.)": "Master’s degree",
+    "Other doctoral degree (Ph.D., Ed.D., etc.)": "Other doctoral degree",
+    "Some college/university study without earning a degree": "Study without degree",
+    "Something else": "Something else",
+    "Professional degree (JD, MD, etc.)": "Professional degree",
+    "Primary/elementary school": "Primary/elementary",
+    "Associate degree (A.A., A.S., etc.)": "Associate degree",
+}
+
+# DevType is a multi-select column, each role is grouped on its own
+DEVTYPE = {
+    "Developer, full-stack": "Dev, full-stack",
+    "Developer, back-end": "Dev, back-end",
+    "Developer, front-end": "Dev, front-end",
+    "Developer, desktop or enterprise applications": "Dev, desktop",
+    "Developer, mobile": "Dev, mobile",
+    "Developer, embedded applications or devices": "Dev, embedded",
+    "Developer, game or graphics": "Dev, game or graphics",
+    "Developer, QA or test": "Dev, QA",
+    "DevOps specialist": "DevOps",
+    "Engineer, site reliability": "DevOps",
+    "Data scientist or machine learning specialist": "Data Scientist",
+    "Data or business analyst": "Data Scientist",
+    "Engineer, data": "Engineer, data",
+    "Engineering manager": "Engineer manager",
+    "Senior Executive (C-Suite, VP, etc.)": "Senior Executive",
+    "Product manager": "Product manager",
+    "Academic researcher": "Student",
+    "Student": "Student",
+    "System administrator": "System adm",
+    "Database administrator": "System adm",
+    "Designer": "Designer",
+    "Educator": "Educator",
+    "Scientist": "Scientist",
+    "Marketing or sales professional": "Marketing or sales",
+    "Other (please specify):": "Other",
+}
+
+OPERATING_SYSTEM = {
+    "Windows": "Windows",
+    "Linux-based": "Linux",
+    "MacOS": "MacOS",
+    "Windows Subsystem for Linux (WSL)": "Windows(WSL)",
+    "Other (please specify):": "Other",
+    "BSD": "BSD",
+}
+
+COUNTRY = {
+    "United Kingdom of Great Britain and Northern Ireland": "UK/N Ireland",
+    "United States of America": "USA",
+}
+
+# default that keeps the values missing from the mapping as they are
+KEEP = object()
+
+# labels longer than this are abbreviated when they are not in a mapping
+LABEL_WIDTH = 20
+
+
+class LabelMap(NamedTuple):
+    """How a column of short labels is derived from a survey column."""
+
+    column: str
+    mapping: dict
+    default: Optional[str] = None
+
+    def label_of(self, value):
+        """Return the label of one value of the column, None when it has none."""
+        if self.default is KEEP:
+            return self.mapping.get(value, value)
+        return self.mapping.get(value, self.default)
+
+
+LABELS = {
+    "MainBranchSimplified": LabelMap("MainBranch", BRANCH, "not_informed"),
+    "EducationLevel": LabelMap("EdLevel", EDUCATION, "Not Informed"),
+    "OpSysSimplified": LabelMap("OpSys", OPERATING_SYSTEM),
+    "CountryAbbreviated": LabelMap("Country", COUNTRY, KEEP),
+}
+
+
+def recode(series: pd.Series, mapping: dict, default=None) -> pd.Series:
+    """Replace the values of a series by their labels, working on its categories.
+
+    Args:
+        series (pd.Series): The values to replace, preferably categorical
+        mapping (dict): The label of each value
+        default (str, optional): The label of missing values and of values
+            that are not in the mapping. KEEP leaves unmapped values as they are.
+
+    Returns:
+        pd.Series: A categorical series with the labels
+    """
+    values = series.astype("category")
+    categories = values.cat.categories
+    if default is KEEP:
+        labels = [mapping.get(value, value) for value in categories] + [None]
+    else:
+        labels = [mapping.get(value, default) for value in categories] + [default]
+
+    # the last label is the one of the missing values, whose code is -1
+    label_codes, label_categories = pd.factorize(pd.Index(labels, dtype=object))
+    codes = label_codes[values.cat.codes.to_numpy()]
+    recoded = pd.Categorical.from_codes(
+        codes.astype(np.int32), label_categories
+    ).remove_unused_categories()
+    return pd.Series(
+        recoded.reorder_categories(sorted(recoded.categories)),
+        index=series.index,
+        name=series.name,
+    )
+
+
+def abbreviate(values: list, mapping: dict = None, width: int = LABEL_WIDTH) -> list:
+    """Return short labels of some values, e.g. of the top countries of a chart.
+
+    The label of a value is the one of the mapping. Other values longer than
+    the width lose their qualifier after a comma or a parenthesis, e.g.
+    "Iran, Islamic Republic of..." becomes "Iran", and are cut to the width.
+    A value keeps its whole name when its label is the one of another value.
+
+    Args:
+        values (list): The values
+        mapping (dict, optional): The label of known values
+        width (int): The longest label of an unmapped value
+
+    Returns:
+        list: The label of each value, in the same order
+    """
+    mapping = mapping or {}
+    labels = []
+    for value in values:
+        label = mapping.get(value, value)
+        if value not in mapping and len(label) > width:
+            label = re.split(r",| \(", label)[0].strip()
+            if len(label) > width:
+                label = label[: width - 1].rstrip() + "…"
+        labels.append(label)
+
+    seen = pd.Series(labels, dtype=object).duplicated(keep=False).to_numpy()
+    return [
+        value if duplicate else label
+        for value, label, duplicate in zip(values, labels, seen)
+    ]
+
+
+def apply_label(df: pd.DataFrame, name: str) -> pd.Series:
+    """Derive a label column of the registry from a Dataframe.
+
+    Args:
+        df (pd.DataFrame): The survey Dataframe
+        name (str): The name of the label column in LABELS
+
+    Returns:
+        pd.Series: The label column
+    """
+    label = LABELS[name]
+    return recode(df[label.column], label.mapping, label.default).rename(name)
+
+
+def label_column(dataset, name: str) -> pd.Series:
+    """Return a label column of the shared dataset, derived on the first call.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+        name (str): The name of the label column in LABELS
+
+    Returns:
+        pd.Series: The label column
+    """
+    return dataset.memo(("label", name), lambda: apply_label(dataset.frame, name))
+
+
+def with_labels(dataset) -> pd.DataFrame:
+    """Return the survey Dataframe with every label column its data allows.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+
+    Returns:
+        pd.DataFrame: The survey Dataframe and the label columns, shared by every session
+    """
+
+    def build():
+        return dataset.frame.assign(
+            **{
+                name: label_column(dataset, name)
+                for name, label in LABELS.items()
+                if label.column in dataset.frame
+            }
+        )
+
+    return dataset.memo("labeled", build)
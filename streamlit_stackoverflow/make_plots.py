@@ -1,27 +1,128 @@
-import pandas as pd  # type: ignore
-import plotly.express as px  # type: ignore
-import plotly.graph_objects as go  # type: ignore
-import seaborn as sns  # type: ignore
-import streamlit as st
-from matplotlib import pyplot as plt  # type: ignore
-from numpy.core.fromnumeric import size
-from pandas.core.frame import DataFrame  # type: ignore
-from pywaffle import Waffle  # type: ignore
+import json
 
-from question_one import QuestionOne
-from question_two import QuestionTwo
+import streamlit as st
 
-DATA_FILE = (
-    "data/survey_results_public.csv"
-    # "https://drive.google.com/uc?export=download&id=1_FUXeTJgZbmggsbkHtOymoufnYT1HYwM"
-)
+from figures import figure_cache, plotly_json, without_template
+from instrumentation import count, span
+from payload import MIN_DPI, PageBudget
+from rendering import SAVEFIG_OPTIONS, bar_chart, render_pool, waffle_chart
 
-DATA_FILE_2020 = "data/survey_results_public_2020.csv"
+# the plotting stacks are imported by the questions that draw with them, so a
+# page only pays for the libraries it uses
 
 
 class MakePlots:
-    def __init__(self):
-        self.df_survey = pd.read_csv(DATA_FILE)
+    """Responsible to render the pages of the questions.
+
+    The numbers come from an aggregates source: the shared dataset by default,
+    the respondents of the dataset that match the filters, or a precomputed
+    cube (see cube.py). The dataset is only loaded when a question first
+    reads from it.
+
+    The figures are built once per question, filters and dataset version and
+    served from the figure cache afterwards. The bytes they send to the
+    browser are counted against the budget of the page, see payload.py.
+    """
+
+    def __init__(self, aggregates=None, filters: tuple = (), output=None):
+        self._aggregates = aggregates
+        self.filters = filters
+        # the Streamlit module, or a page with the same methods, see export.py
+        self.st = st if output is None else output
+        self.budget = PageBudget()
+
+    @property
+    def aggregates(self):
+        """The aggregates source, the shared dataset unless one was given."""
+        if self._aggregates is None:
+            from analytics import DatasetAggregates
+            from dataset import survey_data
+            from filters import filtered_aggregates
+
+            if self.filters:
+                self._aggregates = filtered_aggregates(survey_data.get(), self.filters)
+            else:
+                self._aggregates = DatasetAggregates(survey_data.get())
+        return self._aggregates
+
+    def results(self, question_number: int) -> dict:
+        """Return the aggregates of a question.
+
+        Args:
+            question_number (int): The question number
+
+        Returns:
+            dict: The Dataframes of the question, by name
+        """
+        with span(question_number, "aggregate"):
+            return self.aggregates.question(question_number)
+
+    def figure_key(self, question_number: int, name: str) -> tuple:
+        """Return the key of a figure in the figure cache.
+
+        Args:
+            question_number (int): The question number
+            name (str): The name of the figure in the page
+
+        Returns:
+            tuple: The question, the figure, the filters and the dataset version
+        """
+        return (question_number, name, self.filters, self.aggregates.version)
+
+    def show_plotly(self, question_number: int, name: str, build):
+        """Display a plotly figure, built on the first call.
+
+        Args:
+            question_number (int): The question number
+            name (str): The name of the figure in the page
+            build (callable): Function without arguments that returns the figure
+        """
+
+        def render():
+            with span(question_number, "build", name):
+                fig = build()
+            with span(question_number, "serialize", name):
+                return plotly_json(fig)
+
+        spec = figure_cache.get(self.figure_key(question_number, name), render)
+        if not self.budget.fits(len(spec)):
+            spec = figure_cache.get(
+                self.figure_key(question_number, f"{name}@compact"),
+                lambda: without_template(spec),
+            )
+        self.budget.charge(len(spec))
+        count("plotly_bytes", len(spec))
+        self.st.plotly_chart(json.loads(spec))
+
+    def show_image(self, question_number: int, name: str, chart, *args, **kwargs):
+        """Display a matplotlib chart, drawn by the render pool on the first call.
+
+        Over the budget of the page, the image is drawn again at half the
+        resolution until it fits or reaches MIN_DPI.
+
+        Args:
+            question_number (int): The question number
+            name (str): The name of the figure in the page
+            chart (callable): A chart function of rendering.py, with a dpi argument
+            *args: The arguments of the chart
+            **kwargs: The keyword arguments of the chart
+        """
+
+        def render(dpi: int = None):
+            with span(question_number, "render", name):
+                return render_pool.render(chart, *args, dpi=dpi, **kwargs)
+
+        image = figure_cache.get(self.figure_key(question_number, name), render)
+        dpi = SAVEFIG_OPTIONS["dpi"]
+        while not self.budget.fits(len(image)) and dpi > MIN_DPI:
+            dpi = max(dpi // 2, MIN_DPI)
+            image = figure_cache.get(
+                self.figure_key(question_number, f"{name}@{dpi}"),
+                lambda dpi=dpi: render(dpi),
+            )
+        self.budget.charge(len(image))
+        count("image_bytes", len(image))
+        self.st.image(image)
 
     def set_header(self, question_number: int):
         """Display the phrase on each page header according to the number of the question
@@ -44,10 +145,10 @@ class MakePlots:
             12: "What is the average age of respondents?",
             13: "Concerning only people who work with Python, what is the average age?",
         }
-        st.header(f"Question {question_number}:")
-        st.subheader(questions[question_number])
+        self.st.header(f"Question {question_number}:")
+        self.st.subheader(questions[question_number])
         if question_number == 5:
-            st.markdown(
+            self.st.markdown(
                 """
                 1. What is their profession?
                 2. What is their level of education?
@@ -56,7 +157,7 @@ class MakePlots:
                 """
             )
         elif question_number == 9:
-            st.markdown(
+            self.st.markdown(
                 """
                 1. What is the salary level of people working with Python globally?
                 2. In Brazil, what is the salary level?
@@ -65,7 +166,7 @@ class MakePlots:
                 """
             )
         else:
-            st.markdown(
+            self.st.markdown(
                 """
                 ---
                 """
@@ -73,19 +174,17 @@ class MakePlots:
 
     def display_question_one(self):
         """Display the container of the firt question"""
-
         self.set_header(question_number=1)
-        self.question = QuestionOne(self.df_survey)
-        fig = self.question.question_one_chart()
+        results = self.results(1)
 
         # display the chart
-        st.pyplot(fig)
+        self.show_image(1, "waffle", waffle_chart, results["branches"])
 
         # displys the metric
-        for branch, simplefied_branch, value in self.question.question_one_metric(
-            self.df_survey
+        for branch, simplefied_branch, value in results["metrics"].itertuples(
+            index=False
         ):
-            st.metric(
+            self.st.metric(
                 f"{branch} ({simplefied_branch})",
                 f"{value:.2f}%",
             )
@@ -93,330 +192,175 @@ class MakePlots:
     def display_question_two(self):
         """Display the container of the second question"""
         self.set_header(question_number=2)
-        self.question2 = QuestionTwo(self.df_survey)
+        results = self.results(2)
 
-        col1, col2 = st.columns(2)
+        col1, col2 = self.st.columns(2)
 
         with col1:
-            df_max = self.question2.get_max_metric()
-            st.metric(
+            df_max = results["max"]
+            self.st.metric(
                 f"The country with the highest participation is {''.join(df_max['Country'])} with: ",
                 f"{''.join(round(df_max['Percentage'], 3).astype(str))}%",
             )
 
-            df_bra = self.question2.get_brazil_metric()
-            st.metric(
+            df_bra = results["brazil"]
+            self.st.metric(
                 f"Brazil has a participation rate of ",
                 f"{''.join(round(df_bra['Percentage'], 3).astype(str))}%",
             )
 
-            df_min = self.question2.get_min_metric()
-            st.metric(
+            df_min = results["min"]
+            self.st.metric(
                 f"{len(df_min['Country'])} countries have the lowest participation with: ",
                 f"{''.join(round(df_min['Percentage'].min(), 3).astype(str))}%",
             )
 
         with col2:
-            df = self.question2.get_question_chart()
-            fig, ax = plt.subplots()
-            sns.set_theme(style="whitegrid")
-            sns.barplot(x="Percentage", y="Country", data=df)
-
-            plt.title("Distribution of respondents by location")
-
-            st.write(fig)
-            st.write(
+            self.show_image(
+                2,
+                "countries",
+                bar_chart,
+                results["chart"],
+                x="Percentage",
+                y="Country",
+                title="Distribution of respondents by location",
+            )
+            self.st.write(
                 "The chart only presents countries with more than one percent of respondents."
             )
 
-    def set_ed_level_simplified(self) -> dict:
-        """Return a Dictionary containing the education level simplified"""
-        return {
-            "Secondary school (e.g. American high school, German Realschule or Gymnasium, etc.)": "Secondary school",
-            "Bachelor’s degree (B.A., B.S., B.Eng., etc.)": "Bachelor’s degree",
-            "Master’s degree (M.A., M.S., M.Eng., MBA, etc.)": "Master’s degree",
-            "Other doctoral degree (Ph.D., Ed.D., etc.)": "Other doctoral degree",
-            "Some college/university study without earning a degree": "Study without degree",
-            "Something else": "Something else",
-            "Professional degree (JD, MD, etc.)": "Professional degree",
-            "Primary/elementary school": "Primary/elementary",
-            "Associate degree (A.A., A.S., etc.)": "Associate degree",
-        }
-
     def display_question_three(self):
         """Display the container of the third question"""
+        import plotly.express as px  # type: ignore
+
         self.set_header(question_number=3)
-        self.df_survey["EducationLevel"] = (
-            self.df_survey["EdLevel"]
-            .apply(lambda x: self.set_ed_level_simplified().get(x, "Not Informed"))
-            .astype("string")
-        )
-        sf_education = (
-            self.df_survey["EducationLevel"].dropna().value_counts(normalize=True) * 100
-        )
-        df = pd.DataFrame(
-            {"EducationLevel": sf_education.index, "Percentage": sf_education.values}
-        )
+        df = self.results(3)["education"].copy()
 
-        col1, col2 = st.columns(2)
+        col1, col2 = self.st.columns(2)
         with col1:
             df_max = df.loc[df["Percentage"] == df["Percentage"].max()]
-            st.metric(
+            self.st.metric(
                 """As we can see most users who answered the questions have Bachelor's Degree with """,
                 f"{''.join(round(df_max['Percentage'], 2).astype(str))}%",
             )
             df["Percentage"] = df["Percentage"].round(2)
-            table = go.Figure(
-                data=[
-                    go.Table(
-                        header=dict(
-                            values=list(df.columns),
-                            fill_color="paleturquoise",
-                            align="left",
-                        ),
-                        cells=dict(
-                            values=df.transpose().values.tolist(),
-                            fill_color="lavender",
-                            align="left",
-                        ),
-                    )
-                ]
-            )
-            st.write(table)
+            self.show_plotly(3, "table", lambda: table_figure(df))
         with col2:
-            fig = px.pie(
-                df,
-                values="Percentage",
-                names="EducationLevel",
-                title="The respondent's distribution by level of education",
+            self.show_plotly(
+                3,
+                "pie",
+                lambda: px.pie(
+                    df,
+                    values="Percentage",
+                    names="EducationLevel",
+                    title="The respondent's distribution by level of education",
+                ),
             )
-            st.write(fig)
 
     def display_question_four(self):
         """Display the container of the fourth question"""
-        self.set_header(question_number=4)
-
-        branch = {
-            "I am a developer by profession": "professional",
-            "I code primarily as a hobby": "hobby",
-            "I used to be a developer by profession, but no longer am": "ex-professional",
-            "I am not primarily a developer, but I write code sometimes as part of my work": "adventurer",
-            "I am a student who is learning to code": "student",
-        }
-        self.df_survey["MainBranchSimplified"] = (
-            self.df_survey["MainBranch"]
-            .apply(lambda x: branch.get(x, "not_informed"))
-            .astype("string")
-        )
-        df_new = self.df_survey.loc[
-            :, ["YearsCodePro", "MainBranch", "MainBranchSimplified"]
-        ]
-        df_new.loc[:, ["YearsCodePro"]] = df_new.loc[:, ["YearsCodePro"]].apply(
-            pd.to_numeric, args=("coerce",), axis="index"
-        )
-        df_new = (
-            df_new.groupby("MainBranchSimplified")
-            .apply(lambda x: x.fillna(x.mean()))
-            .dropna()
-        )
-        df_new = df_new.join(
-            df_new.groupby("MainBranchSimplified")["YearsCodePro"].aggregate(
-                ["mean", "min", "max"]
-            ),
-            on="MainBranchSimplified",
-        )
-        df_new = df_new.drop_duplicates(keep="first")
+        import plotly.graph_objects as go  # type: ignore
 
-        branch = df_new.MainBranchSimplified.unique()
+        self.set_header(question_number=4)
+        results = self.results(4)
 
-        fig = go.Figure(
-            data=[
-                go.Bar(name="Min", x=branch, y=df_new["min"]),
-                go.Bar(name="Mean", x=branch, y=df_new["mean"]),
-                go.Bar(name="Max", x=branch, y=df_new["max"]),
-            ]
-        )
-        fig.update_layout(barmode="group")
+        def chart():
+            df_stats = results["experience"]
+            branch = df_stats["MainBranchSimplified"]
+            fig = go.Figure(
+                data=[
+                    go.Bar(name="Min", x=branch, y=df_stats["min"]),
+                    go.Bar(name="Mean", x=branch, y=df_stats["mean"]),
+                    go.Bar(name="Max", x=branch, y=df_stats["max"]),
+                ]
+            )
+            fig.update_layout(barmode="group")
+            return fig
 
-        col1, col2 = st.columns(2)
+        col1, col2 = self.st.columns(2)
         with col1:
-            df_table = df_new.sort_values(by=["MainBranchSimplified"])
-            df_table = df_table.loc[:, ["MainBranch", "mean", "min", "max"]]
-            df_table = df_table.drop_duplicates(keep="first")
+            df_table = results["branches"].copy()
             df_table["mean"] = df_table["mean"].round(2)
-            table = go.Figure(
+            self.show_plotly(4, "table", lambda: table_figure(df_table))
+        with col2:
+            self.show_plotly(4, "experience", chart)
+
+        def distribution():
+            df = results["distribution"]
+            fig = go.Figure(
                 data=[
-                    go.Table(
-                        header=dict(
-                            values=list(df_table.columns),
-                            fill_color="paleturquoise",
-                            align="left",
-                        ),
-                        cells=dict(
-                            values=df_table.transpose().values.tolist(),
-                            fill_color="lavender",
-                            align="left",
-                        ),
-                    )
+                    go.Scatter(name=branch, x=rows["years"], y=rows["count"])
+                    for branch, rows in df.groupby("MainBranchSimplified")
                 ]
             )
-            st.write(table)
-        with col2:
-            st.write(fig)
-
-    def set_devtype_group(self) -> dict:
-        """Return a Dictionary containing the dev type grouped by function"""
-        return {
-            "Developer, full-stack": "Dev, full-stack",
-            "Developer, mobile;Developer, front-end;Developer, full-stack;Developer, back-end": "Dev, full-stack, mobile",
-            "Developer, mobile;Developer, full-stack": "Dev, full-stack; mobile",
-            "Developer, back-end": "Dev, back-end",
-            "Developer, front-end": "Dev, front-end",
-            "Developer, front-end;Developer, full-stack;Developer, back-end": "Dev, full-stack",
-            "Developer, front-end;Developer, full-stack": "Dev, full-stack",
-            "Developer, full-stack;Developer, back-end": "Dev, full-stack",
-            "Developer, mobile": "Developer, mobile",
-            "Developer, desktop or enterprise applications": "Dev, desktop",
-            "Developer, desktop or enterprise applications;Developer, back-end": "Dev, desktop",
-            "Developer, front-end;Developer, desktop or enterprise applications;Developer, full-stack;Developer, back-end": "Dev, desktop",
-            "Developer, embedded applications or devices": "Dev, embedded",
-            "Data scientist or machine learning specialist": "Data Scientist",
-            "Developer, desktop or enterprise applications;Developer, full-stack;Developer, back-end": "Dev, desktop",
-            "Other (please specify):": "Other",
-            "Developer, mobile;Developer, front-end": "Dev, mobile; front-end",
-            "Developer, desktop or enterprise applications;Developer, full-stack": "Dev, desktop",
-            "Developer, front-end;Developer, back-end": "Dev, full-stack",
-            "Developer, full-stack;DevOps specialist": "Dev;DevOps",
-            "Developer, back-end;DevOps specialist": "Dev;DevOps",
-            "Engineer, data;Developer, back-end": "Engineer, data",
-            "Engineer, data": "Engineer, data",
-            "Developer, full-stack;Engineering manager": "Dev, full-stack;Eng manager",
-            "Engineering manager": "Engineer manager",
-            "Developer, full-stack;Developer, back-end;DevOps specialist": "Dev;DevOps",
-            "Developer, mobile;Developer, front-end;Developer, desktop or enterprise applications;Developer, full-stack;Developer, back-end": "Dev, full-stack",
-            "Developer, QA or test": "Dev;QA",
-            "Developer, mobile;Developer, front-end;Developer, full-stack": "Dev, full-stack",
-            "Developer, front-end;Developer, full-stack;Developer, back-end;DevOps specialist": "Dev;DevOps",
-            "DevOps specialist": "DevOps",
-            "Developer, mobile;Developer, back-end": "Dev;DevOps",
-            "Developer, desktop or enterprise applications;Developer, embedded applications or devices": "Dev, embedded, desktop",
-            "Developer, game or graphics": "Dev, game or graphics",
-            "Senior Executive (C-Suite, VP, etc.)": "Senior Executive",
-            "Developer, back-end;Engineering manager": "Dev, back-end;Eng manager",
-            "Developer, full-stack;Student": "Dev, full-stack;Student",
-            "Data scientist or machine learning specialist;Developer, back-end": "Data scientist;Dev, back-end",
-            "Developer, full-stack;System administrator": "Dev, full-stack;System adm",
-            "Developer, front-end;Developer, full-stack;Developer, back-end;Designer": "Dev, full-stack;Designer",
-            "Developer, back-end;Developer, embedded applications or devices": "Dev, back-end;embedded",
-            "Developer, mobile;Developer, full-stack;Developer, back-end": "Dev, full-stack",
-            "Academic researcher": "Student",
-            "Developer, front-end;Designer": "Dev, front-end;Designer",
-            "Developer, front-end;Developer, full-stack;Developer, back-end;Database administrator": "Dev, full-stack;System adm",
-            "Developer, full-stack;Other (please specify)": "Dev, full-stack",
-            "Developer, front-end;Developer, desktop or enterprise applications;Developer, back-end": "Dev, back-end;embedded",
-            "Data scientist or machine learning specialist;Data or business analyst": "Data Scientist",
-            "Developer, front-end;Developer, full-stack;Developer, back-end;Developer, QA or test": "Dev;QA",
-            "Developer, full-stack;Senior Executive (C-Suite, VP, etc.)": "Senior Executive",
-            "Other (please specify):;Developer, back-end": "Dev, back-end",
-            "Developer, back-end;Student": "Dev, back-end;Student",
-            "Developer, back-end;DevOps specialist;Engineer, site reliability": "Dev;DevOps",
-            "Developer, front-end;Developer, desktop or enterprise applications": "Dev, front-end, desktop",
-            "Developer, front-end;Developer, full-stack;Developer, back-end;Student": "Dev, full-stack;Student",
-            "Engineer, data;Data scientist or machine learning specialist": "Engineer, data;Data scientist",
-            "Developer, mobile;Developer, front-end;Developer, back-end": "Dev, full-stack, mobile",
-            "Developer, full-stack;Data scientist or machine learning specialist": "Dev, full-stack;Data scientist",
-            "Developer, full-stack;Designer": "Dev, full-stack;Designer",
-            "Developer, back-end;Engineer, site reliability": "Dev, back-end;Engineer",
-            "Developer, full-stack;Product manager": "Dev, full-stack;PM",
-            "Data or business analyst": "Data Scientist",
-        }
+            fig.update_layout(
+                title="Respondents by years of professional experience",
+                xaxis_title="Years",
+                yaxis_title="Respondents",
+            )
+            return fig
+
+        self.show_plotly(4, "distribution", distribution)
 
     def display_question_five(self):
         """Display the container of the fifth question"""
-        self.set_header(question_number=5)
+        import plotly.express as px  # type: ignore
 
-        df = self.df_survey.loc[:]
-        df.set_index(keys=["MainBranch"], inplace=True)
-        df = df.loc[["I am a developer by profession"], :]
+        self.set_header(question_number=5)
+        results = self.results(5)
 
-        col1, col2 = st.columns(2)
+        col1, col2 = self.st.columns(2)
 
         with col1:
-            st.subheader("What is their profession?")
-            df1 = df.loc[:]
-            df1 = df1["DevType"].dropna().value_counts(normalize=True) * 100
-            df1 = pd.DataFrame({"DevType": df1.index, "Percentage": df1.values})
-            df1["DevTypeGrouped"] = (
-                df1["DevType"]
-                .apply(lambda x: self.set_devtype_group().get(x, "not_used"))
-                .astype("string")
-            )
-            df1 = df1.loc[df1["DevTypeGrouped"] != "not_used"]
-            df1 = df1.loc[:, ["DevTypeGrouped", "Percentage"]]
-            df1 = (
-                df1.groupby(["DevTypeGrouped"])
-                .sum()
-                .reset_index()
-                .sort_values(by=["Percentage"], ascending=False)
-            )
-            fig = px.bar(
-                df1,
-                y="DevTypeGrouped",
-                x="Percentage",
-                labels={
-                    "DevTypeGrouped": "Professions",
-                    "Percentage": "Percentage(%)",
-                },
-                title="Professions of professional workers ",
+            self.st.subheader("What is their profession?")
+            self.show_plotly(
+                5,
+                "professions",
+                lambda: px.bar(
+                    results["professions"],
+                    y="DevTypeGrouped",
+                    x="Percentage",
+                    labels={
+                        "DevTypeGrouped": "Professions",
+                        "Percentage": "Percentage(%)",
+                    },
+                    title="Professions of professional workers ",
+                ),
             )
-            st.write(fig)
+            self.st.write("A professional can have more than one profession.")
 
         with col2:
-            st.subheader("What is their level of education?")
-            df2 = df.loc[:]
-            df2 = df["EdLevel"].dropna().value_counts(normalize=True) * 100
-            df2 = pd.DataFrame({"EdLevel": df2.index, "Percentage": df2.values})
-            df2["EdLevelSimplified"] = (
-                df2["EdLevel"]
-                .apply(
-                    lambda x: self.set_ed_level_simplified().get(x, "Something Else")
-                )
-                .astype("string")
+            self.st.subheader("What is their level of education?")
+            self.show_plotly(
+                5,
+                "education",
+                lambda: px.pie(
+                    results["education"],
+                    values="Percentage",
+                    names="EdLevelSimplified",
+                    title="The professional distribution by level of education",
+                    labels={
+                        "EdLevelSimplified": "Education Level",
+                        "Percentage": "Percentage(%)",
+                    },
+                ),
             )
 
-            fig = px.pie(
-                df2,
-                values="Percentage",
-                names="EdLevelSimplified",
-                title="The professional distribution by level of education",
-                labels={
-                    "EdLevelSimplified": "Education Level",
-                    "Percentage": "Percentage(%)",
-                },
-            )
-            st.write(fig)
-
-        st.subheader(
+        self.st.subheader(
             "What is the company's size of those people who work professionally?"
         )
-        df3 = self.df_survey.loc[:, ["MainBranch", "OrgSize"]]
-        df3.set_index(keys=["MainBranch"], inplace=True)
-        df3 = df3.loc[["I am a developer by profession"], :]
-        just_me = "Just me - I am a freelancer, sole proprietor, etc."
-        df3.loc[df3["OrgSize"] == just_me, "OrgSize"] = "1 employee"
-        df3 = (
-            df3.dropna()
-            .value_counts(subset=["OrgSize"], normalize=False)
-            .reset_index(name="count")
+        self.show_image(
+            5,
+            "org_size",
+            bar_chart,
+            results["org_size"],
+            x="count",
+            y="OrgSize",
+            title="Company size of the professional workers",
+            xlabel="Number of employee",
+            ylabel="Company Size",
         )
 
-        fig, ax = plt.subplots()
-        sns.set_theme(style="whitegrid")
-        ax = sns.barplot(x="count", y="OrgSize", data=df3)
-        ax.set(xlabel="Number of employee", ylabel="Company Size")
-        plt.title("Company size of the professional workers")
-        st.write(fig)
-
     def get_difference(self, a: float, b: float) -> float:
         """Return the percentage of the difference between the two values.
 
@@ -432,166 +376,88 @@ class MakePlots:
     def display_question_six(self):
         """Display the container of the sixth question"""
         self.set_header(question_number=6)
-        df_survey_2020 = pd.read_csv(DATA_FILE_2020)
-        mean_salary_2021 = self.df_survey["ConvertedCompYearly"].mean()
-        mean_salary_2020 = df_survey_2020["ConvertedComp"].mean()
-
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric(
-                f"The average salary of 2021",
-                f"{mean_salary_2021:,.2f}",
-                f"{self.get_difference(mean_salary_2021, mean_salary_2020):.2f}%",
-            )
-        with col2:
-            st.metric(
-                f"The average salary of 2020",
-                f"{mean_salary_2020:,.2f}",
-                f"{self.get_difference(mean_salary_2020, mean_salary_2021):.2f}%",
+        df = self.results(6)["salaries"].set_index("Year")
+        if self.filters:
+            self.st.caption(
+                "The previous years are only compared without filters, "
+                "their surveys are not filtered."
             )
+        # the latest year is compared with the year before, the others with the latest
+        columns = self.st.columns(len(df))
+        for position, year in enumerate(df.index):
+            other = df.iloc[1 if position == 0 else 0] if len(df) > 1 else None
+            with columns[position]:
+                for column, name in (("Mean", "average"), ("Median", "median")):
+                    salary = df.loc[year, column]
+                    self.st.metric(
+                        f"The {name} salary of {year}",
+                        f"{salary:,.2f}",
+                        None
+                        if other is None
+                        else f"{self.get_difference(salary, other[column]):.2f}%",
+                    )
 
     def display_question_seven(self):
         """Display the container of the seventh question"""
         self.set_header(question_number=7)
-        df = self.df_survey.loc[:, ["Country", "ConvertedCompYearly"]]
-        df = df.dropna(subset=["ConvertedCompYearly"])
-        sf_country = df["Country"].dropna().value_counts(normalize=False)
-        df_country = (
-            pd.DataFrame({"Country": sf_country.index, "count": sf_country.values})
-            .iloc[0:5]
-            .set_index(keys=["Country"])
+        self.show_image(
+            7,
+            "salaries",
+            bar_chart,
+            self.results(7)["salaries"],
+            x="Country",
+            y="ConvertedCompYearly",
+            title="The average salary from top five countries",
+            xlabel="Country",
+            ylabel="Salary",
+            rotation=30,
         )
-        df.set_index(keys=["Country"], inplace=True)
-        df = df.loc[df.index.isin(df_country.index)]
-        df = df.groupby("Country").mean().reset_index()
-
-        countries = {
-            "Canada": "Canada",
-            "Germany": "Germany",
-            "India": "India",
-            "United Kingdom of Great Britain and Northern Ireland": "UK/N Ireland",
-            "United States of America": "USA",
-        }
-        df["Country"] = df["Country"].apply(lambda x: countries.get(x)).astype("string")
-        df.sort_values(by="ConvertedCompYearly", inplace=True)
-
-        fig, ax = plt.subplots()
-        sns.set_theme(style="whitegrid")
-        ax = sns.barplot(y="ConvertedCompYearly", x="Country", data=df)
-        ax.set(xlabel="Country", ylabel="Salary")
-        plt.xticks(rotation=30)
-        plt.title("The average salary from top five countries")
-        st.write(fig)
+        statistics = statistics_table(self.results(7)["statistics"])
+        self.show_plotly(7, "statistics", lambda: table_figure(statistics))
 
     def display_question_eight(self):
+        import plotly.express as px  # type: ignore
+
         self.set_header(question_number=8)
-        df = self.df_survey.loc[:, ["LanguageHaveWorkedWith"]]
-        df = df.dropna(subset=["LanguageHaveWorkedWith"])
-        sf = df["LanguageHaveWorkedWith"].dropna().value_counts(normalize=False)
-        df = pd.DataFrame({"Language": sf.index, "count": sf.values})
-        all_languages = df["count"].count()
-        python = (
-            df[df["Language"].str.contains("Python")]["count"].count()
-            / all_languages
-            * 100
-        )
-        others = (
-            df[~df["Language"].str.contains("Python")]["count"].count()
-            / all_languages
-            * 100
-        )
-        df2 = pd.DataFrame(
-            [["Python", python], ["Others", others]], columns=["language", "percentage"]
-        )
-        col1, col2 = st.columns(2)
+        df2 = self.results(8)["languages"]
+        python = df2.set_index("language")["percentage"]["Python"]
+        col1, col2 = self.st.columns(2)
         with col1:
-            st.metric(f"Percentage of people who work with Python", f"{python:.2f}%")
+            self.st.metric(
+                f"Percentage of people who work with Python", f"{python:.2f}%"
+            )
 
         with col2:
-            fig = px.bar(
-                df2,
-                x="language",
-                y="percentage",
-                labels={
-                    "language": "Language",
-                    "percentage": "Percentage",
-                },
-                title="Percentage of people who work with Python",
+            self.show_plotly(
+                8,
+                "languages",
+                lambda: px.bar(
+                    df2,
+                    x="language",
+                    y="percentage",
+                    labels={
+                        "language": "Language",
+                        "percentage": "Percentage",
+                    },
+                    title="Percentage of people who work with Python",
+                ),
             )
-            st.write(fig)
 
     def display_question_nine(self):
-        self.set_header(question_number=9)
-        df = self.df_survey.loc[
-            :, ["ConvertedCompYearly", "Country", "LanguageHaveWorkedWith"]
-        ].dropna(subset=["LanguageHaveWorkedWith"])
-        df = df[df["LanguageHaveWorkedWith"].str.contains("Python")]
-
-        global_mean = df["ConvertedCompYearly"].mean()
-        brazil_mean = df[df["Country"].str.contains("Brazil")][
-            "ConvertedCompYearly"
-        ].mean()
-
-        sf = df["Country"].dropna().value_counts(normalize=False)
-        df1 = (
-            pd.DataFrame({"Country": sf.index, "count": sf.values})
-            .iloc[0:5]
-            .set_index(keys=["Country"])
-        )
+        import pandas as pd  # type: ignore
+        import plotly.express as px  # type: ignore
 
-        df.set_index(keys=["Country"], inplace=True)
-        df = df.loc[df.index & df1.index]
-        df1 = df.groupby("Country").mean().reset_index()
-
-        countries = {
-            "Canada": "Canada",
-            "Germany": "Germany",
-            "India": "India",
-            "United Kingdom of Great Britain and Northern Ireland": "UK/N Ireland",
-            "United States of America": "USA",
-        }
-        df1["Country"] = (
-            df1["Country"].apply(lambda x: countries.get(x)).astype("string")
-        )
-        df2 = pd.DataFrame(
-            [["Global", global_mean], ["Brazil", brazil_mean]],
-            columns=["Country", "ConvertedCompYearly"],
-        )
-        df3 = df1.loc[:]
-        df1 = df1.append(df2)
-        df1.sort_values(by="ConvertedCompYearly", inplace=True)
+        self.set_header(question_number=9)
+        results = self.results(9)
+        summary = results["summary"].set_index("Country")["ConvertedCompYearly"]
+        global_mean, brazil_mean = summary["Global"], summary["Brazil"]
 
-        col1, col2 = st.columns(2)
-        with col1:
-            st.metric(f"Global Average Salary", f"{global_mean:,.2f}")
-            st.metric(
-                f"Brazil Average Salary",
-                f"{brazil_mean:,.2f}",
-                f"{self.get_difference(brazil_mean, global_mean):,.2f}% Lower than The Global Average",
+        def chart():
+            df1 = pd.concat(
+                [results["top_countries"], results["summary"]], ignore_index=True
             )
-
-            df3["Salary"] = df3["ConvertedCompYearly"].round(2)
-            df3 = df3.loc[:, ["Country", "Salary"]]
-            table = go.Figure(
-                data=[
-                    go.Table(
-                        header=dict(
-                            values=list(df3.columns),
-                            fill_color="paleturquoise",
-                            align="left",
-                        ),
-                        cells=dict(
-                            values=df3.transpose().values.tolist(),
-                            fill_color="lavender",
-                            align="left",
-                        ),
-                    )
-                ]
-            )
-            st.write(table)
-
-        with col2:
-            fig = px.bar(
+            df1.sort_values(by="ConvertedCompYearly", inplace=True)
+            return px.bar(
                 df1,
                 x="Country",
                 y="ConvertedCompYearly",
@@ -601,46 +467,51 @@ class MakePlots:
                 },
                 title="The average salary",
             )
-            st.write(fig)
 
-    def display_question_ten(self):
-        self.set_header(question_number=10)
-        df = self.df_survey.loc[:, ["OpSys"]]
-        sf = df["OpSys"].dropna().value_counts(normalize=True) * 100
-        df = pd.DataFrame({"OpSys": sf.index, "count": sf.values})
-        os = {
-            "Windows": "Windows",
-            "Linux-based": "Linux",
-            "MacOS": "MacOS",
-            "Windows Subsystem for Linux (WSL)": "Windows(WSL)",
-            "Other (please specify):": "Other",
-            "BSD": "BSD",
-        }
-        df["OpSys"] = df["OpSys"].apply(lambda x: os.get(x)).astype("string")
+        col1, col2 = self.st.columns(2)
+        with col1:
+            self.st.metric(f"Global Average Salary", f"{global_mean:,.2f}")
+            self.st.metric(
+                f"Brazil Average Salary",
+                f"{brazil_mean:,.2f}",
+                f"{self.get_difference(brazil_mean, global_mean):,.2f}% Lower than The Global Average",
+            )
+
+            df3 = results["top_countries"].copy()
+            df3["Salary"] = df3["ConvertedCompYearly"].astype("float64").round(2)
+            df3 = df3.loc[:, ["Country", "Salary"]]
+            self.show_plotly(9, "table", lambda: table_figure(df3))
 
-        col1, col2 = st.columns(2)
         with col2:
-            df["Percentage"] = df["count"].round(2)
-            df1 = df.loc[:, ["OpSys", "Percentage"]]
-            table = go.Figure(
-                data=[
-                    go.Table(
-                        header=dict(
-                            values=list(df1.columns),
-                            fill_color="paleturquoise",
-                            align="left",
-                        ),
-                        cells=dict(
-                            values=df1.transpose().values.tolist(),
-                            fill_color="lavender",
-                            align="left",
-                        ),
-                    )
-                ]
-            )
-            st.write(table)
+            self.show_plotly(9, "salaries", chart)
+
+        statistics = statistics_table(results["statistics"])
+        self.show_plotly(9, "statistics", lambda: table_figure(statistics))
 
+        languages = statistics_table(results["languages"])
+        col1, col2 = self.st.columns(2)
         with col1:
+            self.show_plotly(
+                9,
+                "languages",
+                lambda: px.bar(
+                    languages,
+                    x="Language",
+                    y="median",
+                    labels={"Language": "Language", "median": "Median salary"},
+                    title="The median salary by language",
+                ),
+            )
+        with col2:
+            self.show_plotly(9, "languages_table", lambda: table_figure(languages))
+
+    def display_question_ten(self):
+        import plotly.express as px  # type: ignore
+
+        self.set_header(question_number=10)
+        df = self.results(10)["systems"].copy()
+
+        def chart():
             fig = px.pie(
                 df,
                 values="count",
@@ -648,114 +519,207 @@ class MakePlots:
                 title="Operating systems used in the world",
             )
             fig.update_layout(legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.8))
-            st.write(fig)
+            return fig
+
+        col1, col2 = self.st.columns(2)
+        with col2:
+            df["Percentage"] = df["count"].round(2)
+            df1 = df.loc[:, ["OpSys", "Percentage"]]
+            self.show_plotly(10, "table", lambda: table_figure(df1))
+
+        with col1:
+            self.show_plotly(10, "systems", chart)
 
     def display_question_eleven(self):
+        import plotly.express as px  # type: ignore
+
         self.set_header(question_number=11)
-        df = self.df_survey.loc[:, ["OpSys", "LanguageHaveWorkedWith"]].dropna(
-            subset=["LanguageHaveWorkedWith"]
-        )
-        df = df[df["LanguageHaveWorkedWith"].str.contains("Python")]
-        sf = df["OpSys"].dropna().value_counts(normalize=True) * 100
-        df = pd.DataFrame({"OpSys": sf.index, "count": sf.values})
-        os = {
-            "Windows": "Windows",
-            "Linux-based": "Linux",
-            "MacOS": "MacOS",
-            "Windows Subsystem for Linux (WSL)": "Windows(WSL)",
-            "Other (please specify):": "Other",
-            "BSD": "BSD",
-        }
-        df["OpSys"] = df["OpSys"].apply(lambda x: os.get(x)).astype("string")
+        df = self.results(11)["systems"]
 
-        col1, col2 = st.columns(2)
+        col1, col2 = self.st.columns(2)
         with col1:
-            fig = px.pie(
-                df,
-                values="count",
-                names="OpSys",
-                title="Operating systems used for people who work with Python",
+            self.show_plotly(
+                11,
+                "pie",
+                lambda: px.pie(
+                    df,
+                    values="count",
+                    names="OpSys",
+                    title="Operating systems used for people who work with Python",
+                ),
             )
-            st.write(fig)
 
         with col2:
-            fig1 = px.bar(
-                df,
-                x="OpSys",
-                y="count",
-                labels={
-                    "OpSys": "Operating Systems",
-                    "count": "Percentage",
-                },
-                title="Operating systems used for people who work with Python",
+            self.show_plotly(
+                11,
+                "bar",
+                lambda: px.bar(
+                    df,
+                    x="OpSys",
+                    y="count",
+                    labels={
+                        "OpSys": "Operating Systems",
+                        "count": "Percentage",
+                    },
+                    title="Operating systems used for people who work with Python",
+                ),
             )
-            st.write(fig1)
 
     def display_question_twelve(self):
+        import plotly.express as px  # type: ignore
+
         self.set_header(question_number=12)
-        df = self.df_survey.loc[:, ["Age"]]
-        sf = df["Age"].dropna().value_counts(normalize=True) * 100
-        df = pd.DataFrame({"Age": sf.index, "percentage": sf.values})
-        c1, c2 = st.columns(2)
+        df = self.results(12)["ages"]
+        c1, c2 = self.st.columns(2)
 
         with c1:
-            fig = px.bar(
-                df,
-                y="Age",
-                x="percentage",
-                labels={
-                    "Age": "Age",
-                    "percentage": "Percentage",
-                },
-                title="Respondents by Age Group",
+            self.show_plotly(
+                12,
+                "bar",
+                lambda: px.bar(
+                    df,
+                    y="Age",
+                    x="percentage",
+                    labels={
+                        "Age": "Age",
+                        "percentage": "Percentage",
+                    },
+                    title="Respondents by Age Group",
+                ),
             )
-            st.write(fig)
 
         with c2:
-            fig1 = px.scatter(
-                df,
-                x="Age",
-                y="percentage",
-                labels={
-                    "Age": "Age",
-                    "percentage": "Percentage",
-                },
-                title="Respondents by Age Group",
+            self.show_plotly(
+                12,
+                "scatter",
+                lambda: px.scatter(
+                    df,
+                    x="Age",
+                    y="percentage",
+                    labels={
+                        "Age": "Age",
+                        "percentage": "Percentage",
+                    },
+                    title="Respondents by Age Group",
+                ),
             )
-            st.write(fig1)
 
     def display_question_thirteen(self):
+        import plotly.express as px  # type: ignore
+
         self.set_header(question_number=13)
-        df = self.df_survey.loc[:, ["Age", "LanguageHaveWorkedWith"]].dropna(
-            subset=["LanguageHaveWorkedWith"]
-        )
-        df = df[df["LanguageHaveWorkedWith"].str.contains("Python")]
-        sf = df["Age"].dropna().value_counts(normalize=True) * 100
-        df = pd.DataFrame({"Age": sf.index, "percentage": sf.values})
-        c1, c2 = st.columns(2)
+        df = self.results(13)["ages"]
+        c1, c2 = self.st.columns(2)
 
         with c2:
-            fig = px.bar(
-                df,
-                x="Age",
-                y="percentage",
-                labels={
-                    "Age": "Age",
-                    "percentage": "Percentage",
-                },
-                title="Respondents by Age Group concerning only Python",
+            self.show_plotly(
+                13,
+                "bar",
+                lambda: px.bar(
+                    df,
+                    x="Age",
+                    y="percentage",
+                    labels={
+                        "Age": "Age",
+                        "percentage": "Percentage",
+                    },
+                    title="Respondents by Age Group concerning only Python",
+                ),
             )
-            st.write(fig)
 
         with c1:
-            fig1 = px.line(
-                df,
-                x="Age",
-                y="percentage",
-                labels={
-                    "Age": "Age",
-                    "percentage": "Percentage",
-                },
-                title="Respondents by Age Group concerning only Python",
+            self.show_plotly(
+                13,
+                "line",
+                lambda: px.line(
+                    df,
+                    x="Age",
+                    y="percentage",
+                    labels={
+                        "Age": "Age",
+                        "percentage": "Percentage",
+                    },
+                    title="Respondents by Age Group concerning only Python",
+                ),
             )
-            st.write(fig1)
+
+
+def table_figure(df):
+    """Return a plotly table of a Dataframe.
+
+    Args:
+        df (pd.DataFrame): The rows to show
+
+    Returns:
+        go.Figure: The table
+    """
+    import plotly.graph_objects as go  # type: ignore
+
+    return go.Figure(
+        data=[
+            go.Table(
+                header=dict(
+                    values=list(df.columns),
+                    fill_color="paleturquoise",
+                    align="left",
+                ),
+                cells=dict(
+                    values=df.transpose().values.tolist(),
+                    fill_color="lavender",
+                    align="left",
+                ),
+            )
+        ]
+    )
+
+
+def statistics_table(df):
+    """Return salary statistics rounded for display.
+
+    Args:
+        df (pd.DataFrame): A group column and the statistics of salaries.py
+
+    Returns:
+        pd.DataFrame: The statistics rounded to 2 decimals
+    """
+    from salaries import PERCENTILES
+
+    df = df.copy()
+    columns = [*PERCENTILES.values(), "trimmed_mean"]
+    df[columns] = df[columns].astype("float64").round(2)
+    return df
+
+
+QUESTION_METHODS = {
+    1: "display_question_one",
+    2: "display_question_two",
+    3: "display_question_three",
+    4: "display_question_four",
+    5: "display_question_five",
+    6: "display_question_six",
+    7: "display_question_seven",
+    8: "display_question_eight",
+    9: "display_question_nine",
+    10: "display_question_ten",
+    11: "display_question_eleven",
+    12: "display_question_twelve",
+    13: "display_question_thirteen",
+}
+
+
+def display_question(number: int, aggregates=None, filters: tuple = (), output=None):
+    """Display the page of a question.
+
+    Args:
+        number (int): The question number
+        aggregates (optional): The aggregates source. Defaults to the shared dataset.
+        filters (tuple): The filters of the respondents, see filters.normalize().
+            They only apply to the shared dataset.
+        output (optional): Where the page is displayed. Defaults to Streamlit.
+    """
+    with span(number, "display"):
+        plots = MakePlots(aggregates, filters, output)
+        if filters and plots.aggregates.rows == 0:
+            plots.st.info("No respondent matches the filters.")
+            return
+        getattr(plots, QUESTION_METHODS[number])()
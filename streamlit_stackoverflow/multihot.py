@@ -0,0 +1,151 @@
+"""Multi-hot indexes of the multi-select survey columns.
+
+Columns such as ``LanguageHaveWorkedWith`` hold every selected option joined
+by semicolons. They are tokenized once, per distinct answer, into a boolean
+matrix with one row per respondent and one column per option, so asking who
+selected an option is a column lookup instead of a substring scan.
+"""
+import numpy as np
+import pandas as pd  # type: ignore
+
+
+class MultiHotIndex:
+    """Responsible to answer which respondents selected each option of a column."""
+
+    def __init__(self, tokens: list, matrix: np.ndarray, answered: np.ndarray):
+        self.tokens = tokens
+        self.matrix = matrix
+        self.answered = answered
+        self._positions = {token: i for i, token in enumerate(tokens)}
+
+    @classmethod
+    def from_series(cls, series: pd.Series, sep: str = ";") -> "MultiHotIndex":
+        """Tokenize a multi-select column.
+
+        Args:
+            series (pd.Series): The semicolon-joined answers, preferably categorical
+            sep (str): The separator of the options
+
+        Returns:
+            MultiHotIndex: The index of the column
+        """
+        values = series.astype("category")
+        answers = [answer.split(sep) for answer in values.cat.categories]
+        tokens = sorted({token for answer in answers for token in answer})
+        positions = {token: i for i, token in enumerate(tokens)}
+
+        # one row per distinct answer, the last one is for missing answers
+        by_answer = np.zeros((len(answers) + 1, len(tokens)), dtype=bool)
+        for row, answer in enumerate(answers):
+            by_answer[row, [positions[token] for token in answer]] = True
+
+        codes = values.cat.codes.to_numpy()
+        # column-major, so the mask of an option is contiguous
+        matrix = np.asfortranarray(by_answer[codes])
+        return cls(tokens, matrix, codes != -1)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._positions
+
+    def mask(self, token: str) -> np.ndarray:
+        """Return which respondents selected an option.
+
+        Args:
+            token (str): The option, e.g. "Python"
+
+        Returns:
+            np.ndarray: A boolean mask with one entry per respondent
+        """
+        if token not in self._positions:
+            return np.zeros(len(self.answered), dtype=bool)
+        return self.matrix[:, self._positions[token]]
+
+    def any(self, tokens: list) -> np.ndarray:
+        """Return which respondents selected at least one of the options."""
+        positions = [self._positions[token] for token in tokens if token in self]
+        return self.matrix[:, positions].any(axis=1)
+
+    def all(self, tokens: list) -> np.ndarray:
+        """Return which respondents selected every one of the options."""
+        if any(token not in self for token in tokens):
+            return np.zeros(len(self.answered), dtype=bool)
+        positions = [self._positions[token] for token in tokens]
+        return self.matrix[:, positions].all(axis=1)
+
+    def group(self, groups: dict) -> "MultiHotIndex":
+        """Return the index of groups of options, e.g. roles grouped by function.
+
+        A respondent is in a group when they selected at least one of its options.
+
+        Args:
+            groups (dict): The group of each option, options that are missing
+                keep their own name
+
+        Returns:
+            MultiHotIndex: The index with one column per group
+        """
+        names = [groups.get(token, token) for token in self.tokens]
+        group_tokens = sorted(set(names))
+        positions = {group: i for i, group in enumerate(group_tokens)}
+        membership = np.zeros((len(self.tokens), len(group_tokens)), dtype=np.int32)
+        membership[np.arange(len(names)), [positions[name] for name in names]] = 1
+
+        matrix = np.asfortranarray(self.matrix.astype(np.int32) @ membership > 0)
+        return MultiHotIndex(group_tokens, matrix, self.answered)
+
+    def take(self, rows: np.ndarray) -> "MultiHotIndex":
+        """Return the index of some of the respondents.
+
+        Args:
+            rows (np.ndarray): A boolean mask of the respondents to keep
+
+        Returns:
+            MultiHotIndex: The index of the kept respondents, with every option
+        """
+        return MultiHotIndex(
+            self.tokens, np.asfortranarray(self.matrix[rows]), self.answered[rows]
+        )
+
+    def counts(self, rows: np.ndarray = None) -> pd.Series:
+        """Return how many respondents selected each option, the most selected first.
+
+        Args:
+            rows (np.ndarray, optional): A boolean mask of the respondents to count.
+                Defaults to every respondent.
+
+        Returns:
+            pd.Series: The number of respondents by option
+        """
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        counts = pd.Series(matrix.sum(axis=0), index=self.tokens)
+        return counts.sort_values(ascending=False)
+
+    def percentage(self, token: str) -> float:
+        """Return the percentage of the respondents who answered and selected an option.
+
+        Args:
+            token (str): The option, e.g. "Python"
+
+        Returns:
+            float: The percentage, from 0 to 100
+        """
+        answered = self.answered.sum()
+        if not answered:
+            return 0.0
+        return self.mask(token).sum() / answered * 100
+
+
+def multihot_index(dataset, column: str = "LanguageHaveWorkedWith") -> MultiHotIndex:
+    """Return the multi-hot index of a column of the shared dataset, built on the first call.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+        column (str): The multi-select column
+
+    Returns:
+        MultiHotIndex: The index of the column
+    """
+    return dataset.memo(
+        ("multihot", column),
+        lambda: MultiHotIndex.from_series(dataset.frame[column]),
+    )
@@ -0,0 +1,66 @@
+"""Numbers of the survey answers that are written as text.
+
+YearsCodePro is a whole number of years, except for the answers "Less than
+1 year" and "More than 50 years", which are given the number of YEARS_TEXT. A column is parsed once per category, not once per
+row, into a compact int8 array where MISSING marks the rows without a
+number, and the array of the shared dataset is built once per version.
+"""
+import numpy as np
+import pandas as pd  # type: ignore
+
+# the number of the rows that did not answer, or answered something else
+MISSING = -1
+
+# answers that are not numbers: their number of years
+YEARS_TEXT = {"Less than 1 year": 0, "More than 50 years": 51}
+
+# column: number of its answers that are not numbers, for the columns of the
+# manifest in schema.py
+NUMERIC_COLUMNS = {
+    "YearsCodePro": YEARS_TEXT,
+}
+
+
+def parse_numbers(series: pd.Series, text: dict = None) -> np.ndarray:
+    """Return the numbers of a column of whole numbers written as text.
+
+    Args:
+        series (pd.Series): The answers, preferably categorical
+        text (dict, optional): The number of the answers that are not numbers
+
+    Raises:
+        ValueError: When a number does not fit in an int8
+
+    Returns:
+        np.ndarray: The number of each row as int8, MISSING when there is none
+    """
+    values = series.astype("category")
+    categories = pd.Series(values.cat.categories.astype(str))
+    numbers = pd.to_numeric(categories, errors="coerce")
+    numbers = numbers.where(numbers == numbers.round())
+    for answer, number in (text or {}).items():
+        numbers[categories == answer] = number
+
+    info = np.iinfo(np.int8)
+    if ((numbers < 0) | (numbers > info.max)).any():
+        raise ValueError(f"{series.name} has numbers out of the int8 range")
+
+    # the last number is the one of the missing values, whose code is -1
+    table = np.append(numbers.fillna(MISSING).to_numpy(), MISSING).astype(np.int8)
+    return table[values.cat.codes.to_numpy()]
+
+
+def numeric_column(dataset, column: str) -> np.ndarray:
+    """Return the numbers of a column of the shared dataset, parsed on the first call.
+
+    Args:
+        dataset (SurveyDataset): The shared dataset
+        column (str): One of NUMERIC_COLUMNS
+
+    Returns:
+        np.ndarray: The number of each row, see parse_numbers()
+    """
+    return dataset.memo(
+        ("numeric", column),
+        lambda: parse_numbers(dataset.frame[column], NUMERIC_COLUMNS[column]),
+    )
@@ -0,0 +1,158 @@
+"""Pages of the app, registered by name and imported on the first visit.
+
+A page is a function of a module that is only imported when the page is first
+opened, so the Welcome page renders without pandas, seaborn, matplotlib or
+pywaffle, and each question only imports the plotting stack it draws with.
+
+Compare the import time of each page with:
+
+    python streamlit_stackoverflow/pages.py
+"""
+import argparse
+import importlib
+import os
+import re
+import subprocess
+import sys
+from typing import NamedTuple
+
+# modules reported by the import time report
+PLOTTING_MODULES = ("pandas", "plotly.express", "matplotlib", "seaborn", "pywaffle")
+
+
+class Page(NamedTuple):
+    """A page, rendered by a function of a module imported on the first visit."""
+
+    module: str
+    function: str
+    # the question number passed to the function, None for the other pages
+    question: int = None
+    # the plotting modules the page draws with
+    requires: tuple = ()
+
+
+# the matplotlib charts are drawn by the render pool, see rendering.py
+PLOTLY = ("plotly.express", "plotly.graph_objects")
+
+QUESTION_REQUIRES = {
+    1: (),
+    2: (),
+    3: PLOTLY,
+    4: ("plotly.graph_objects",),
+    5: PLOTLY,
+    6: (),
+    7: ("plotly.graph_objects",),
+    8: ("plotly.express",),
+    9: PLOTLY,
+    10: PLOTLY,
+    11: ("plotly.express",),
+    12: ("plotly.express",),
+    13: ("plotly.express",),
+}
+
+PAGES = {"Welcome": Page("welcome", "display_welcome")}
+
+
+def register(
+    name: str, module: str, function: str, question: int = None, requires: tuple = ()
+):
+    """Register a page, nothing is imported until the page is loaded.
+
+    Args:
+        name (str): The name shown in the sidebar
+        module (str): The module of the page
+        function (str): The function of the module that renders the page
+        question (int, optional): The question number passed to the function
+        requires (tuple): The plotting modules the page draws with
+    """
+    PAGES[name] = Page(module, function, question, requires)
+
+
+for _number, _requires in QUESTION_REQUIRES.items():
+    register(
+        f"Question {_number}", "make_plots", "display_question", _number, _requires
+    )
+
+
+def load_page(name: str):
+    """Return the function that renders a page, importing its modules on the first call.
+
+    Args:
+        name (str): The name of the page
+
+    Raises:
+        KeyError: When the page is not registered
+
+    Returns:
+        callable: The function of the page. Question pages take the question
+            number and the aggregates source.
+    """
+    page = PAGES[name]
+    for module in page.requires:
+        importlib.import_module(module)
+    return getattr(importlib.import_module(page.module), page.function)
+
+
+def import_report(name: str) -> dict:
+    """Measure the imports of a page in a fresh interpreter, with ``-X importtime``.
+
+    Streamlit is imported first, so only the imports of the page are counted.
+
+    Args:
+        name (str): The name of the page
+
+    Returns:
+        dict: The import time of the page in milliseconds and which plotting
+            modules it imported
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = (
+        f"import sys; sys.path.insert(0, {here!r}); import streamlit; "
+        f"import pages; pages.load_page({name!r}); "
+        f"print(','.join(m for m in {PLOTTING_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # top-level lines are the ones without indentation after the last "|"
+    cumulative = 0
+    after_streamlit = False
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        if match is None or match.group(2) != " ":
+            continue
+        if after_streamlit:
+            cumulative += int(match.group(1))
+        elif match.group(3) == "streamlit":
+            after_streamlit = True
+
+    imported = result.stdout.strip()
+    return {
+        "page": name,
+        "import_ms": cumulative / 1000,
+        "modules": imported.split(",") if imported else [],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the import time and the plotting modules of each page."
+    )
+    parser.add_argument("pages", nargs="*", help="pages to measure, defaults to all")
+    args = parser.parse_args()
+
+    print(f"{'page':<14}{'import ms':>12}  plotting modules")
+    for name in args.pages or PAGES:
+        report = import_report(name)
+        print(
+            f"{report['page']:<14}{report['import_ms']:>12,.1f}"
+            f"  {', '.join(report['modules']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
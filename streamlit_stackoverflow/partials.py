@@ -0,0 +1,490 @@
+"""Mergeable partial aggregates of the survey.
+
+Every question is answered from a few counts and sums over the survey
+columns. survey_partials() computes them over the whole survey, or over each
+chunk of a file too big for memory, and merge() adds the partials of two
+chunks. Both ways give the same answers: counts are integers and salaries are
+whole numbers, so their sums do not depend on the order they are added in.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+from labels import DEVTYPE, KEEP, LabelMap
+from multihot import MultiHotIndex
+from numeric import MISSING, NUMERIC_COLUMNS, parse_numbers
+from salaries import buckets, grouped_sketch, sketch
+
+PROFESSIONAL = "I am a developer by profession"
+
+SALARY = "ConvertedCompYearly"
+
+
+def value_counts(series: pd.Series) -> pd.Series:
+    """Return how many times each value appears, missing values excluded.
+
+    Args:
+        series (pd.Series): Any column of the survey
+
+    Returns:
+        pd.Series: The count of each value, indexed by value in sorted order
+    """
+    counts = series.value_counts(sort=False)
+    counts = counts[counts > 0]
+    counts.index = counts.index.astype(object)
+    return counts.astype("int64").sort_index()
+
+
+def grouped_salaries(salaries: pd.Series, keys: pd.Series, how: str) -> pd.Series:
+    """Return an aggregate of the salaries by value of another column.
+
+    Args:
+        salaries (pd.Series): The salaries, as float64 without missing values
+        keys (pd.Series): The column to group by, aligned with the salaries
+        how (str): "sum", "min" or "max"
+
+    Returns:
+        pd.Series: The aggregate by value in sorted order
+    """
+    result = salaries.groupby(keys.astype(object)).agg(how)
+    result.index = result.index.astype(object)
+    return result.sort_index()
+
+
+class SurveyPartials:
+    """Responsible to hold the counts and sums the questions are answered from.
+
+    The partials are Series indexed by value, or by (group, value) for the
+    histograms and salary sketches, and scalar totals. They are merged by
+    adding them.
+    """
+
+    def __init__(self, series: dict, totals: dict):
+        self.series = series
+        self.totals = totals
+        self._top = {}
+
+    def __getitem__(self, name: str):
+        if name in self.totals:
+            return self.totals[name]
+        return self.series[name]
+
+    def top(self, name: str, k: int) -> pd.Series:
+        """Return the k biggest counts of a partial, computed once per partials.
+
+        The partials of each filter state are their own object, so the top
+        groups are kept per filter state.
+
+        Args:
+            name (str): The name of the counts, e.g. "Country" or "paid.Country"
+            k (int): The number of groups
+
+        Returns:
+            pd.Series: The counts, as returned by top()
+        """
+        key = (name, k)
+        if key not in self._top:
+            self._top[key] = top(self.series[name], k)
+        return self._top[key]
+
+    def merge(self, other: "SurveyPartials") -> "SurveyPartials":
+        """Return the partials of the rows of both partials.
+
+        Args:
+            other (SurveyPartials): The partials of other rows
+
+        Returns:
+            SurveyPartials: The merged partials
+        """
+        series = {}
+        for name in self.series.keys() | other.series.keys():
+            parts = [
+                partial.series[name]
+                for partial in (self, other)
+                if name in partial.series
+            ]
+            merged = pd.concat(parts)
+            series[name] = merged.groupby(
+                level=list(range(merged.index.nlevels)), sort=True
+            ).sum()
+        totals = {
+            name: self.totals.get(name, 0) + other.totals.get(name, 0)
+            for name in self.totals.keys() | other.totals.keys()
+        }
+        return SurveyPartials(series, totals)
+
+
+def survey_partials(
+    frame: pd.DataFrame,
+    roles: MultiHotIndex = None,
+    languages: MultiHotIndex = None,
+    years: np.ndarray = None,
+) -> SurveyPartials:
+    """Compute the partial aggregates of some rows of the survey.
+
+    Args:
+        frame (pd.DataFrame): The rows, with the columns of the survey file
+        roles (MultiHotIndex, optional): The grouped DevType index of the rows.
+            Built from the rows when missing.
+        languages (MultiHotIndex, optional): The LanguageHaveWorkedWith index
+            of the rows. Built from the rows when missing.
+        years (np.ndarray, optional): The YearsCodePro numbers of the rows, see
+            numeric.py. Parsed from the rows when missing.
+
+    Returns:
+        SurveyPartials: The partials of the rows
+    """
+    if roles is None:
+        roles = MultiHotIndex.from_series(frame["DevType"]).group(DEVTYPE)
+    if languages is None:
+        languages = MultiHotIndex.from_series(frame["LanguageHaveWorkedWith"])
+    if years is None:
+        years = parse_numbers(frame["YearsCodePro"], NUMERIC_COLUMNS["YearsCodePro"])
+
+    professional = (frame["MainBranch"] == PROFESSIONAL).to_numpy()
+    python = languages.mask("Python")
+    salaries = frame[SALARY].astype("float64")
+    paid = salaries.notna().to_numpy()
+
+    # years of experience of each branch, for the rows that answered both
+    experienced = (years != MISSING) & frame["MainBranch"].notna().to_numpy()
+    experience = pd.DataFrame(
+        {
+            "MainBranch": frame.loc[experienced, "MainBranch"].astype(object),
+            "years": years[experienced].astype("int64"),
+        }
+    )
+
+    answered_roles = professional & roles.answered
+    countries = frame["Country"]
+
+    # one salary per language of each paid respondent
+    respondents, positions = np.nonzero(languages.matrix[paid])
+    language_salaries = pd.Series(salaries[paid].to_numpy()[respondents])
+    language_names = pd.Series(np.array(languages.tokens, dtype=object)[positions])
+
+    series = {
+        "MainBranch": value_counts(frame["MainBranch"]),
+        "Country": value_counts(countries),
+        "EdLevel": value_counts(frame["EdLevel"]),
+        "OpSys": value_counts(frame["OpSys"]),
+        "Age": value_counts(frame["Age"]),
+        "years.histogram": experience.value_counts(sort=False)
+        .sort_index()
+        .astype("int64"),
+        "professional.DevType": roles.counts(answered_roles).sort_index(),
+        "professional.EdLevel": value_counts(frame.loc[professional, "EdLevel"]),
+        "professional.OrgSize": value_counts(frame.loc[professional, "OrgSize"]),
+        "paid.Country": value_counts(countries[paid]),
+        "paid.Country.salary": grouped_salaries(salaries[paid], countries[paid], "sum"),
+        "python.Country": value_counts(countries[python]),
+        "python.paid.Country": value_counts(countries[python & paid]),
+        "python.paid.Country.salary": grouped_salaries(
+            salaries[python & paid], countries[python & paid], "sum"
+        ),
+        "salary.sketch": sketch(salaries[paid]),
+        "paid.Country.sketch": grouped_sketch(salaries[paid], countries[paid]),
+        "python.paid.Country.sketch": grouped_sketch(
+            salaries[python & paid], countries[python & paid]
+        ),
+        "paid.language.sketch": grouped_sketch(language_salaries, language_names),
+        "python.OpSys": value_counts(frame.loc[python, "OpSys"]),
+        "python.Age": value_counts(frame.loc[python, "Age"]),
+    }
+    totals = {
+        "rows": len(frame),
+        "MainBranch.missing": int(frame["MainBranch"].isna().sum()),
+        "EdLevel.missing": int(frame["EdLevel"].isna().sum()),
+        "salary.sum": float(salaries[paid].sum()),
+        "salary.count": int(paid.sum()),
+        "professional.DevType.answered": int(answered_roles.sum()),
+        "languages.answered": int(languages.answered.sum()),
+        "languages.python": int(python.sum()),
+        "python.salary.sum": float(salaries[python & paid].sum()),
+        "python.salary.count": int((python & paid).sum()),
+    }
+    return SurveyPartials(series, totals)
+
+
+# the columns counted by value, kept as integer codes by SurveyCodes
+CODED_COLUMNS = ("MainBranch", "Country", "EdLevel", "OpSys", "Age", "OrgSize")
+
+
+def _sorted_codes(codes: np.ndarray, labels) -> tuple:
+    """Return codes into the labels in sorted order, so the counts come sorted."""
+    labels = pd.Index(labels, dtype=object)
+    order = labels.argsort()
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    codes = np.asarray(codes, dtype=np.int64)
+    return np.where(codes >= 0, ranks[codes], -1), labels.to_numpy()[order]
+
+
+def _present(counts: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(counts)
+
+
+class SurveyCodes:
+    """Responsible to compute the partials of any rows of the survey from integer codes.
+
+    The columns are encoded once, as category codes, salary sketch buckets
+    and the multi-hot indexes, so the partials of a mask of rows are counted
+    with np.bincount over the codes of the rows, without copying the rows.
+    partials(mask) gives the same partials as survey_partials() of the rows
+    of the mask.
+    """
+
+    def __init__(
+        self,
+        frame: pd.DataFrame,
+        roles: MultiHotIndex,
+        languages: MultiHotIndex,
+        years: np.ndarray,
+    ):
+        self.codes = {}
+        self.labels = {}
+        for column in CODED_COLUMNS:
+            values = frame[column].astype("category")
+            self.codes[column], self.labels[column] = _sorted_codes(
+                values.cat.codes.to_numpy(), values.cat.categories
+            )
+        self.roles = roles
+        self.languages = languages
+        # the code of each language in sorted order, by position in the index
+        self.language_codes, self.language_labels = _sorted_codes(
+            np.arange(len(languages.tokens)), languages.tokens
+        )
+        self.years = years.astype(np.int64)
+        self.professional = (frame["MainBranch"] == PROFESSIONAL).to_numpy()
+        self.python = languages.mask("Python")
+        self.salaries = frame[SALARY].astype("float64").to_numpy()
+        self.paid = ~np.isnan(self.salaries)
+        # the sketch bucket of each paid salary, as a code into bucket_keys
+        self.bucket_keys, bucket_codes = np.unique(
+            buckets(self.salaries[self.paid]), return_inverse=True
+        )
+        self.bucket_codes = np.full(len(frame), -1, dtype=np.int64)
+        self.bucket_codes[self.paid] = bucket_codes
+
+    def _counts(self, column: str, rows: np.ndarray, name: str = None) -> pd.Series:
+        labels = self.labels[column]
+        # shifted by one so the missing values are counted apart, in bucket 0
+        counts = np.bincount(self.codes[column][rows] + 1, minlength=len(labels) + 1)
+        present = _present(counts[1:])
+        return pd.Series(
+            counts[present + 1].astype("int64"),
+            index=pd.Index(labels[present], dtype=object),
+            name=name or column,
+        )
+
+    def _salary_sums(self, paid: np.ndarray) -> pd.Series:
+        codes = self.codes["Country"][paid]
+        selected = codes >= 0
+        labels = self.labels["Country"]
+        counts = np.bincount(codes[selected], minlength=len(labels))
+        sums = np.bincount(
+            codes[selected],
+            weights=self.salaries[paid][selected],
+            minlength=len(labels),
+        )
+        present = _present(counts)
+        return pd.Series(
+            sums[present].astype("float64"),
+            index=pd.Index(labels[present], dtype=object, name="Country"),
+            name=SALARY,
+        )
+
+    def _pairs(self, groups, group_labels, seconds, second_labels, names) -> pd.Series:
+        """Return the counts of (group, second) code pairs, as grouped_sketch().
+
+        Both labels are in sorted order, so the pairs come sorted.
+        """
+        size = len(second_labels)
+        counts = np.bincount(
+            groups * size + seconds, minlength=len(group_labels) * size
+        )
+        present = _present(counts)
+        index = pd.MultiIndex(
+            levels=[pd.Index(group_labels, dtype=object), second_labels],
+            codes=[present // size, present % size],
+            names=names,
+        ).remove_unused_levels()
+        return pd.Series(counts[present].astype("int64"), index=index)
+
+    def _sketches(self, paid: np.ndarray) -> pd.Series:
+        codes = self.codes["Country"][paid]
+        selected = codes >= 0
+        return self._pairs(
+            codes[selected],
+            self.labels["Country"],
+            self.bucket_codes[paid][selected],
+            self.bucket_keys,
+            ["group", "bucket"],
+        )
+
+    def partials(self, rows: np.ndarray) -> SurveyPartials:
+        """Compute the partial aggregates of some rows.
+
+        Args:
+            rows (np.ndarray): A boolean mask of the rows
+
+        Returns:
+            SurveyPartials: The partials of the rows, as survey_partials()
+        """
+        # the positions of the rows, so every count only reads the matching rows
+        rows = np.flatnonzero(rows)
+        paid = rows[self.paid[rows]]
+        python = rows[self.python[rows]]
+        python_paid = python[self.paid[python]]
+        professional = rows[self.professional[rows]]
+        answered_roles = professional[self.roles.answered[professional]]
+
+        branches = self.codes["MainBranch"][rows]
+        years = self.years[rows]
+        experienced = (years != MISSING) & (branches >= 0)
+        experience = self._pairs(
+            branches[experienced],
+            self.labels["MainBranch"],
+            years[experienced],
+            np.arange(max(self.years.max(initial=0), 0) + 1, dtype=np.int64),
+            ["MainBranch", "years"],
+        )
+
+        respondents, positions = np.nonzero(self.languages.matrix[paid])
+        paid_buckets = self.bucket_codes[paid]
+        sketch_counts = np.bincount(paid_buckets, minlength=len(self.bucket_keys))
+        present = _present(sketch_counts)
+
+        series = {
+            "MainBranch": self._counts("MainBranch", rows),
+            "Country": self._counts("Country", rows),
+            "EdLevel": self._counts("EdLevel", rows),
+            "OpSys": self._counts("OpSys", rows),
+            "Age": self._counts("Age", rows),
+            "years.histogram": experience,
+            "professional.DevType": self.roles.counts(answered_roles).sort_index(),
+            "professional.EdLevel": self._counts("EdLevel", professional),
+            "professional.OrgSize": self._counts("OrgSize", professional),
+            "paid.Country": self._counts("Country", paid),
+            "paid.Country.salary": self._salary_sums(paid),
+            "python.Country": self._counts("Country", python),
+            "python.paid.Country": self._counts("Country", python_paid),
+            "python.paid.Country.salary": self._salary_sums(python_paid),
+            "salary.sketch": pd.Series(
+                sketch_counts[present].astype("int64"),
+                index=pd.Index(self.bucket_keys[present]),
+            ),
+            "paid.Country.sketch": self._sketches(paid),
+            "python.paid.Country.sketch": self._sketches(python_paid),
+            "paid.language.sketch": self._pairs(
+                self.language_codes[positions],
+                self.language_labels,
+                paid_buckets[respondents],
+                self.bucket_keys,
+                ["group", "bucket"],
+            ),
+            "python.OpSys": self._counts("OpSys", python),
+            "python.Age": self._counts("Age", python),
+        }
+        totals = {
+            "rows": len(rows),
+            "MainBranch.missing": int(np.count_nonzero(branches < 0)),
+            "EdLevel.missing": int(np.count_nonzero(self.codes["EdLevel"][rows] < 0)),
+            "salary.sum": float(self.salaries[paid].sum()),
+            "salary.count": len(paid),
+            "professional.DevType.answered": len(answered_roles),
+            "languages.answered": int(np.count_nonzero(self.languages.answered[rows])),
+            "languages.python": len(python),
+            "python.salary.sum": float(self.salaries[python_paid].sum()),
+            "python.salary.count": len(python_paid),
+        }
+        return SurveyPartials(series, totals)
+
+
+def parallel_partials(frame: pd.DataFrame, workers: int) -> SurveyPartials:
+    """Compute the partial aggregates of the survey, one range of rows per process.
+
+    Args:
+        frame (pd.DataFrame): The rows, with the columns of the survey file
+        workers (int): The number of processes. With 1, the partials are
+            computed in the calling thread.
+
+    Returns:
+        SurveyPartials: The partials of the rows
+    """
+    if workers <= 1 or len(frame) < workers:
+        return survey_partials(frame)
+
+    bounds = np.linspace(0, len(frame), workers + 1).astype(int)
+    parts = [frame.iloc[start:stop] for start, stop in zip(bounds, bounds[1:])]
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        partials = list(executor.map(survey_partials, parts))
+    return reduce(lambda merged, partial: merged.merge(partial), partials)
+
+
+def ranked(counts: pd.Series) -> pd.Series:
+    """Return counts from the biggest to the smallest, ties in the order of their value.
+
+    Args:
+        counts (pd.Series): Counts indexed by value
+
+    Returns:
+        pd.Series: The sorted counts
+    """
+    return counts.sort_index(kind="mergesort").sort_values(
+        ascending=False, kind="mergesort"
+    )
+
+
+def top(counts: pd.Series, k: int) -> pd.Series:
+    """Return the k biggest counts, in the order of ranked().
+
+    The k-th biggest count is found by a partial selection, so only the
+    groups that reach it are sorted.
+
+    Args:
+        counts (pd.Series): Counts indexed by value
+        k (int): The number of groups
+
+    Returns:
+        pd.Series: The counts of the top k groups, from the biggest
+    """
+    if k <= 0:
+        return counts.iloc[0:0]
+    if len(counts) > k:
+        values = counts.to_numpy()
+        kth = values[np.argpartition(-values, k - 1)[k - 1]]
+        counts = counts[values >= kth]
+    return ranked(counts).iloc[0:k]
+
+
+def relabel(counts: pd.Series, label: LabelMap, missing: int = 0):
+    """Return the counts of the labels of the values, summed by label.
+
+    The labels are the ones recode() gives to the rows of the survey.
+
+    Args:
+        counts (pd.Series): Counts indexed by value of the column of the label
+        label (LabelMap): The label column, one of labels.LABELS
+        missing (int): The number of missing values
+
+    Returns:
+        pd.Series: The counts indexed by label in sorted order, without the
+            values whose label is None
+    """
+    labels = [label.label_of(value) for value in counts.index]
+    default = None if label.default is KEEP else label.default
+    by_label = counts.groupby(pd.Index(labels, dtype=object)).sum()
+    if default is not None and missing:
+        by_label[default] = by_label.get(default, 0) + missing
+    return by_label[by_label.index.notna()].sort_index()
+
+
+def mean(total: float, count: int) -> float:
+    """Return a sum divided by a count, NaN for an empty count."""
+    return total / count if count else np.nan
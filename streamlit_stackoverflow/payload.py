@@ -0,0 +1,135 @@
+"""Budget of the bytes a page sends to the browser.
+
+A page sends its plotly figures as JSON over the websocket and its
+matplotlib charts as images the browser then downloads. The figures are kept
+small where it costs nothing (see figures.plotly_json()), and each page has
+a budget, SURVEY_PAGE_BUDGET bytes (0 disables it): once a figure would go
+over it, the following images are drawn at a lower resolution, down to
+MIN_DPI, and the plotly figures are sent without their template. The reduced figures are cached like the others.
+
+Measure the bytes of every page, from the repository root, with:
+
+    python streamlit_stackoverflow/payload.py --output payload.json
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+PAGE_BUDGET = int(os.environ.get("SURVEY_PAGE_BUDGET", str(256 * 1024)))
+
+# the lowest resolution an image is reduced to
+MIN_DPI = 50
+
+
+class PageBudget:
+    """Responsible to count the bytes of the figures of one page against its budget."""
+
+    def __init__(self, limit: int = None):
+        self.limit = PAGE_BUDGET if limit is None else limit
+        self.used = 0
+
+    def fits(self, size: int) -> bool:
+        """Return whether a figure of some bytes fits in what is left of the budget.
+
+        Args:
+            size (int): The bytes of the figure
+
+        Returns:
+            bool: True when it fits or when there is no budget
+        """
+        return self.limit <= 0 or self.used + size <= self.limit
+
+    def charge(self, size: int):
+        """Count the bytes of a figure sent to the browser.
+
+        Args:
+            size (int): The bytes of the figure
+        """
+        self.used += size
+
+
+def page_bytes(name: str) -> dict:
+    """Return the bytes a page sends to the browser, measured with the Streamlit test app.
+
+    Args:
+        name (str): The name of the page, one of pages.PAGES
+
+    Raises:
+        RuntimeError: When the page fails
+
+    Returns:
+        dict: The bytes of the page elements sent over the websocket, of
+            its plotly figures among them, of its images and the total sent
+    """
+    from streamlit.testing.v1 import AppTest
+
+    import instrumentation
+
+    instrumentation.enable()
+    script = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py"
+    )
+    app = AppTest.from_file(script, default_timeout=600)
+    app.run()
+    mark = instrumentation.recorder.spans
+    app.selectbox[0].select(name).run()
+    if app.exception:
+        raise RuntimeError(f"The page {name} failed: {app.exception[0].value}")
+
+    displays = [
+        record
+        for record in instrumentation.recorder.since(mark)
+        if record["phase"] == "display"
+    ]
+    # the sidebar only shows the debug timings
+    websocket = sum(element.proto.ByteSize() for element in _elements(app.main))
+    images = sum(record["image_bytes"] for record in displays)
+    return {
+        "websocket": websocket,
+        "plotly": sum(record["plotly_bytes"] for record in displays),
+        "images": images,
+        "total": websocket + images,
+    }
+
+
+def _elements(node):
+    """Yield the elements of the tree of a test app."""
+    children = getattr(node, "children", None)
+    if children is None:
+        if getattr(node, "proto", None) is not None:
+            yield node
+        return
+    for child in children.values():
+        yield from _elements(child)
+
+
+def main():
+    from pages import PAGES
+
+    parser = argparse.ArgumentParser(
+        description="Measure the bytes each page sends to the browser."
+    )
+    parser.add_argument("--output", help="write the measures to this JSON file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    measures = {}
+    for name in PAGES:
+        start = time.perf_counter()
+        measures[name] = page_bytes(name)
+        measures[name]["seconds"] = round(time.perf_counter() - start, 3)
+        print(
+            f"{name:<12} websocket {measures[name]['websocket']:>9,} B"
+            f"  plotly {measures[name]['plotly']:>9,} B"
+            f"  images {measures[name]['images']:>9,} B"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(measures, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Prefetch of the questions a visitor is likely to open next.
+
+Visitors mostly step through the questions in order, so while a page is
+read, the next questions are computed in a background thread: their
+aggregates go to the memo of their aggregates source and their figures to
+the figure cache, as if their pages had been displayed. The next page is
+then served from the caches, even when they were cold.
+
+Prefetching is bounded per process: one thread, and at most MAX_PENDING
+questions waiting for it, the oldest ones are cancelled first. When a
+visitor moves to another page, their prefetches that are not ahead of it
+anymore are cancelled. Set SURVEY_PREFETCH to the number of questions
+prefetched after a page, 0 disables it, and SURVEY_PREFETCH_RENDER=0 to only
+compute their aggregates.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# the prefetches waiting for the thread, of every session
+MAX_PENDING = 8
+
+
+def _ignore(*args, **kwargs):
+    return None
+
+
+class _Discard:
+    """A page that shows nothing, its figures are only rendered into the cache."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def columns(self, spec) -> list:
+        count = spec if isinstance(spec, int) else len(spec)
+        return [_Discard() for _ in range(count)]
+
+    def __getattr__(self, name):
+        return _ignore
+
+
+class Prefetcher:
+    """Responsible to compute the questions after the displayed one in the background.
+
+    The prefetches of a question are keyed by its filters and the version of
+    its aggregates, and the recent ones are remembered, so a question is only
+    prefetched once per key.
+    """
+
+    def __init__(self, ahead: int = None, render: bool = None, remember: int = 256):
+        if ahead is None:
+            ahead = int(os.environ.get("SURVEY_PREFETCH", "2"))
+        if render is None:
+            render = os.environ.get("SURVEY_PREFETCH_RENDER", "1") != "0"
+        self.ahead = ahead
+        self.render = render
+        self.remember = remember
+        self._executor = None
+        self._pending = OrderedDict()
+        self._done = OrderedDict()
+        self._lock = threading.Lock()
+        self.prefetched = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="survey-prefetch"
+            )
+        return self._executor
+
+    def next_questions(self, page: str) -> list:
+        """Return the questions of the pages after a page, in the order of PAGES.
+
+        Args:
+            page (str): The name of the displayed page
+
+        Returns:
+            list: Up to ``ahead`` question numbers
+        """
+        from pages import PAGES
+
+        names = list(PAGES)
+        after = names[names.index(page) + 1 :] if page in PAGES else []
+        questions = [PAGES[name].question for name in after]
+        return [question for question in questions if question is not None][
+            : self.ahead
+        ]
+
+    def after(
+        self, page: str, aggregates=None, filters: tuple = (), owner=None
+    ) -> list:
+        """Prefetch the questions after the displayed page, cancelling the other ones.
+
+        Args:
+            page (str): The name of the displayed page
+            aggregates (optional): The aggregates source of the page. Defaults
+                to the shared dataset.
+            filters (tuple): The filters of the page, see filters.normalize()
+            owner (Hashable, optional): The session of the visitor, only their
+                own prefetches are cancelled
+
+        Returns:
+            list: The futures of the prefetches that were started
+        """
+        if self.ahead <= 0:
+            return []
+        if aggregates is None:
+            from dataset import survey_data
+
+            # a page that does not read the survey never waits for its load
+            dataset = survey_data.loaded()
+            if dataset is None:
+                return []
+            version = dataset.version
+        else:
+            version = aggregates.version
+        wanted = {
+            (number, filters, version): number for number in self.next_questions(page)
+        }
+
+        futures = []
+        with self._lock:
+            for key, (_, _, pending_owner) in list(self._pending.items()):
+                if pending_owner == owner and key not in wanted:
+                    self._cancel(key)
+            for key, number in wanted.items():
+                if key in self._pending or key in self._done:
+                    continue
+                cancel = threading.Event()
+                future = self._get_executor().submit(
+                    self._prefetch, key, number, aggregates, filters, cancel
+                )
+                self._pending[key] = (future, cancel, owner)
+                futures.append(future)
+            while len(self._pending) > MAX_PENDING:
+                self._cancel(next(iter(self._pending)))
+        return futures
+
+    def _cancel(self, key):
+        future, cancel, _ = self._pending.pop(key)
+        cancel.set()
+        future.cancel()
+        self.cancelled += 1
+
+    def _prefetch(self, key, number, aggregates, filters, cancel) -> bool:
+        try:
+            if cancel.is_set():
+                return False
+            from make_plots import MakePlots, display_question
+
+            with span(number, "prefetch"):
+                # the aggregates first, the figures only if still wanted
+                MakePlots(aggregates, filters).results(number)
+                if self.render and not cancel.is_set():
+                    display_question(number, aggregates, filters, output=_Discard())
+        except Exception:
+            logger.exception("The prefetch of question %s failed", number)
+            with self._lock:
+                self.failed += 1
+            return False
+        finally:
+            with self._lock:
+                # a cancelled key can already be pending again, for another prefetch
+                if key in self._pending and self._pending[key][1] is cancel:
+                    del self._pending[key]
+
+        with self._lock:
+            self._done[key] = True
+            while len(self._done) > self.remember:
+                self._done.popitem(last=False)
+            self.prefetched += 1
+        return True
+
+    def shutdown(self):
+        """Cancel the waiting prefetches and wait for the running one."""
+        with self._lock:
+            for key in list(self._pending):
+                self._cancel(key)
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """Return the counters of the prefetcher.
+
+        Returns:
+            dict: Pending, prefetched, cancelled and failed prefetches
+        """
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "prefetched": self.prefetched,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+            }
+
+
+prefetcher = Prefetcher()
+atexit.register(prefetcher.shutdown)
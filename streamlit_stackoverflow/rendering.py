@@ -0,0 +1,199 @@
+"""Off-thread rendering of the matplotlib charts.
+
+The Waffle and seaborn charts used to be drawn on the script thread through
+the global pyplot state, so concurrent sessions waited on each other. They are
+now drawn with the object-oriented Figure API in a pool of worker processes,
+each one with its own matplotlib state, and come back as image bytes.
+
+The number of workers is read from SURVEY_RENDER_WORKERS and defaults to the
+number of cores, up to MAX_WORKERS: each worker holds its own copy of
+matplotlib and seaborn, about 140 MB, and a few of them keep up with the
+charts of a server. With 0, the charts are drawn in the calling thread.
+"""
+import atexit
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# the default number of workers on hosts with more cores
+MAX_WORKERS = 4
+
+# same options as st.pyplot
+SAVEFIG_OPTIONS = {"dpi": 200, "bbox_inches": "tight"}
+
+
+def figure_image(fig, image_format: str = "png", dpi: int = None) -> bytes:
+    """Return a matplotlib figure saved as an image.
+
+    Args:
+        fig (matplotlib.figure.Figure): A figure created without pyplot
+        image_format (str): The image format, e.g. "png" or "svg"
+        dpi (int, optional): The resolution. Defaults to the one of st.pyplot.
+
+    Returns:
+        bytes: The image
+    """
+    options = dict(SAVEFIG_OPTIONS)
+    if dpi is not None:
+        options["dpi"] = dpi
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def waffle_figure(df) -> "Waffle":
+    """Make the Waffle chart of the percentage of each branch.
+
+    Args:
+        df (pd.DataFrame): The branches and their percentage
+
+    Returns:
+        Waffle: Waffle Chart, a matplotlib figure created without pyplot
+    """
+    from pywaffle import Waffle  # type: ignore
+
+    return Waffle(
+        rows=5,
+        values=df.Percentage,
+        title={"label": "Percentage of respondents by Activity", "loc": "left"},
+        labels=[
+            f"{x.MainBranchSimplified} ({round(x.Percentage, 2)}%)"
+            for x in df.itertuples()
+        ],
+        legend={"loc": "upper left", "bbox_to_anchor": (1, 1)},
+        icons="child",
+        icon_size=18,
+        figsize=(10, 6),
+    )
+
+
+def waffle_chart(df, image_format: str = "png", dpi: int = None) -> bytes:
+    """Draw the Waffle chart of the first question.
+
+    Args:
+        df (pd.DataFrame): The branches and their percentage
+        image_format (str): The image format
+        dpi (int, optional): The resolution of the image
+
+    Returns:
+        bytes: The image of the chart
+    """
+    return figure_image(waffle_figure(df), image_format, dpi)
+
+
+def bar_chart(
+    df,
+    x: str,
+    y: str,
+    title: str,
+    xlabel: str = None,
+    ylabel: str = None,
+    rotation: int = None,
+    image_format: str = "png",
+    dpi: int = None,
+) -> bytes:
+    """Draw a seaborn bar chart with the whitegrid theme.
+
+    Args:
+        df (pd.DataFrame): The data of the chart
+        x (str): The column of the x axis
+        y (str): The column of the y axis
+        title (str): The title of the chart
+        xlabel (str, optional): The label of the x axis. Defaults to the column.
+        ylabel (str, optional): The label of the y axis. Defaults to the column.
+        rotation (int, optional): The rotation of the x tick labels, in degrees
+        image_format (str): The image format
+        dpi (int, optional): The resolution of the image
+
+    Returns:
+        bytes: The image of the chart
+    """
+    import matplotlib  # type: ignore
+    import seaborn as sns  # type: ignore
+    from matplotlib.figure import Figure  # type: ignore
+
+    # the theme only applies to this chart
+    with matplotlib.rc_context():
+        sns.set_theme(style="whitegrid")
+        fig = Figure()
+        ax = fig.subplots()
+        sns.barplot(x=x, y=y, data=df, ax=ax)
+        ax.set(xlabel=xlabel or x, ylabel=ylabel or y, title=title)
+        if rotation is not None:
+            ax.tick_params(axis="x", labelrotation=rotation)
+        return figure_image(fig, image_format, dpi)
+
+
+def _warm_up():
+    # import the charting stack once per worker instead of in the first chart
+    import matplotlib.figure  # type: ignore # noqa: F401
+    import seaborn  # type: ignore # noqa: F401
+
+
+class RenderPool:
+    """Responsible to draw the charts in a pool of worker processes.
+
+    The pool is started on the first chart. Workers are spawned instead of
+    forked, so they never inherit the locks of the server threads.
+    """
+
+    def __init__(self, workers: int = None):
+        if workers is None:
+            default = min(MAX_WORKERS, os.cpu_count() or 1)
+            workers = int(os.environ.get("SURVEY_RENDER_WORKERS", default))
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        # matplotlib.rc_context is not thread-safe
+        self._local_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_up,
+                )
+            return self._executor
+
+    def render(self, chart, *args, **kwargs) -> bytes:
+        """Draw a chart and wait for its image.
+
+        Args:
+            chart (callable): A chart function of this module
+            *args: The arguments of the chart
+            **kwargs: The keyword arguments of the chart
+
+        Raises:
+            BrokenProcessPool: When a worker died, the next chart starts a new pool
+
+        Returns:
+            bytes: The image of the chart
+        """
+        if self.workers == 0:
+            with self._local_lock:
+                return chart(*args, **kwargs)
+
+        executor = self._get_executor()
+        try:
+            return executor.submit(chart, *args, **kwargs).result()
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+    def shutdown(self):
+        """Stop the workers, the next chart starts a new pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+render_pool = RenderPool()
+atexit.register(render_pool.shutdown)
@@ -0,0 +1,173 @@
+"""Robust salary statistics: percentiles, medians and trimmed means.
+
+The mean of ConvertedCompYearly is dominated by a few huge answers, so the
+questions also report its percentiles. They are read from a mergeable
+quantile sketch with logarithmic buckets, as in DDSketch: a salary x > 0 is
+counted in the bucket i such that gamma^(i-1) < x <= gamma^i, with
+gamma = (1 + a) / (1 - a), and the bucket is read back as
+2 * gamma^i / (gamma + 1).
+
+Error bound: a percentile read from the sketch is within a relative error
+``a`` (RELATIVE_ACCURACY, 1%) of the salary of the same rank, so a median of
+50,000 is reported between 49,500 and 50,500. The rank of the q percentile
+of n salaries is floor(q * (n - 1)). A trimmed mean averages the bucket
+values of the ranks it keeps, so it is also within ``a`` of the trimmed mean
+of the salaries. A sketch only holds one count per bucket, about 1,200
+buckets from 1 to 10^11, whatever the number of salaries.
+
+Sketches are bucket counts, so the sketches of chunks, workers or groups
+are merged by adding their counts, in any order, with the same result.
+"""
+import numpy as np
+import pandas as pd  # type: ignore
+
+RELATIVE_ACCURACY = 0.01
+
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+
+# the bucket of the salaries of 0 or less, read back as 0
+ZERO_BUCKET = np.iinfo(np.int32).min
+
+# percentile: column of the statistics
+PERCENTILES = {0.25: "p25", 0.5: "median", 0.75: "p75", 0.9: "p90"}
+
+# share of the lowest and of the highest salaries left out of the trimmed mean
+TRIM = 0.1
+
+STATISTICS = ["count", *PERCENTILES.values(), "trimmed_mean"]
+
+
+def buckets(salaries) -> np.ndarray:
+    """Return the sketch bucket of each salary.
+
+    Args:
+        salaries (array-like): Salaries without missing values
+
+    Returns:
+        np.ndarray: The bucket of each salary, as int32
+    """
+    values = np.asarray(salaries, dtype="float64")
+    result = np.full(len(values), ZERO_BUCKET, dtype=np.int32)
+    positive = values > 0
+    result[positive] = np.ceil(np.log(values[positive]) / np.log(GAMMA))
+    return result
+
+
+def bucket_values(keys) -> np.ndarray:
+    """Return the salary each bucket is read back as.
+
+    Args:
+        keys (array-like): Buckets
+
+    Returns:
+        np.ndarray: The value of each bucket, 0 for the zero bucket
+    """
+    keys = np.asarray(keys, dtype="int64")
+    values = 2 * np.power(GAMMA, keys.astype("float64")) / (GAMMA + 1)
+    return np.where(keys == ZERO_BUCKET, 0.0, values)
+
+
+def sketch(salaries: pd.Series) -> pd.Series:
+    """Return the sketch of some salaries.
+
+    Args:
+        salaries (pd.Series): Salaries, missing ones are left out
+
+    Returns:
+        pd.Series: The number of salaries of each bucket, by bucket in sorted order
+    """
+    salaries = salaries.dropna()
+    counts = pd.Series(buckets(salaries)).value_counts().sort_index()
+    return counts.astype("int64")
+
+
+def grouped_sketch(salaries: pd.Series, keys: pd.Series) -> pd.Series:
+    """Return one sketch per group of salaries, e.g. per country.
+
+    Args:
+        salaries (pd.Series): Salaries without missing values
+        keys (pd.Series): The group of each salary, aligned with the salaries
+
+    Returns:
+        pd.Series: The counts indexed by (group, bucket) in sorted order
+    """
+    pairs = pd.DataFrame(
+        {"group": keys.astype(object).to_numpy(), "bucket": buckets(salaries)}
+    )
+    counts = pairs.dropna().value_counts(sort=False).sort_index()
+    return counts.astype("int64")
+
+
+def statistics(counts: pd.Series) -> dict:
+    """Return the count, percentiles and trimmed mean of a sketch.
+
+    Args:
+        counts (pd.Series): The number of salaries of each bucket
+
+    Returns:
+        dict: The values of STATISTICS, NaN for an empty sketch
+    """
+    counts = counts[counts > 0].sort_index()
+    total = int(counts.sum())
+    result = dict.fromkeys(STATISTICS, np.nan)
+    result["count"] = total
+    if not total:
+        return result
+
+    values = bucket_values(counts.index)
+    # the last rank of each bucket, counted from 0
+    last_ranks = np.cumsum(counts.to_numpy()) - 1
+    for percentile, column in PERCENTILES.items():
+        rank = int(np.floor(percentile * (total - 1)))
+        result[column] = float(values[np.searchsorted(last_ranks, rank)])
+
+    # ranks kept by the trimmed mean: [low, high)
+    low = int(np.floor(TRIM * total))
+    high = total - low
+    first_ranks = last_ranks - counts.to_numpy() + 1
+    kept = np.clip(
+        np.minimum(last_ranks + 1, high) - np.maximum(first_ranks, low), 0, None
+    )
+    result["trimmed_mean"] = float((values * kept).sum() / kept.sum())
+    return result
+
+
+def exact_statistics(salaries: pd.Series) -> dict:
+    """Return the statistics of some salaries without a sketch, for checking the error bound.
+
+    Args:
+        salaries (pd.Series): Salaries, missing ones are left out
+
+    Returns:
+        dict: The values of STATISTICS, NaN for no salary
+    """
+    values = np.sort(salaries.dropna().to_numpy(dtype="float64"))
+    total = len(values)
+    result = dict.fromkeys(STATISTICS, np.nan)
+    result["count"] = total
+    if not total:
+        return result
+    for percentile, column in PERCENTILES.items():
+        result[column] = float(values[int(np.floor(percentile * (total - 1)))])
+    low = int(np.floor(TRIM * total))
+    result["trimmed_mean"] = float(values[low : total - low].mean())
+    return result
+
+
+def statistics_frame(counts: pd.Series, groups: list, column: str) -> pd.DataFrame:
+    """Return the statistics of some groups of a grouped sketch.
+
+    Args:
+        counts (pd.Series): The counts indexed by (group, bucket)
+        groups (list): The groups, in the order of the rows
+        column (str): The name of the group column
+
+    Returns:
+        pd.DataFrame: The group and its STATISTICS, one row per group
+    """
+    empty = pd.Series(dtype="int64")
+    rows = []
+    for group in groups:
+        group_counts = counts.xs(group, level=0) if group in counts.index else empty
+        rows.append({column: group, **statistics(group_counts)})
+    return pd.DataFrame(rows, columns=[column, *STATISTICS])
@@ -0,0 +1,211 @@
+"""Typed loading of the survey files.
+
+Only the columns used by the questions are read. Each one is declared in a
+dtype manifest together with the question of ``survey_results_schema.csv``
+it comes from, so a renamed question is caught before the survey is parsed.
+A survey file can also be compressed with gzip or xz, pandas then
+decompresses it while parsing, without a decompressed copy.
+
+Compare the memory used by a plain ``pd.read_csv`` and by the typed loader with:
+
+    python streamlit_stackoverflow/schema.py data/survey_results_public.csv
+"""
+import argparse
+import os
+
+import pandas as pd  # type: ignore
+
+SCHEMA_FILE = "data/survey_results_schema.csv"
+
+# column: (question in the schema file, dtype)
+SURVEY_COLUMNS = {
+    "MainBranch": ("MainBranch", "category"),
+    "Country": ("Country", "category"),
+    "EdLevel": ("EdLevel", "category"),
+    "YearsCodePro": ("YearsCodePro", "category"),
+    "DevType": ("DevType", "category"),
+    "OrgSize": ("OrgSize", "category"),
+    "ConvertedCompYearly": ("CompTotal", "float32"),
+    "LanguageHaveWorkedWith": ("Language", "category"),
+    "OpSys": ("OpSys", "category"),
+    "Age": ("Age", "category"),
+}
+
+# the previous years only load the columns compared with the latest survey,
+# under their name of that year, see years.py for the aliases
+SURVEY_2020_COLUMNS = {
+    "ConvertedComp": ("ConvertedComp", "float32"),
+    "LanguageWorkedWith": ("LanguageWorkedWith", "category"),
+}
+
+SURVEY_2019_COLUMNS = {
+    "ConvertedComp": ("ConvertedComp", "float32"),
+    "LanguageWorkedWith": ("LanguageWorkedWith", "category"),
+}
+
+# the suffixes of the compressed survey files, zstd needs pandas 1.4
+COMPRESSION_SUFFIXES = (".gz", ".xz")
+
+# file name: (column manifest, schema file used to check it)
+MANIFESTS = {
+    "survey_results_public.csv": (SURVEY_COLUMNS, SCHEMA_FILE),
+    "survey_results_public_2020.csv": (SURVEY_2020_COLUMNS, None),
+    "survey_results_public_2019.csv": (SURVEY_2019_COLUMNS, None),
+}
+
+
+def read_schema(path: str = SCHEMA_FILE) -> pd.DataFrame:
+    """Return the questions described in the survey schema file.
+
+    Args:
+        path (str): The schema CSV path
+
+    Returns:
+        pd.DataFrame: One row per question, with its name, type and selector
+    """
+    return pd.read_csv(path, usecols=["qname", "type", "selector"])
+
+
+def survey_dtypes(
+    columns: dict = SURVEY_COLUMNS, schema_path: str = SCHEMA_FILE
+) -> dict:
+    """Return the dtype of each column to load, checked against the schema file.
+
+    Args:
+        columns (dict): The column manifest
+        schema_path (str): The schema CSV path. The check is skipped when it is
+            None or the file is missing.
+
+    Raises:
+        ValueError: When a column comes from a question that is not in the schema
+
+    Returns:
+        dict: The dtype of each column
+    """
+    if schema_path and os.path.exists(schema_path):
+        questions = set(read_schema(schema_path)["qname"])
+        missing = sorted(
+            column
+            for column, (question, _) in columns.items()
+            if question not in questions
+        )
+        if missing:
+            raise ValueError(
+                f"The questions of {', '.join(missing)} are not in {schema_path}"
+            )
+    return {column: dtype for column, (_, dtype) in columns.items()}
+
+
+def uncompressed_name(csv_path: str) -> str:
+    """Return the name of a survey file without its compression suffix.
+
+    Args:
+        csv_path (str): The survey CSV path, compressed or not
+
+    Returns:
+        str: The file name, e.g. survey_results_public.csv for
+            data/survey_results_public.csv.gz
+    """
+    name = os.path.basename(csv_path)
+    for suffix in COMPRESSION_SUFFIXES:
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def dtypes_for(csv_path: str) -> dict:
+    """Return the dtypes of a known survey file, or None to read every column.
+
+    Args:
+        csv_path (str): The survey CSV path
+
+    Returns:
+        dict: The dtype of each column to load
+    """
+    manifest = MANIFESTS.get(uncompressed_name(csv_path))
+    if manifest is None:
+        return None
+    return survey_dtypes(*manifest)
+
+
+def read_survey(csv_path: str, dtypes: dict = None) -> pd.DataFrame:
+    """Read only the needed columns of a survey file, with compact dtypes.
+
+    Args:
+        csv_path (str): The survey CSV path
+        dtypes (dict, optional): The dtype of each column. Defaults to the
+            manifest of the file, every column is read for unknown files.
+
+    Returns:
+        pd.DataFrame: The survey Dataframe
+    """
+    dtypes = dtypes_for(csv_path) if dtypes is None else dtypes
+    if dtypes is None:
+        return pd.read_csv(csv_path)
+    return pd.read_csv(csv_path, usecols=list(dtypes), dtype=dtypes)
+
+
+def read_survey_chunks(csv_path: str, chunk_rows: int, dtypes: dict = None):
+    """Read a survey file a few rows at a time, like read_survey.
+
+    Args:
+        csv_path (str): The survey CSV path
+        chunk_rows (int): The number of rows of each chunk
+        dtypes (dict, optional): The dtype of each column. Defaults to the
+            manifest of the file, every column is read for unknown files.
+
+    Returns:
+        Iterator[pd.DataFrame]: The chunks of the survey, in order
+    """
+    dtypes = dtypes_for(csv_path) if dtypes is None else dtypes
+    if dtypes is None:
+        return pd.read_csv(csv_path, chunksize=chunk_rows)
+    return pd.read_csv(
+        csv_path, usecols=list(dtypes), dtype=dtypes, chunksize=chunk_rows
+    )
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """Return how many bytes a Dataframe holds, including the strings it points to.
+
+    Args:
+        df (pd.DataFrame): Any Dataframe
+
+    Returns:
+        int: The size in bytes
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the memory of the plain and the typed survey loaders."
+    )
+    parser.add_argument(
+        "file",
+        nargs="?",
+        default="data/survey_results_public.csv",
+        help="survey CSV file",
+    )
+    args = parser.parse_args()
+
+    before = pd.read_csv(args.file)
+    after = read_survey(args.file)
+    size_before, size_after = memory_usage(before), memory_usage(after)
+
+    print(f"{'column':<24}{'before':>14}{'after':>14}")
+    for column in after.columns:
+        print(
+            f"{column:<24}"
+            f"{memory_usage(before[[column]]):>14,}"
+            f"{memory_usage(after[[column]]):>14,}"
+        )
+    print(
+        f"{'total':<24}{size_before:>14,}{size_after:>14,}"
+        f"  ({size_before / size_after:.1f}x smaller,"
+        f" {len(before.columns)} -> {len(after.columns)} columns)"
+    )
+
+
+if __name__ == "__main__":
+    main()
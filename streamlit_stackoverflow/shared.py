@@ -0,0 +1,316 @@
+"""Survey published once per host as memory-mapped arrays.
+
+Each Streamlit server of a host holds its own copy of the survey and of the
+indexes built from it. Instead, the survey can be published once: its
+columns, as categorical codes and numbers, and the indexes the questions and
+filters read (the multi-hot matrices, the years of experience and the
+bitmaps of the filters) are written as .npy files, which every server maps
+read-only. The pages are shared through the OS page cache, so another server
+adds almost no dataset memory.
+
+Publish the survey from the repository root with:
+
+    python streamlit_stackoverflow/shared.py --output data/shared
+
+and start the servers with SURVEY_SHARED=data/shared. Each version is
+written in its own directory before the ``current`` link is replaced, in one
+atomic rename, so a server attaches the new version on its next request and
+never sees a half written one.
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd  # type: ignore
+
+from instrumentation import span
+
+CURRENT = "current"
+MANIFEST = "manifest.json"
+
+# how many versions are kept, the current one and the one before
+KEEP_VERSIONS = 2
+
+
+def _shared_indexes(dataset) -> dict:
+    """Return the indexes of a dataset that are published, by memo key."""
+    from analytics import devtype_groups
+    from filters import LANGUAGE, bitmap_index
+    from multihot import multihot_index
+    from numeric import numeric_column
+
+    return {
+        ("multihot", LANGUAGE): multihot_index(dataset, LANGUAGE),
+        ("multihot", "DevType"): multihot_index(dataset, "DevType"),
+        ("multihot", "DevType", "groups"): devtype_groups(dataset),
+        ("numeric", "YearsCodePro"): numeric_column(dataset, "YearsCodePro"),
+        "bitmaps": bitmap_index(dataset),
+    }
+
+
+def _write_version(dataset, path: str):
+    """Write the columns and indexes of a dataset as .npy files and their manifest."""
+    from filters import BitmapIndex
+    from multihot import MultiHotIndex
+    from snapshot import to_dictionary_encoded
+
+    os.makedirs(path)
+    files = []
+
+    def save(array: np.ndarray) -> str:
+        name = f"{len(files)}.npy"
+        np.save(os.path.join(path, name), array, allow_pickle=False)
+        files.append(name)
+        return name
+
+    columns = {}
+    for column, values in to_dictionary_encoded(dataset.frame).items():
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            columns[column] = {
+                "file": save(values.cat.codes.to_numpy()),
+                "categories": values.cat.categories.tolist(),
+            }
+        else:
+            columns[column] = {"file": save(values.to_numpy())}
+
+    indexes = []
+    for key, index in _shared_indexes(dataset).items():
+        entry = {"key": list(key) if isinstance(key, tuple) else key}
+        if isinstance(index, MultiHotIndex):
+            entry.update(
+                kind="multihot",
+                tokens=index.tokens,
+                file=save(index.matrix),
+                answered=save(index.answered),
+            )
+        elif isinstance(index, BitmapIndex):
+            entry.update(
+                kind="bitmaps",
+                rows=index.rows,
+                values={
+                    column: list(bitmaps) for column, bitmaps in index.bitmaps.items()
+                },
+                files={
+                    column: save(np.stack(list(bitmaps.values())))
+                    for column, bitmaps in index.bitmaps.items()
+                    if bitmaps
+                },
+            )
+        else:
+            entry.update(kind="array", file=save(index))
+        indexes.append(entry)
+
+    manifest = {
+        "version": dataset.version,
+        "rows": len(dataset.frame),
+        "columns": columns,
+        "indexes": indexes,
+    }
+    with open(os.path.join(path, MANIFEST), "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+
+
+def current_version(directory: str) -> str:
+    """Return the version of the survey published in a directory, None when there is none."""
+    try:
+        with open(os.path.join(directory, CURRENT, MANIFEST), encoding="utf-8") as file:
+            return json.load(file)["version"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def publish(dataset, directory: str) -> str:
+    """Publish a dataset and make it the current version of a directory.
+
+    Args:
+        dataset (SurveyDataset): The loaded survey
+        directory (str): The directory of the published versions, created when missing
+
+    Returns:
+        str: The directory of the published version
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = dataset.version[:16]
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        temporary = f"{path}.{os.getpid()}.tmp"
+        _write_version(dataset, temporary)
+        os.replace(temporary, path)
+
+    # a new link moved over the old one, so readers see one or the other
+    link = os.path.join(directory, f"{CURRENT}.{os.getpid()}.tmp")
+    os.symlink(name, link)
+    os.replace(link, os.path.join(directory, CURRENT))
+
+    # the mapped files of the removed versions stay readable until unmapped
+    versions = sorted(
+        (
+            entry
+            for entry in os.scandir(directory)
+            if entry.is_dir(follow_symlinks=False) and not entry.name.endswith(".tmp")
+        ),
+        key=lambda entry: entry.stat().st_mtime_ns,
+        reverse=True,
+    )
+    for entry in versions[KEEP_VERSIONS:]:
+        if entry.name != name:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return path
+
+
+def attach(path: str):
+    """Map a published version of the survey, without copying it.
+
+    Args:
+        path (str): The directory of the version, or the ``current`` link
+
+    Returns:
+        SurveyDataset: The survey, with its published indexes already memoized.
+            Its arrays are read-only.
+    """
+    from dataset import SurveyDataset
+    from filters import BitmapIndex
+    from multihot import MultiHotIndex
+
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as file:
+        manifest = json.load(file)
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, name), mmap_mode="r", allow_pickle=False)
+
+    columns = {}
+    for column, entry in manifest["columns"].items():
+        values = load(entry["file"])
+        if "categories" in entry:
+            values = pd.Categorical.from_codes(values, entry["categories"])
+        columns[column] = pd.Series(values, name=column, copy=False)
+    frame = pd.DataFrame(columns, copy=False)
+
+    dataset = SurveyDataset(frame, manifest["version"], path)
+    for entry in manifest["indexes"]:
+        key = entry["key"]
+        key = tuple(key) if isinstance(key, list) else key
+        if entry["kind"] == "multihot":
+            index = MultiHotIndex(
+                entry["tokens"], load(entry["file"]), load(entry["answered"])
+            )
+        elif entry["kind"] == "bitmaps":
+            bitmaps = {}
+            for column, values in entry["values"].items():
+                rows = load(entry["files"][column]) if values else []
+                bitmaps[column] = dict(zip(values, rows))
+            index = BitmapIndex(bitmaps, entry["rows"])
+        else:
+            index = load(entry["file"])
+        dataset.memo(key, lambda index=index: index)
+    return dataset
+
+
+class SharedDatasetProvider:
+    """Responsible to attach the current published version of the survey.
+
+    It has the interface of DatasetProvider. The ``current`` link is read at
+    every call, so a new version is attached as soon as it is published.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, CURRENT)
+        self._lock = threading.Lock()
+        self._dataset = None
+        self._target = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.last_load_seconds = 0.0
+        self.total_load_seconds = 0.0
+
+    def get(self):
+        """Return the current version of the survey, attaching it when it changed.
+
+        Raises:
+            FileNotFoundError: When no version was published
+
+        Returns:
+            SurveyDataset: The current version of the survey
+        """
+        with self._lock:
+            target = os.path.realpath(self.path)
+            if self._dataset is not None and target == self._target:
+                self.hits += 1
+                return self._dataset
+
+            self.misses += 1
+            start = time.perf_counter()
+            with span(None, "load", "shared") as load:
+                dataset = attach(target)
+                load.rows = len(dataset.frame)
+            elapsed = time.perf_counter() - start
+
+            self.loads += 1
+            self.last_load_seconds = elapsed
+            self.total_load_seconds += elapsed
+            self._dataset = dataset
+            self._target = target
+            return self._dataset
+
+    def loaded(self):
+        """Return the dataset loaded so far, without loading or checking it.
+
+        Returns:
+            SurveyDataset: The last dataset returned by get(), None before the first one
+        """
+        return self._dataset
+
+    def clear(self):
+        """Forget the attached dataset, the next call to get() will attach it again."""
+        with self._lock:
+            self._dataset = None
+            self._target = None
+
+    def stats(self) -> dict:
+        """Return the counters of the provider.
+
+        Returns:
+            dict: Hits, misses, loads and load times in seconds
+        """
+        with self._lock:
+            return {
+                "path": self.path,
+                "version": self._dataset.version if self._dataset else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "last_load_seconds": self.last_load_seconds,
+                "total_load_seconds": self.total_load_seconds,
+            }
+
+
+def main():
+    from dataset import DATA_SOURCE, source_provider
+
+    parser = argparse.ArgumentParser(
+        description="Publish the survey as memory-mapped arrays shared by the servers."
+    )
+    parser.add_argument(
+        "--output", default="data/shared", help="directory of the published versions"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="publish even if the version is current"
+    )
+    args = parser.parse_args()
+
+    dataset = source_provider(DATA_SOURCE).get()
+    if not args.force and current_version(args.output) == dataset.version:
+        print(f"{args.output} is already published for dataset {dataset.version[:12]}")
+        return
+    path = publish(dataset, args.output)
+    print(f"{path} published for dataset {dataset.version[:12]}")
+
+
+if __name__ == "__main__":
+    main()
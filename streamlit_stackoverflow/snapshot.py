@@ -0,0 +1,240 @@
+"""Columnar snapshots of the survey files.
+
+Parsing the survey CSV files is the biggest cold start cost of the app, so
+they can be converted once into an uncompressed Feather (Arrow IPC) file with
+dictionary-encoded strings. Uncompressed Feather files are memory-mapped when
+read, so a start costs no parsing. The Dataframe is not shared between the
+workers of a host though: only the codes of the categorical columns and the
+numeric columns without missing values stay on the mapped pages, the columns
+with missing values, such as the salaries, and the categories are copied into
+each process. See shared.py to share the survey between the workers.
+
+Build the snapshots from the repository root with:
+
+    python streamlit_stackoverflow/snapshot.py data/survey_results_public.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd  # type: ignore
+
+from schema import dtypes_for, read_survey, uncompressed_name
+
+SNAPSHOT_SUFFIX = ".feather"
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the sha256 of a file, read in chunks.
+
+    Args:
+        path (str): The file path
+        chunk_size (int): How many bytes are read at a time
+
+    Returns:
+        str: The hexadecimal digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(csv_path: str) -> str:
+    """Return the path of the snapshot built from a CSV file.
+
+    Args:
+        csv_path (str): The survey CSV path, compressed or not
+
+    Returns:
+        str: The snapshot path, next to the CSV file
+    """
+    name = os.path.splitext(uncompressed_name(csv_path))[0]
+    return os.path.join(os.path.dirname(csv_path), name + SNAPSHOT_SUFFIX)
+
+
+def _source_stat(csv_path: str) -> dict:
+    stat = os.stat(csv_path)
+    return {"source_size": str(stat.st_size), "source_mtime_ns": str(stat.st_mtime_ns)}
+
+
+def _source_dtypes(csv_path: str) -> str:
+    return json.dumps(dtypes_for(csv_path), sort_keys=True)
+
+
+def read_metadata(path: str) -> dict:
+    """Return the metadata recorded in a snapshot, or an empty dict when it is missing.
+
+    Args:
+        path (str): The snapshot path
+
+    Returns:
+        dict: The source size, mtime, sha256 and dtypes used to build the snapshot
+    """
+    try:
+        from pyarrow import ipc  # type: ignore
+
+        schema = ipc.open_file(path).schema
+    except (ImportError, OSError):
+        return {}
+    metadata = schema.metadata or {}
+    return {
+        key.decode(): value.decode()
+        for key, value in metadata.items()
+        if key.startswith(b"source_")
+    }
+
+
+def is_fresh(csv_path: str, path: str = None) -> bool:
+    """Check if the snapshot of a CSV file exists and was built from its current content.
+
+    Args:
+        csv_path (str): The survey CSV path
+        path (str, optional): The snapshot path. Defaults to the one next to the CSV.
+
+    Returns:
+        bool: True when the snapshot can be used instead of the CSV
+    """
+    metadata = read_metadata(path or snapshot_path(csv_path))
+    if not metadata or metadata.get("source_dtypes") != _source_dtypes(csv_path):
+        # missing, or built with another column manifest
+        return False
+    if not os.path.exists(csv_path):
+        # deployed without the CSV, the snapshot is the only copy of the data
+        return True
+    stat = _source_stat(csv_path)
+    if all(metadata.get(key) == value for key, value in stat.items()):
+        return True
+    return metadata.get("source_sha256") == file_hash(csv_path)
+
+
+def to_dictionary_encoded(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the string columns to categories, stored as Arrow dictionaries.
+
+    Args:
+        df (pd.DataFrame): The survey Dataframe
+
+    Returns:
+        pd.DataFrame: The same Dataframe with categorical string columns
+    """
+    columns = df.select_dtypes(include="object").columns
+    return df.astype({column: "category" for column in columns})
+
+
+def build_snapshot(csv_path: str, path: str = None) -> str:
+    """Convert a survey CSV file into a memory-mappable Feather snapshot.
+
+    Only the columns of the file manifest are kept, with their compact dtypes.
+    The file is written next to the destination and moved in place, so readers
+    never see a half written snapshot.
+
+    Args:
+        csv_path (str): The survey CSV path
+        path (str, optional): The snapshot path. Defaults to the one next to the CSV.
+
+    Returns:
+        str: The snapshot path
+    """
+    import pyarrow as pa  # type: ignore
+    from pyarrow import feather  # type: ignore
+
+    path = path or snapshot_path(csv_path)
+    table = pa.Table.from_pandas(
+        to_dictionary_encoded(read_survey(csv_path)), preserve_index=False
+    )
+    metadata = dict(table.schema.metadata or {})
+    metadata.update(
+        {key.encode(): value.encode() for key, value in _source_stat(csv_path).items()}
+    )
+    metadata[b"source_sha256"] = file_hash(csv_path).encode()
+    metadata[b"source_dtypes"] = _source_dtypes(csv_path).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(path: str) -> pd.DataFrame:
+    """Memory-map a snapshot and return it as a Dataframe.
+
+    The columns with missing values are copied out of the mapped file, see
+    the module docstring.
+
+    Args:
+        path (str): The snapshot path
+
+    Returns:
+        pd.DataFrame: The survey Dataframe, with categorical string columns
+    """
+    from pyarrow import feather  # type: ignore
+
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def load_survey(csv_path: str) -> pd.DataFrame:
+    """Load a survey file from its snapshot, falling back to the CSV file.
+
+    Args:
+        csv_path (str): The survey CSV path
+
+    Returns:
+        pd.DataFrame: The survey Dataframe
+    """
+    path = snapshot_path(csv_path)
+    if is_fresh(csv_path, path):
+        return read_snapshot(path)
+    return read_survey(csv_path)
+
+
+def source_version(csv_path: str) -> str:
+    """Return the content hash of a survey file, read from its snapshot when it is fresh.
+
+    Args:
+        csv_path (str): The survey CSV path
+
+    Returns:
+        str: The sha256 of the CSV content
+    """
+    path = snapshot_path(csv_path)
+    if is_fresh(csv_path, path):
+        return read_metadata(path)["source_sha256"]
+    return file_hash(csv_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the columnar snapshots of the survey files."
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="survey CSV files to convert. Defaults to the files of every year",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild snapshots that are fresh"
+    )
+    args = parser.parse_args()
+
+    if not args.files:
+        from years import SURVEY_YEARS
+
+        args.files = [
+            survey_year.path
+            for survey_year in SURVEY_YEARS.values()
+            if os.path.exists(survey_year.path)
+        ]
+
+    for csv_path in args.files:
+        if not args.force and is_fresh(csv_path):
+            print(f"{snapshot_path(csv_path)} is up to date")
+            continue
+        print(f"{build_snapshot(csv_path)} built from {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""Survey file downloaded from an HTTP(S) URL.
+
+SURVEY_SOURCE can name the survey by URL instead of a local file. The file is
+downloaded as is, compressed or not, into an on-disk cache, SURVEY_CACHE,
+and parsed from there, see schema.py for the compressed files. Once the
+cached copy is older than SURVEY_SOURCE_MAX_AGE seconds, it is revalidated
+in a background thread with a conditional GET on its ETag and Last-Modified:
+the pages keep being served from the loaded survey until a new file is
+downloaded and parsed. Only the first start of a server without a cached
+copy waits for the download.
+
+Check a URL and download it when it changed with:
+
+    python streamlit_stackoverflow/source.py https://example.com/survey_results_public.csv.gz
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlparse
+
+from instrumentation import span
+from snapshot import load_survey, source_version
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("SURVEY_CACHE", "data/cache")
+
+# how old the cached copy can be before it is revalidated, in seconds
+MAX_AGE = float(os.environ.get("SURVEY_SOURCE_MAX_AGE", "3600"))
+
+# the name of the cached copy when the URL has none, e.g. a download link
+DEFAULT_NAME = "survey_results_public.csv"
+
+TIMEOUT = 60
+CHUNK_SIZE = 1 << 20
+
+
+def is_url(source: str) -> bool:
+    """Return whether a survey source is an HTTP(S) URL rather than a file path."""
+    return urlparse(source).scheme in ("http", "https")
+
+
+def cache_path(url: str, cache_dir: str = CACHE_DIR) -> str:
+    """Return the path of the cached copy of a URL.
+
+    The copy keeps the file name of the URL, so its column manifest and
+    compression are found as for a local file.
+
+    Args:
+        url (str): The URL of the survey file
+        cache_dir (str): The directory of the cached copies
+
+    Returns:
+        str: The path of the cached copy, in a directory of its own per URL
+    """
+    name = os.path.basename(urlparse(url).path)
+    if "." not in name:
+        name = DEFAULT_NAME
+    digest = hashlib.sha256(url.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, digest, name)
+
+
+def _write_json(path: str, content: dict):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(content, file)
+    os.replace(tmp_path, path)
+
+
+class RemoteFile:
+    """Responsible to keep the cached copy of a remote survey file up to date.
+
+    The validators sent by the server are kept next to the copy, in a JSON
+    file, with the time the copy was last checked.
+    """
+
+    def __init__(self, url: str, cache_dir: str = CACHE_DIR, timeout: float = TIMEOUT):
+        self.url = url
+        self.path = cache_path(url, cache_dir)
+        self.metadata_path = f"{self.path}.json"
+        self.timeout = timeout
+
+    def metadata(self) -> dict:
+        """Return the validators of the cached copy, an empty dict when there is none.
+
+        Returns:
+            dict: The etag, last_modified and checked time of the copy
+        """
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.metadata_path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def age(self) -> float:
+        """Return the seconds since the cached copy was last checked, inf when there is none."""
+        checked = self.metadata().get("checked")
+        return float("inf") if checked is None else time.time() - checked
+
+    def fetch(self) -> bool:
+        """Download the file and store its validators, unless the cached copy is current.
+
+        Raises:
+            urllib.error.URLError: When the server cannot be reached or answers an error
+
+        Returns:
+            bool: True when a new copy was downloaded, False when it was not modified
+        """
+        validators = self.download()
+        if validators is None:
+            return False
+        self.store(validators)
+        return True
+
+    def download(self) -> dict:
+        """Download the file, unless the server answers that the cached copy is current.
+
+        The body is written to a temporary file and moved over the cached
+        copy, so a reader never sees a partial download. The validators of
+        the new copy are only returned, see store(): until they are stored,
+        the next revalidation downloads the file again.
+
+        Raises:
+            urllib.error.URLError: When the server cannot be reached or answers an error
+
+        Returns:
+            dict: The validators of the new copy, None when it was not modified
+        """
+        metadata = self.metadata()
+        headers = {"Accept-Encoding": "identity"}
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
+        request = urllib.request.Request(self.url, headers=headers)
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as error:
+            if error.code != 304:
+                raise
+            metadata["checked"] = time.time()
+            _write_json(self.metadata_path, metadata)
+            return None
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with response, open(tmp_path, "wb") as file:
+                shutil.copyfileobj(response, file, CHUNK_SIZE)
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return {
+            "url": self.url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked": time.time(),
+        }
+
+    def store(self, validators: dict):
+        """Keep the validators of the cached copy, once it is known to be usable.
+
+        Args:
+            validators (dict): The validators returned by download()
+        """
+        _write_json(self.metadata_path, validators)
+
+
+def local_copy(source: str, cache_dir: str = CACHE_DIR) -> str:
+    """Return the path of a survey source, downloaded into the cache when it is a URL.
+
+    Used by the survey read in chunks, which stays on the cached copy until
+    it is downloaded again, e.g. by the command line of this module.
+
+    Args:
+        source (str): The path of the survey file or its HTTP(S) URL
+        cache_dir (str): The directory of the cached copies
+
+    Returns:
+        str: The path of a local file
+    """
+    if not is_url(source):
+        return source
+    remote = RemoteFile(source, cache_dir)
+    if not os.path.exists(remote.path):
+        remote.fetch()
+    return remote.path
+
+
+class RemoteDatasetProvider:
+    """Responsible to load a remote survey file and keep it up to date in the background.
+
+    It has the interface of DatasetProvider. get() only waits for the
+    network when there is no cached copy yet, a stale copy is revalidated
+    by a background thread, which swaps the dataset once the new file is
+    parsed. The validators of a download are only stored once it is
+    parsed, so a file that fails to parse is downloaded again.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        cache_dir: str = CACHE_DIR,
+        max_age: float = MAX_AGE,
+        loader=load_survey,
+        versioner=source_version,
+    ):
+        self.remote = RemoteFile(url, cache_dir)
+        self.path = self.remote.path
+        self.max_age = max_age
+        self.loader = loader
+        self.versioner = versioner
+        self._lock = threading.Lock()
+        self._dataset = None
+        self._refresh = None
+        # a failed refresh is only tried again after max_age
+        self._attempted = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_load_seconds = 0.0
+        self.total_load_seconds = 0.0
+
+    def _load(self, current=None):
+        """Parse the cached copy, or return the current dataset when it did not change."""
+        from dataset import SurveyDataset
+
+        version = self.versioner(self.path)
+        if current is not None and version == current.version:
+            return current, 0.0
+
+        start = time.perf_counter()
+        with span(None, "load", os.path.basename(self.path)) as load:
+            frame = self.loader(self.path)
+            load.rows = len(frame)
+        return SurveyDataset(frame, version, self.path), time.perf_counter() - start
+
+    def _loaded(self, dataset, elapsed: float):
+        if dataset is not self._dataset:
+            self.loads += 1
+            self.last_load_seconds = elapsed
+            self.total_load_seconds += elapsed
+            self._dataset = dataset
+
+    def get(self):
+        """Return the loaded survey, starting a revalidation when the cached copy is stale.
+
+        Raises:
+            urllib.error.URLError: When there is no cached copy and the download fails
+
+        Returns:
+            SurveyDataset: The survey
+        """
+        with self._lock:
+            if self._dataset is None:
+                self.misses += 1
+                validators = None
+                if not self.remote.metadata():
+                    # nothing to serve yet, the first download is awaited
+                    self._attempted = time.time()
+                    validators = self.remote.download()
+                self._loaded(*self._load())
+                if validators is not None:
+                    self.remote.store(validators)
+            else:
+                self.hits += 1
+
+            stale = self.remote.age() >= self.max_age
+            retry = time.time() - self._attempted >= self.max_age
+            if stale and retry and self._refresh is None:
+                self._attempted = time.time()
+                self._refresh = threading.Thread(
+                    target=self._revalidate, name="survey-refresh", daemon=True
+                )
+                self._refresh.start()
+            return self._dataset
+
+    def _revalidate(self):
+        try:
+            with span(None, "refresh", os.path.basename(self.path)):
+                validators = self.remote.download()
+                if validators is not None:
+                    dataset, elapsed = self._load(self._dataset)
+                    with self._lock:
+                        self._loaded(dataset, elapsed)
+                    self.remote.store(validators)
+            with self._lock:
+                self.refreshes += 1
+        except Exception:
+            logger.exception("The refresh of %s failed", self.remote.url)
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refresh = None
+
+    def loaded(self):
+        """Return the dataset loaded so far, without loading or checking it.
+
+        Returns:
+            SurveyDataset: The last dataset returned by get(), None before the first one
+        """
+        return self._dataset
+
+    def clear(self):
+        """Forget the loaded dataset, the next call to get() will load it again."""
+        with self._lock:
+            self._dataset = None
+
+    def stats(self) -> dict:
+        """Return the counters of the provider.
+
+        Returns:
+            dict: Hits, misses, loads, refreshes and load times in seconds
+        """
+        with self._lock:
+            return {
+                "path": self.path,
+                "url": self.remote.url,
+                "version": self._dataset.version if self._dataset else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "last_load_seconds": self.last_load_seconds,
+                "total_load_seconds": self.total_load_seconds,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download a remote survey file into the cache when it changed."
+    )
+    parser.add_argument("url", help="HTTP(S) URL of the survey file")
+    parser.add_argument(
+        "--cache", default=CACHE_DIR, help="directory of the cached copies"
+    )
+    args = parser.parse_args()
+
+    remote = RemoteFile(args.url, args.cache)
+    if remote.fetch():
+        print(f"{remote.path} downloaded from {args.url}")
+    else:
+        print(f"{remote.path} is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,124 @@
+import os
+import threading
+import uuid
+
 import streamlit as st
 
-from make_plots import MakePlots  # type: ignore
+import instrumentation
+from pages import PAGES, load_page
+from prefetch import prefetcher
+from warmup import start_warm_up
 
 st.set_page_config(layout="wide")
 
 
-def display_welcome():
-    """Responsible for showing the welcome page."""
-
-    st.header("This project will answer some information about Stack Overflow.")
-    st.subheader("These questions will be answered:")
-    st.markdown(
-        """
-        1. Percentagem of respondents who consider themselves professionals, non-professionals, students, hobbyists, etc.
-        2. Distribution of respondents by location. Which country had the most participation?
-        3. What is the respondent's distribution by level of education?
-        4. What is the distribution of working time for each type of professional informed in question 1?
-        5. Concerning people who work professionally:
-            1. What is their profession?
-            2. What is their level of education?
-            3. What is the company's size of those people who work professionally?
-        6. The average salary of respondents?
-        7. Using the top five countries that have the most respondents, what is the salary of these people?
-        8. What is the percentage of people who work with Python?
-        9. About python:
-            1. What is the salary level of people working with Python globally?
-            2. In Brazil, what is the salary level?
-            3. In the top five countries that have the most respondents, what is the salary level?
-        10. Concerning all respondents, what operating system do they use?
-        11. Concerning only people who work with Python, what operating system do they use?
-        12. What is the average age of respondents?
-        13. Concerning only people who work with Python, what is the average age?"""
-    )
-
-    st.markdown(
-        "[![GitHub](https://badgen.net/badge/icon/GitHub?icon=github&color=black&label)](https://github.com/jpaulorc/streamlit_stackoverflow)"
-    )
+def get_aggregates():
+    """Return the source of the aggregates of the questions.
+
+    The precomputed cube when SURVEY_CUBE is set, the survey read in chunks of
+    SURVEY_CHUNK_ROWS rows when it is set, otherwise None to load the survey.
+    """
+    cube_file = os.environ.get("SURVEY_CUBE")
+    if cube_file:
+        from cube import load_cube
+
+        return load_cube(cube_file)
+    chunk_rows = os.environ.get("SURVEY_CHUNK_ROWS")
+    if chunk_rows:
+        from analytics import load_streaming
+        from dataset import DATA_SOURCE
+        from source import local_copy
+
+        return load_streaming(local_copy(DATA_SOURCE), int(chunk_rows))
+    return None
+
+
+def display_filters() -> tuple:
+    """Show the filters of the respondents in the sidebar.
+
+    Returns:
+        tuple: The selected filters, see filters.normalize()
+    """
+    from dataset import survey_data
+    from filters import FILTERS, bitmap_index, normalize
+
+    index = bitmap_index(survey_data.get())
+    selected = {}
+    with st.sidebar:
+        st.subheader("Filters")
+        for column, (name, labels) in FILTERS.items():
+            selected[column] = st.multiselect(
+                name,
+                index.values(column),
+                format_func=lambda value, labels=labels: labels.get(value, value),
+                key=f"filter_{column}",
+            )
+    return normalize(selected)
 
 
 def display_index():
     """Mostra uma barra lateral"""
-    mp = MakePlots()
-    options = {
-        "Welcome": display_welcome,
-        "Question 1": mp.display_question_one,
-        "Question 2": mp.display_question_two,
-        "Question 3": mp.display_question_three,
-        "Question 4": mp.display_question_four,
-        "Question 5": mp.display_question_five,
-        "Question 6": mp.display_question_six,
-        "Question 7": mp.display_question_seven,
-        "Question 8": mp.display_question_eight,
-        "Question 9": mp.display_question_nine,
-        "Question 10": mp.display_question_ten,
-        "Question 11": mp.display_question_eleven,
-        "Question 12": mp.display_question_twelve,
-        "Question 13": mp.display_question_thirteen,
-    }
-
     with st.container():
         st.title("Stack Overflow Data Analysis")
-        opt = st.selectbox("Choose your question", options)
+        opt = st.selectbox("Choose your question", PAGES)
+
+    # the module of the page is imported on its first visit
+    display_page = load_page(opt)
+    aggregates, filters = get_aggregates(), ()
+    if PAGES[opt].question is None:
+        display_page()
+    else:
+        # the filters need the survey, the cube and the chunks only hold aggregates
+        if aggregates is None:
+            filters = display_filters()
+        display_page(PAGES[opt].question, aggregates, filters)
+
+    # the next questions are computed while this page is read
+    owner = st.session_state.setdefault("prefetch_owner", uuid.uuid4().hex)
+    prefetcher.after(opt, aggregates, filters, owner)
+
+
+def display_timings(mark: int):
+    """Show the spans of this run in the sidebar and export the Prometheus text.
+
+    Args:
+        mark (int): The number of spans recorded before the run
+    """
+    recorder = instrumentation.recorder
+    metrics_file = os.environ.get("SURVEY_METRICS_FILE")
+    if metrics_file:
+        recorder.write(metrics_file)
 
-    options[opt]()
+    records = recorder.since(mark, threading.get_ident())
+    with st.sidebar:
+        st.subheader("Timings")
+        st.table(
+            [
+                {
+                    "question": record["question"],
+                    "phase": record["phase"],
+                    "figure": record["name"],
+                    "wall ms": round(record["wall_seconds"] * 1000, 1),
+                    "cpu ms": round(record["cpu_seconds"] * 1000, 1),
+                    "memory KiB": record["memory_bytes"] // 1024,
+                    "rows": record["rows"],
+                    "hits": record["cache_hits"],
+                    "misses": record["cache_misses"],
+                    "KiB sent": (record["plotly_bytes"] + record["image_bytes"])
+                    // 1024,
+                }
+                for record in records
+            ]
+        )
+        with st.expander("Prometheus"):
+            st.code(recorder.prometheus_text())
 
 
-display_index()
+# every question is computed in the background when the server starts
+start_warm_up(get_aggregates())
+if instrumentation.ENABLED:
+    mark = instrumentation.recorder.spans
+    display_index()
+    display_timings(mark)
+else:
+    display_index()
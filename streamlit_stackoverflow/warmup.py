@@ -0,0 +1,107 @@
+"""Warm-up of every question when the server starts.
+
+The aggregates of a question used to be computed by the first visitor of its
+page. The warm-up computes the partial aggregates of the survey in a pool of
+worker processes, one range of rows per worker, merges them (see partials.py)
+and computes the aggregates of every question into the memo of the shared
+dataset. It also imports the plotting modules of the pages, so the first
+visitor of any page only waits for its figures. The render workers are left
+to start on the first matplotlib chart (see rendering.py).
+
+The warm-up runs in a background thread, once per process. Set
+SURVEY_WARM_UP=0 to disable it and SURVEY_WARM_UP_WORKERS to change the
+number of processes, which defaults to the number of cores up to MAX_WORKERS:
+each spawned process imports pandas again and copies its range of rows.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# the default number of processes on hosts with more cores
+MAX_WORKERS = 4
+
+
+def warm_up(aggregates=None, workers: int = None) -> dict:
+    """Compute the aggregates of every question and load the pages.
+
+    Args:
+        aggregates (optional): The source of the aggregates, as returned by
+            get_aggregates(). Defaults to the shared dataset, whose partials
+            are computed by a pool of processes.
+        workers (int, optional): The number of processes. Defaults to
+            SURVEY_WARM_UP_WORKERS, or the number of cores up to MAX_WORKERS.
+
+    Returns:
+        dict: The seconds taken by each step
+    """
+    from analytics import QUESTIONS, DatasetAggregates, dataset_partials
+    from pages import PAGES, load_page
+
+    if workers is None:
+        default = min(MAX_WORKERS, os.cpu_count() or 1)
+        workers = int(os.environ.get("SURVEY_WARM_UP_WORKERS", default))
+
+    seconds = {}
+    if aggregates is None:
+        from dataset import survey_data
+
+        start = time.perf_counter()
+        dataset = survey_data.get()
+        seconds["load"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dataset_partials(dataset, workers)
+        seconds["partials"] = time.perf_counter() - start
+        aggregates = DatasetAggregates(dataset)
+
+    start = time.perf_counter()
+    for number in QUESTIONS:
+        aggregates.question(number)
+    seconds["questions"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name in PAGES:
+        load_page(name)
+    seconds["pages"] = time.perf_counter() - start
+    return seconds
+
+
+def _run(aggregates):
+    try:
+        seconds = warm_up(aggregates)
+    except Exception:
+        # the pages still compute their aggregates on the first visit
+        logger.exception("The warm-up failed")
+    else:
+        logger.info(
+            "Warm-up done: %s",
+            ", ".join(f"{step} {value:.2f}s" for step, value in seconds.items()),
+        )
+
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start_warm_up(aggregates=None) -> threading.Thread:
+    """Start the warm-up in a background thread, once per process.
+
+    Args:
+        aggregates (optional): The source of the aggregates, see warm_up()
+
+    Returns:
+        threading.Thread: The thread of the warm-up, None when it is disabled
+    """
+    global _thread
+    if os.environ.get("SURVEY_WARM_UP", "1") == "0":
+        return None
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_run, args=(aggregates,), name="survey-warm-up", daemon=True
+            )
+            _thread.start()
+        return _thread
@@ -0,0 +1,38 @@
+import streamlit as st
+
+
+def display_welcome(output=st):
+    """Responsible for showing the welcome page.
+
+    Args:
+        output (optional): Where the page is displayed. Defaults to Streamlit.
+    """
+
+    output.header("This project will answer some information about Stack Overflow.")
+    output.subheader("These questions will be answered:")
+    output.markdown(
+        """
+        1. Percentagem of respondents who consider themselves professionals, non-professionals, students, hobbyists, etc.
+        2. Distribution of respondents by location. Which country had the most participation?
+        3. What is the respondent's distribution by level of education?
+        4. What is the distribution of working time for each type of professional informed in question 1?
+        5. Concerning people who work professionally:
+            1. What is their profession?
+            2. What is their level of education?
+            3. What is the company's size of those people who work professionally?
+        6. The average salary of respondents?
+        7. Using the top five countries that have the most respondents, what is the salary of these people?
+        8. What is the percentage of people who work with Python?
+        9. About python:
+            1. What is the salary level of people working with Python globally?
+            2. In Brazil, what is the salary level?
+            3. In the top five countries that have the most respondents, what is the salary level?
+        10. Concerning all respondents, what operating system do they use?
+        11. Concerning only people who work with Python, what operating system do they use?
+        12. What is the average age of respondents?
+        13. Concerning only people who work with Python, what is the average age?"""
+    )
+
+    output.markdown(
+        "[![GitHub](https://badgen.net/badge/icon/GitHub?icon=github&color=black&label)](https://github.com/jpaulorc/streamlit_stackoverflow)"
+    )
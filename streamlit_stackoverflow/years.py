@@ -0,0 +1,178 @@
+"""Registry of the survey years.
+
+The survey renames some questions from one year to the next, e.g. the yearly
+salary is ``ConvertedComp`` up to 2020 and ``ConvertedCompYearly`` since 2021.
+Each year declares the aliases of its columns, so every year is loaded with
+the column names of the latest survey and a metric written for the latest
+year can be computed for the previous ones as is, as long as it reads the
+columns the manifests of schema.py load for them: the salary and the
+languages.
+
+Each year is loaded lazily, once per process, through its own DatasetProvider,
+and the metrics computed on it are memoized on its dataset.
+"""
+import functools
+import os
+import threading
+from typing import NamedTuple
+
+import pandas as pd  # type: ignore
+
+from dataset import DATA_FILE, DatasetProvider, SurveyDataset, survey_data
+from snapshot import load_survey, snapshot_path
+
+
+class SurveyYear(NamedTuple):
+    """The survey file of a year and the aliases of its columns."""
+
+    year: int
+    path: str
+    # column in the file: column of the latest survey, see the manifests of schema.py
+    aliases: dict = None
+
+
+LATEST_YEAR = 2021
+
+SURVEY_YEARS = {
+    2021: SurveyYear(2021, DATA_FILE),
+    2020: SurveyYear(
+        2020,
+        "data/survey_results_public_2020.csv",
+        {
+            "ConvertedComp": "ConvertedCompYearly",
+            "LanguageWorkedWith": "LanguageHaveWorkedWith",
+        },
+    ),
+    2019: SurveyYear(
+        2019,
+        "data/survey_results_public_2019.csv",
+        {
+            "ConvertedComp": "ConvertedCompYearly",
+            "LanguageWorkedWith": "LanguageHaveWorkedWith",
+        },
+    ),
+}
+
+
+def harmonize(frame: pd.DataFrame, aliases: dict) -> pd.DataFrame:
+    """Rename the columns of a survey to the names of the latest survey.
+
+    Args:
+        frame (pd.DataFrame): The survey of a year
+        aliases (dict): The latest name of each renamed column
+
+    Returns:
+        pd.DataFrame: The survey with the latest column names
+    """
+    if not aliases:
+        return frame
+    return frame.rename(columns=aliases, copy=False)
+
+
+def load_year(path: str, aliases: dict) -> pd.DataFrame:
+    """Load the survey of a year, from its snapshot when it is fresh.
+
+    Args:
+        path (str): The survey CSV path
+        aliases (dict): The latest name of each renamed column
+
+    Returns:
+        pd.DataFrame: The survey with the latest column names
+    """
+    return harmonize(load_survey(path), aliases)
+
+
+class YearRegistry:
+    """Responsible to share the survey of each year, loaded on the first use."""
+
+    def __init__(self, years: dict = SURVEY_YEARS, latest: DatasetProvider = None):
+        self.years = years
+        self._providers = {}
+        self._lock = threading.Lock()
+        if latest is not None:
+            self._providers[max(years)] = latest
+
+    def is_available(self, year: int) -> bool:
+        """Return whether the survey file or the snapshot of a year was deployed."""
+        if year not in self.years:
+            return False
+        path = self.years[year].path
+        if year in self._providers:
+            # the latest year is the survey served by the app, see dataset.py
+            path = self._providers[year].path
+        return os.path.exists(path) or os.path.exists(snapshot_path(path))
+
+    def available(self) -> list:
+        """Return the deployed years, the latest first.
+
+        Returns:
+            list: The years that can be loaded
+        """
+        return sorted(
+            (year for year in self.years if self.is_available(year)), reverse=True
+        )
+
+    def provider(self, year: int) -> DatasetProvider:
+        """Return the provider of a year, created on the first call.
+
+        Args:
+            year (int): The survey year
+
+        Raises:
+            KeyError: When the year is not registered
+
+        Returns:
+            DatasetProvider: The provider of the survey of the year
+        """
+        with self._lock:
+            if year not in self._providers:
+                survey_year = self.years[year]
+                self._providers[year] = DatasetProvider(
+                    survey_year.path,
+                    loader=functools.partial(load_year, aliases=survey_year.aliases),
+                )
+            return self._providers[year]
+
+    def get(self, year: int) -> SurveyDataset:
+        """Return the shared dataset of a year, loading it when it is missing or outdated.
+
+        Args:
+            year (int): The survey year
+
+        Returns:
+            SurveyDataset: The survey of the year
+        """
+        return self.provider(year).get()
+
+    def metric(self, name: str, metric, years: list = None) -> pd.DataFrame:
+        """Compute a metric for each year, memoized on the dataset of the year.
+
+        Args:
+            name (str): The name the metric is memoized under
+            metric (callable): Function that takes a SurveyDataset and returns a value
+            years (list, optional): The years. Defaults to every deployed year.
+
+        Returns:
+            pd.DataFrame: The Year and Value of each year, the latest first
+        """
+        years = self.available() if years is None else years
+        values = []
+        for year in years:
+            dataset = self.get(year)
+            values.append(
+                dataset.memo(("metric", name), functools.partial(metric, dataset))
+            )
+        return pd.DataFrame({"Year": years, "Value": values})
+
+    def stats(self) -> list:
+        """Return the counters of the providers created so far.
+
+        Returns:
+            list: The stats of each provider, the latest year first
+        """
+        with self._lock:
+            providers = sorted(self._providers.items(), reverse=True)
+        return [dict(provider.stats(), year=year) for year, provider in providers]
+
+
+survey_years = YearRegistry(latest=survey_data)
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the modules of the app import each other by their flat names
+sys.path.insert(0, os.path.join(ROOT, "streamlit_stackoverflow"))
+
+SCHEMA = os.path.join(ROOT, "data", "survey_results_schema.csv")
+
+
+@pytest.fixture(scope="session")
+def survey_file(tmp_path_factory):
+    """A synthetic survey file of 12,000 respondents."""
+    from benchmark import write_synthetic_survey
+
+    path = tmp_path_factory.mktemp("data") / "survey_results_public.csv"
+    return write_synthetic_survey(str(path), 12_000, schema_path=SCHEMA, seed=7)
+
+
+@pytest.fixture(scope="session")
+def survey_dataset(survey_file):
+    """The synthetic survey loaded like the shared dataset."""
+    from dataset import SurveyDataset
+    from schema import read_survey
+    from snapshot import file_hash
+
+    return SurveyDataset(read_survey(survey_file), file_hash(survey_file), survey_file)
@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import pytest
+
+from dataset import DatasetProvider
+from snapshot import source_version
+
+
+@pytest.fixture
+def survey_copy(survey_file, tmp_path):
+    path = tmp_path / "survey_results_public.csv"
+    shutil.copy(survey_file, path)
+    return str(path)
+
+
+def counting_provider(path: str):
+    calls = []
+
+    def versioner(csv_path):
+        calls.append(csv_path)
+        return source_version(csv_path)
+
+    return DatasetProvider(path, versioner=versioner), calls
+
+
+def test_unchanged_file_is_not_hashed_again(survey_copy):
+    provider, versions = counting_provider(survey_copy)
+    dataset = provider.get()
+
+    assert provider.get() is dataset
+    assert len(versions) == 1
+    assert (provider.stats()["hits"], provider.stats()["loads"]) == (1, 1)
+
+
+def test_touched_file_is_not_loaded_again(survey_copy):
+    provider, versions = counting_provider(survey_copy)
+    dataset = provider.get()
+    stat = os.stat(survey_copy)
+    os.utime(survey_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5 * 10**9))
+
+    assert provider.get() is dataset
+    # the new modification time is hashed once, then trusted again
+    assert provider.get() is dataset
+    assert len(versions) == 2
+    assert provider.stats()["loads"] == 1
+
+
+def test_changed_file_is_loaded_again(survey_copy):
+    provider, versions = counting_provider(survey_copy)
+    dataset = provider.get()
+    with open(survey_copy, "a") as file:
+        file.write("\n")
+
+    changed = provider.get()
+
+    assert changed is not dataset
+    assert changed.version != dataset.version
+    assert len(changed.frame) == len(dataset.frame)
+    assert (provider.stats()["misses"], provider.stats()["loads"]) == (2, 2)
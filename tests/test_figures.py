@@ -0,0 +1,48 @@
+from figures import FigureCache
+
+
+def cached(cache: FigureCache, key, value: str = "x" * 10) -> str:
+    return cache.get(key, lambda: value)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FigureCache(max_entries=2)
+    cached(cache, "a")
+    cached(cache, "b")
+    cached(cache, "a")
+    cached(cache, "c")
+
+    assert cache.get("a", lambda: "rendered again") == "x" * 10
+    assert cache.get("b", lambda: "rendered again") == "rendered again"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 4)
+    assert (stats["entries"], stats["evictions"]) == (2, 2)
+
+
+def test_entries_are_evicted_by_size():
+    cache = FigureCache(max_bytes=25)
+    cached(cache, "a")
+    cached(cache, "b", b"y" * 10)
+    cached(cache, "c")
+
+    assert cache.stats()["bytes"] == 20
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("a", lambda: "rendered again") == "rendered again"
+
+    # a figure bigger than the cache is returned, not kept
+    assert cached(cache, "big", "z" * 30) == "z" * 30
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+
+
+def test_concurrent_misses_store_the_figure_once():
+    cache = FigureCache()
+
+    def render():
+        # another session renders the same figure meanwhile
+        return cache.get("a", lambda: "first") and "second"
+
+    assert cache.get("a", render) == "second"
+    assert cache.get("a", lambda: "again") == "first"
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == len("first")
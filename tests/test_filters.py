@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd  # type: ignore
+import pytest
+
+from filters import LANGUAGE, BitmapIndex, bitmap_index, normalize
+
+FILTERS = {
+    "nothing": {},
+    "one value": {"Country": ["Brazil"]},
+    "values of a column": {"Country": ["Brazil", "India", "Germany"]},
+    "columns": {"Country": ["Brazil", "India"], "OpSys": ["Windows"]},
+    "languages": {LANGUAGE: ["Python", "Rust"]},
+    "every column": {
+        "Country": ["Brazil", "India", "United States of America"],
+        "Age": ["25-34 years old", "35-44 years old"],
+        "MainBranch": ["I am a developer by profession"],
+        "OpSys": ["Windows", "MacOS"],
+        LANGUAGE: ["Python", "JavaScript"],
+    },
+    "unknown value": {"Country": ["Atlantis"]},
+    "unknown and known values": {"Country": ["Atlantis", "Brazil"]},
+}
+
+
+def pandas_mask(frame: pd.DataFrame, filters: tuple) -> np.ndarray:
+    """The respondents who gave one of the values of every column, with pandas."""
+    mask = pd.Series(True, index=frame.index)
+    for column, values in filters:
+        if column == LANGUAGE:
+            answers = frame[column].astype(object).str.split(";")
+            matches = answers.apply(
+                lambda tokens: isinstance(tokens, list)
+                and bool(set(tokens) & set(values))
+            )
+        else:
+            matches = frame[column].isin(values)
+        mask &= matches
+    return mask.to_numpy()
+
+
+@pytest.mark.parametrize("name", list(FILTERS))
+def test_mask_matches_the_pandas_mask(survey_dataset, name):
+    filters = normalize(FILTERS[name])
+    frame = survey_dataset.frame
+
+    mask = bitmap_index(survey_dataset).mask(filters)
+
+    assert mask.dtype == bool and len(mask) == len(frame)
+    np.testing.assert_array_equal(mask, pandas_mask(frame, filters))
+
+
+def test_mask_of_rows_that_do_not_fill_a_byte(survey_dataset):
+    frame = survey_dataset.frame.iloc[:1001]
+    filters = normalize(FILTERS["every column"])
+
+    mask = BitmapIndex.from_frame(frame).mask(filters)
+
+    assert len(mask) == 1001
+    np.testing.assert_array_equal(mask, pandas_mask(frame, filters))
+
+
+def test_normalize_drops_the_empty_columns():
+    assert normalize({"OpSys": ["Windows", "Linux-based"], "Country": []}) == (
+        ("OpSys", ("Linux-based", "Windows")),
+    )
@@ -0,0 +1,79 @@
+import pandas as pd  # type: ignore
+import pytest
+
+from labels import (
+    KEEP,
+    LABELS,
+    LabelMap,
+    abbreviate,
+    label_column,
+    recode,
+    with_labels,
+)
+from partials import relabel, value_counts
+
+
+@pytest.mark.parametrize("name", list(LABELS))
+def test_relabeled_counts_are_the_counts_of_the_label_column(survey_dataset, name):
+    label = LABELS[name]
+    column = survey_dataset.frame[label.column]
+
+    counts = relabel(value_counts(column), label, int(column.isna().sum()))
+    expected = value_counts(label_column(survey_dataset, name))
+
+    pd.testing.assert_series_equal(counts, expected, check_names=False)
+
+
+def test_recode_works_on_the_categories():
+    series = pd.Series(["a", "b", None, "c", "a"], dtype="category")
+
+    assert recode(series, {"a": "A", "b": "B"}, "other").tolist() == [
+        "A",
+        "B",
+        "other",
+        "other",
+        "A",
+    ]
+    kept = recode(series, {"a": "A"}, KEEP)
+    assert kept.tolist()[:2] == ["A", "b"] and pd.isna(kept[2])
+
+
+def test_label_of_keeps_or_replaces_unmapped_values():
+    assert LabelMap("c", {"a": "A"}, KEEP).label_of("b") == "b"
+    assert LabelMap("c", {"a": "A"}, "other").label_of("b") == "other"
+    assert LabelMap("c", {"a": "A"}).label_of("a") == "A"
+
+
+def test_label_columns_are_memoized(survey_dataset):
+    labeled = with_labels(survey_dataset)
+
+    assert with_labels(survey_dataset) is labeled
+    assert set(LABELS) <= set(labeled.columns)
+    assert label_column(survey_dataset, "CountryAbbreviated") is label_column(
+        survey_dataset, "CountryAbbreviated"
+    )
+
+
+def test_abbreviate():
+    countries = [
+        "United States of America",
+        "Iran, Islamic Republic of...",
+        "Venezuela, Bolivarian Republic of...",
+        "Germany",
+    ]
+
+    assert abbreviate(countries, {"United States of America": "USA"}) == [
+        "USA",
+        "Iran",
+        "Venezuela",
+        "Germany",
+    ]
+    assert abbreviate(["A very long name without a qualifier"], width=10) == [
+        "A very lo…"
+    ]
+    # two values with the same short label keep their whole names
+    assert abbreviate(["Korea, Republic of", "Korea, North"], width=5) == [
+        "Korea, Republic of",
+        "Korea, North",
+    ]
+    assert abbreviate([]) == []
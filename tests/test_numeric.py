@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd  # type: ignore
+import pytest
+
+from numeric import MISSING, YEARS_TEXT, numeric_column, parse_numbers
+
+
+def test_years_are_parsed_into_int8():
+    answers = pd.Series(
+        ["3", "Less than 1 year", "More than 50 years", None, "12", "Other", "2.5"],
+        name="YearsCodePro",
+    )
+
+    years = parse_numbers(answers, YEARS_TEXT)
+
+    assert years.dtype == np.int8
+    assert years.tolist() == [3, 0, 51, MISSING, 12, MISSING, MISSING]
+
+
+@pytest.mark.parametrize("number", ["128", "-2"])
+def test_numbers_out_of_the_int8_range_are_refused(number):
+    with pytest.raises(ValueError):
+        parse_numbers(pd.Series(["3", number], name="YearsCodePro"))
+
+
+def test_survey_years_match_the_numbers_of_each_row(survey_dataset):
+    answers = survey_dataset.frame["YearsCodePro"].astype(object)
+    expected = pd.to_numeric(answers.replace(YEARS_TEXT), errors="coerce")
+
+    years = numeric_column(survey_dataset, "YearsCodePro")
+
+    assert numeric_column(survey_dataset, "YearsCodePro") is years
+    assert (years == MISSING).sum() == expected.isna().sum() > 0
+    assert set(years) >= {0, 51}
+    np.testing.assert_array_equal(years, expected.fillna(MISSING).to_numpy())
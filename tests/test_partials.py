@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import QUESTIONS, DatasetAggregates, StreamingAggregates
+
+
+def assert_answers_equal(expected: dict, actual: dict):
+    assert expected.keys() == actual.keys()
+    for name, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(value, actual[name], check_exact=False)
+        else:
+            assert value == pytest.approx(actual[name])
+
+
+@pytest.mark.parametrize("chunk_rows", [997, 5000, 30000])
+def test_streaming_answers_match_the_dataset(survey_dataset, survey_file, chunk_rows):
+    dataset = DatasetAggregates(survey_dataset)
+    streaming = StreamingAggregates(survey_file, chunk_rows)
+
+    for number in QUESTIONS:
+        assert_answers_equal(dataset.question(number), streaming.question(number))
+
+
+def test_merged_partials_count_every_row(survey_dataset):
+    from partials import survey_partials
+
+    frame = survey_dataset.frame
+    halves = survey_partials(frame.iloc[:5000]).merge(
+        survey_partials(frame.iloc[5000:])
+    )
+    whole = survey_partials(frame)
+
+    assert halves["rows"] == whole["rows"] == len(frame)
+    for name, series in whole.series.items():
+        pd.testing.assert_series_equal(halves[name], series, check_names=False)
+
+
+def survey_masks(frame) -> dict:
+    rng = np.random.default_rng(5)
+    return {
+        "every row": np.ones(len(frame), dtype=bool),
+        "no row": np.zeros(len(frame), dtype=bool),
+        "random": rng.random(len(frame)) < 0.3,
+        "one country": (frame["Country"] == "Brazil").to_numpy(),
+        "one row": np.arange(len(frame)) == 17,
+    }
+
+
+@pytest.mark.parametrize(
+    "name", ["every row", "no row", "random", "one country", "one row"]
+)
+def test_coded_partials_match_the_partials_of_the_rows(survey_dataset, name):
+    from analytics import devtype_groups
+    from multihot import multihot_index
+    from numeric import numeric_column
+    from partials import SurveyCodes, survey_partials
+
+    frame = survey_dataset.frame
+    roles = devtype_groups(survey_dataset)
+    languages = multihot_index(survey_dataset, "LanguageHaveWorkedWith")
+    years = numeric_column(survey_dataset, "YearsCodePro")
+    mask = survey_masks(frame)[name]
+
+    coded = SurveyCodes(frame, roles, languages, years).partials(mask)
+    expected = survey_partials(
+        frame.loc[mask], roles.take(mask), languages.take(mask), years[mask]
+    )
+
+    assert coded.totals == pytest.approx(expected.totals)
+    assert coded.series.keys() == expected.series.keys()
+    for partial, series in expected.series.items():
+        pd.testing.assert_series_equal(
+            coded[partial].rename(None), series.rename(None), obj=partial
+        )
+
+
+@pytest.mark.parametrize("empty_chunk", [True, False])
+def test_streaming_answers_of_a_survey_without_rows(
+    survey_file, tmp_path, monkeypatch, empty_chunk
+):
+    import analytics
+
+    path = tmp_path / "survey_results_public.csv"
+    with open(survey_file) as file:
+        path.write_text(file.readline())
+    if not empty_chunk:
+        # some readers give no chunk at all for a file without rows
+        monkeypatch.setattr(analytics, "read_survey_chunks", lambda *args: iter(()))
+
+    streaming = StreamingAggregates(str(path), 1000)
+
+    assert streaming.partials["rows"] == 0
+    for number in QUESTIONS:
+        streaming.question(number)
+
+
+@pytest.mark.parametrize("k", [0, 1, 3, 10, 49, 50, 80])
+def test_top_counts_are_the_first_ranked_counts(k):
+    from partials import ranked, top
+
+    rng = np.random.default_rng(k)
+    # few distinct counts, so the k-th count is often tied
+    counts = pd.Series(
+        rng.integers(0, 8, 50), index=[f"value {i:02}" for i in rng.permutation(50)]
+    )
+
+    pd.testing.assert_series_equal(top(counts, k), ranked(counts).iloc[:k])
+
+
+def test_top_counts_are_kept_per_partials(survey_dataset):
+    from partials import survey_partials, top
+
+    partials = survey_partials(survey_dataset.frame.iloc[:3000])
+
+    assert partials.top("Country", 5) is partials.top("Country", 5)
+    pd.testing.assert_series_equal(
+        partials.top("Country", 5), top(partials["Country"], 5)
+    )
@@ -0,0 +1,94 @@
+import sys
+import threading
+import types
+from concurrent.futures import wait
+
+import pytest
+
+from prefetch import Prefetcher
+
+
+class Aggregates:
+    version = "v1"
+
+
+@pytest.fixture
+def plots(monkeypatch):
+    """A make_plots module whose aggregates wait for a gate and can fail."""
+    module = types.ModuleType("make_plots")
+    module.calls = []
+    module.failing = set()
+    module.gate = threading.Event()
+
+    class MakePlots:
+        def __init__(self, aggregates, filters):
+            pass
+
+        def results(self, number):
+            module.gate.wait(timeout=10)
+            module.calls.append(number)
+            if number in module.failing:
+                raise RuntimeError(f"question {number}")
+
+    module.MakePlots = MakePlots
+    module.display_question = lambda *args, **kwargs: None
+    monkeypatch.setitem(sys.modules, "make_plots", module)
+    yield module
+    module.gate.set()
+
+
+@pytest.fixture
+def prefetcher():
+    prefetcher = Prefetcher(ahead=2, render=False)
+    yield prefetcher
+    prefetcher.shutdown()
+
+
+def test_prefetches_behind_the_visitor_are_cancelled(plots, prefetcher):
+    # another visitor holds the prefetch thread
+    others = prefetcher.after("Question 10", Aggregates(), owner="other")
+    behind = prefetcher.after("Question 1", Aggregates(), owner="visitor")
+    ahead = prefetcher.after("Question 5", Aggregates(), owner="visitor")
+
+    plots.gate.set()
+    wait(others + ahead, timeout=10)
+
+    assert all(future.cancelled() for future in behind)
+    assert [future.result() for future in others + ahead] == [True] * 4
+    assert plots.calls == [11, 12, 6, 7]
+    assert prefetcher.stats() == {
+        "pending": 0,
+        "prefetched": 4,
+        "cancelled": 2,
+        "failed": 0,
+    }
+
+
+def test_failed_prefetches_are_counted_and_tried_again(plots, prefetcher):
+    plots.failing.add(2)
+    plots.gate.set()
+
+    futures = prefetcher.after("Question 1", Aggregates())
+    wait(futures, timeout=10)
+
+    assert [future.result() for future in futures] == [False, True]
+    stats = prefetcher.stats()
+    assert (stats["failed"], stats["prefetched"], stats["pending"]) == (1, 1, 0)
+
+    # only the question that failed is prefetched again
+    futures = prefetcher.after("Question 1", Aggregates())
+    wait(futures, timeout=10)
+    assert plots.calls == [2, 3, 2]
+
+
+def test_prefetch_that_cannot_import_the_plots_is_counted_as_failed(
+    prefetcher, monkeypatch
+):
+    monkeypatch.setitem(sys.modules, "make_plots", None)
+
+    futures = prefetcher.after("Question 1", Aggregates())
+    wait(futures, timeout=10)
+
+    assert [future.result() for future in futures] == [False, False]
+    stats = prefetcher.stats()
+    assert (stats["failed"], stats["prefetched"], stats["pending"]) == (2, 0, 0)
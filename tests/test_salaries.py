@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd  # type: ignore
+import pytest
+
+from salaries import (
+    PERCENTILES,
+    RELATIVE_ACCURACY,
+    exact_statistics,
+    sketch,
+    statistics,
+)
+
+
+def assert_within_bound(sketched: dict, exact: dict):
+    assert sketched["count"] == exact["count"]
+    for column in [*PERCENTILES.values(), "trimmed_mean"]:
+        assert sketched[column] == pytest.approx(
+            exact[column], rel=RELATIVE_ACCURACY * (1 + 1e-9), abs=1e-9, nan_ok=True
+        ), column
+
+
+@pytest.mark.parametrize("rows", [1, 7, 1000, 100_000])
+def test_statistics_are_within_the_relative_accuracy(rows):
+    rng = np.random.default_rng(rows)
+    salaries = pd.Series(rng.lognormal(11, 1.2, rows).round())
+    # unpaid respondents and respondents who gave no salary
+    salaries[rng.random(rows) < 0.05] = 0.0
+    salaries[rng.random(rows) < 0.2] = np.nan
+
+    assert_within_bound(statistics(sketch(salaries)), exact_statistics(salaries))
+
+
+def test_survey_salaries_are_within_the_relative_accuracy(survey_dataset):
+    salaries = survey_dataset.frame["ConvertedCompYearly"].astype("float64")
+
+    assert_within_bound(statistics(sketch(salaries)), exact_statistics(salaries))
+
+
+def test_merged_sketches_are_the_sketch_of_every_salary():
+    rng = np.random.default_rng(3)
+    salaries = pd.Series(rng.lognormal(10, 2, 30_000))
+    chunks = [
+        sketch(salaries[start : start + 7000]) for start in range(0, 30_000, 7000)
+    ]
+    merged = pd.concat(chunks).groupby(level=0).sum()
+
+    assert statistics(merged) == statistics(sketch(salaries))
+
+
+def test_empty_sketch():
+    salaries = pd.Series([np.nan], dtype="float64")
+    sketched = statistics(sketch(salaries))
+
+    assert sketched["count"] == exact_statistics(salaries)["count"] == 0
+    assert np.isnan(sketched["median"])
@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import pytest
+
+import snapshot
+from snapshot import (
+    build_snapshot,
+    file_hash,
+    is_fresh,
+    load_survey,
+    snapshot_path,
+    source_version,
+)
+
+
+@pytest.fixture
+def survey_copy(survey_file, tmp_path):
+    path = tmp_path / "survey_results_public.csv"
+    shutil.copy(survey_file, path)
+    build_snapshot(str(path))
+    return str(path)
+
+
+def test_built_snapshot_is_fresh(survey_copy):
+    assert os.path.exists(snapshot_path(survey_copy))
+    assert is_fresh(survey_copy)
+    assert source_version(survey_copy) == file_hash(survey_copy)
+    assert len(load_survey(survey_copy)) == 12_000
+
+
+def test_touched_source_keeps_the_snapshot_fresh(survey_copy):
+    stat = os.stat(survey_copy)
+    os.utime(survey_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5 * 10**9))
+
+    assert is_fresh(survey_copy)
+
+
+def test_changed_source_makes_the_snapshot_stale(survey_copy):
+    version = source_version(survey_copy)
+    with open(survey_copy, "a") as file:
+        file.write("\n")
+
+    assert not is_fresh(survey_copy)
+    assert source_version(survey_copy) == file_hash(survey_copy) != version
+
+
+def test_changed_manifest_makes_the_snapshot_stale(survey_copy, monkeypatch):
+    dtypes = snapshot.dtypes_for(survey_copy)
+    changed = dict(dtypes, Age="string")
+    monkeypatch.setattr(snapshot, "dtypes_for", lambda csv_path: changed)
+
+    assert not is_fresh(survey_copy)
+
+
+def test_snapshot_without_its_source_is_fresh(survey_copy):
+    os.remove(survey_copy)
+
+    assert is_fresh(survey_copy)
+    assert len(load_survey(survey_copy)) == 12_000
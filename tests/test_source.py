@@ -0,0 +1,158 @@
+import hashlib
+import http.server
+import threading
+import urllib.error
+
+import pytest
+
+from source import RemoteDatasetProvider, RemoteFile
+
+
+class SurveyServer:
+    """An HTTP server of one survey file, answering 304 when its ETag matches."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.statuses = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                etag = f'"{hashlib.sha256(server.body).hexdigest()[:16]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    server.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                server.statuses.append(200)
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = (
+            f"http://127.0.0.1:{self.httpd.server_port}/survey_results_public.csv"
+        )
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread.is_alive():
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.thread.join()
+
+
+@pytest.fixture
+def server(survey_file):
+    with open(survey_file, "rb") as file:
+        survey = SurveyServer(file.read())
+    yield survey
+    survey.stop()
+
+
+def wait_for_refresh(provider: RemoteDatasetProvider):
+    refresh = provider._refresh
+    if refresh is not None:
+        refresh.join(timeout=60)
+
+
+def test_first_fetch_downloads_the_file(server, tmp_path):
+    remote = RemoteFile(server.url, str(tmp_path))
+
+    assert remote.age() == float("inf")
+    assert remote.fetch()
+    with open(remote.path, "rb") as file:
+        assert file.read() == server.body
+    assert remote.metadata()["etag"]
+    assert remote.age() < 60
+    assert server.statuses == [200]
+
+
+def test_unchanged_file_is_revalidated(server, tmp_path):
+    remote = RemoteFile(server.url, str(tmp_path))
+    remote.fetch()
+    checked = remote.metadata()["checked"]
+
+    assert not remote.fetch()
+    assert server.statuses == [200, 304]
+    assert remote.metadata()["checked"] >= checked
+
+    server.body += b"\n"
+    assert remote.fetch()
+    assert server.statuses == [200, 304, 200]
+
+
+def test_cached_copy_is_served_while_the_server_is_down(server, tmp_path):
+    provider = RemoteDatasetProvider(server.url, str(tmp_path), max_age=3600)
+    dataset = provider.get()
+    server.stop()
+
+    assert provider.get() is dataset
+
+    # a new server process starts from the cached copy
+    provider = RemoteDatasetProvider(server.url, str(tmp_path), max_age=0)
+    assert len(provider.get().frame) == len(dataset.frame)
+    wait_for_refresh(provider)
+    assert provider.stats()["refresh_errors"] == 1
+    assert provider.stats()["refreshes"] == 0
+
+    with pytest.raises(urllib.error.URLError):
+        RemoteDatasetProvider(server.url, str(tmp_path / "empty")).get()
+
+
+def test_refreshes_are_counted(server, tmp_path):
+    provider = RemoteDatasetProvider(server.url, str(tmp_path), max_age=0)
+    dataset = provider.get()
+    wait_for_refresh(provider)
+
+    stats = provider.stats()
+    assert (stats["misses"], stats["loads"], stats["refreshes"]) == (1, 1, 1)
+    assert server.statuses == [200, 304]
+
+    server.body += b"\n"
+    assert provider.get() is dataset
+    wait_for_refresh(provider)
+
+    stats = provider.stats()
+    assert (stats["hits"], stats["loads"], stats["refreshes"]) == (1, 2, 2)
+    assert stats["refresh_errors"] == 0
+    assert provider.get() is not dataset
+    assert provider.get().version != dataset.version
+
+
+def test_a_file_that_fails_to_load_is_downloaded_again(server, tmp_path):
+    from snapshot import load_survey
+
+    failures = []
+
+    def loader(path):
+        if failures:
+            raise ValueError(failures.pop())
+        return load_survey(path)
+
+    provider = RemoteDatasetProvider(
+        server.url, str(tmp_path), max_age=0, loader=loader
+    )
+    dataset = provider.get()
+    wait_for_refresh(provider)
+    assert server.statuses == [200, 304]
+
+    server.body += b"\n"
+    failures.append("truncated download")
+    assert provider.get() is dataset
+    wait_for_refresh(provider)
+    assert provider.stats()["refresh_errors"] == 1
+
+    # the validators of the file that failed were not kept
+    provider.get()
+    wait_for_refresh(provider)
+    assert server.statuses == [200, 304, 200, 200]
+    assert provider.get() is not dataset
+    assert provider.stats()["loads"] == 2